@@ -1,9 +1,69 @@
 # mpgepmc_core/admin.py
+from datetime import timedelta
+
 from django.contrib import admin
-from .models import MpgService, MpgBlog, ServiceRequest, ServicePackage, ServiceFeature, Donation, BankAccount, Project
+from django.core.exceptions import PermissionDenied
+from django.db.models import Q
+from django.db.models.functions import Lower
+from django.template.response import TemplateResponse
+from django.urls import path, reverse
+from django.utils import timezone
+from django.utils.html import format_html_join
+from .admin_scale import ScaleAdminMixin
+from .donations import transition_donations
+from .exports import FORMATS as EXPORT_FORMATS, MODEL_EXPORTS, export_response
+from .forms import DonationReportForm
+from .models import ORDER_NUMBER_PREFIX, MpgService, MpgBlog, ServiceRequest, ServicePackage, ServiceFeature, Donation, BankAccount, Project, OutboundEmail, DonationStatusTransition
+from .rollups import STATUSES, donation_report
+from .search import is_available as search_is_available, matching_ids
+from .slips import normalise_reference
+from .sqlite import ShortWriteAdminMixin
+from .versions import bump_versions, version_name
+
+
+class FullTextSearchMixin:
+    """
+    Answers the changelist search box from the FTS5 site search index
+    instead of running LIKE '%term%' over the full HTML bodies.
+    """
+    def get_search_results(self, request, queryset, search_term):
+        if not search_term.strip() or not search_is_available():
+            return super().get_search_results(request, queryset, search_term)
+        ids = matching_ids(self.model, search_term)
+        if ids is None:
+            return queryset.none(), False
+        return queryset.filter(pk__in=ids), False
+
+
+def normalise_order_number(term):
+    """'mpgepmc-38ue', '38ue' and 'MPGepmc-38UE' all become 'MPGepmc-38UE'."""
+    term = term.upper().replace(' ', '')
+    prefix = ORDER_NUMBER_PREFIX.upper()
+    if term.startswith(prefix):
+        term = term[len(prefix):]
+    elif prefix.startswith(term):
+        return ORDER_NUMBER_PREFIX[:len(term)]
+    return ORDER_NUMBER_PREFIX + term
+
+
+def export_action(fmt, compress=False):
+    """An admin action streaming the selected rows (every filtered row with "select all") as a file."""
+    label = EXPORT_FORMATS[fmt][2] + (', gzip-compressed' if compress else '')
+
+    @admin.action(description=f"Export selected as {label}", permissions=['view'])
+    def export(modeladmin, request, queryset):
+        return export_response(MODEL_EXPORTS[modeladmin.model], queryset, fmt, compress)
+
+    export.__name__ = f"export_{fmt}{'_gz' if compress else ''}"
+    return export
+
+
+# ⭐️ Streamed from a chunked cursor, so memory stays flat however many rows are selected (see exports.py) ⭐️
+EXPORT_ACTIONS = [export_action(fmt, compress) for fmt in EXPORT_FORMATS for compress in (False, True)]
+
 
 @admin.register(Project)
-class ProjectAdmin(admin.ModelAdmin):
+class ProjectAdmin(ShortWriteAdminMixin, FullTextSearchMixin, admin.ModelAdmin):
     """
     Admin view configuration for the Project model.
     """
@@ -37,7 +97,7 @@ class ServicePackageInline(admin.StackedInline):
     inlines = [ServiceFeatureInline]
 
 @admin.register(MpgService)
-class MpgServiceAdmin(admin.ModelAdmin):
+class MpgServiceAdmin(ShortWriteAdminMixin, FullTextSearchMixin, admin.ModelAdmin):
     list_display = ('name', 'slug', 'is_active', 'has_packages_for_purchase', 'image', 'created_at', 'updated_at') # Added 'slug'
     list_filter = ('is_active', 'has_packages_for_purchase')
     search_fields = ('name', 'short_description')
@@ -57,7 +117,7 @@ class MpgServiceAdmin(admin.ModelAdmin):
 
 
 @admin.register(MpgBlog)
-class MpgBlogAdmin(admin.ModelAdmin):
+class MpgBlogAdmin(ShortWriteAdminMixin, FullTextSearchMixin, admin.ModelAdmin):
     list_display = ('title', 'slug', 'posted_date', 'is_published', 'updated_date')
     list_filter = ('is_published', 'posted_date')
     search_fields = ('title', 'short_summary', 'content')
@@ -75,24 +135,51 @@ class MpgBlogAdmin(admin.ModelAdmin):
 
 
 @admin.register(ServiceRequest)
-class ServiceRequestAdmin(admin.ModelAdmin):
+class ServiceRequestAdmin(ShortWriteAdminMixin, ScaleAdminMixin, admin.ModelAdmin):
     list_display = ('mpgservice', 'user_full_name', 'user_email', 'phone_number', 'request_date', 'is_processed')
+    list_select_related = ('mpgservice',)
     list_filter = ('is_processed', 'mpgservice')
-    search_fields = ('user_full_name', 'user_email', 'mpgservice__name', 'user_message')
+    date_hierarchy = 'request_date'
+    # ⭐️ Prefix search on indexed columns; see admin_scale.py ⭐️
+    search_fields = ('user_email',)
+    search_prefixes = ((Lower('user_email'), str.lower),)
+    search_help_text = "Email address, or the start of one."
+    keyset_ordering = ('-request_date', '-id')
     readonly_fields = ('mpgservice', 'user_full_name', 'user_email', 'phone_number', 'user_message', 'request_date')
-    actions = ['mark_as_processed']
+    actions = ['mark_as_processed', *EXPORT_ACTIONS]
 
     def mark_as_processed(self, request, queryset):
         queryset.update(is_processed=True)
     mark_as_processed.short_description = "Mark selected requests as processed"
 
 
+class DonationStatusTransitionInline(admin.TabularInline):
+    model = DonationStatusTransition
+    extra = 0
+    fields = ('from_status', 'to_status', 'changed_by', 'changed_at')
+    readonly_fields = fields
+    can_delete = False
+
+    def has_add_permission(self, request, obj=None):
+        return False
+
+
 @admin.register(Donation)
-class DonationAdmin(admin.ModelAdmin):
-    list_display = ('donation_order_number', 'amount', 'status', 'full_name', 'email', 'created_at')
-    list_filter = ('status', 'created_at')
-    search_fields = ('donation_order_number', 'full_name', 'email', 'transaction_id')
-    readonly_fields = ('created_at', 'updated_at', 'donation_order_number')
+class DonationAdmin(ShortWriteAdminMixin, ScaleAdminMixin, admin.ModelAdmin):
+    list_display = ('donation_order_number', 'amount', 'status', 'full_name', 'email', 'slip_reused', 'reference_reused', 'created_at')
+    list_filter = ('status', 'slip_reused', 'reference_reused', 'created_at')
+    date_hierarchy = 'created_at'
+    # ⭐️ Prefix search on indexed columns; see admin_scale.py ⭐️
+    search_fields = ('donation_order_number', 'transaction_id', 'email')
+    search_prefixes = (
+        ('donation_order_number', normalise_order_number),
+        ('transaction_reference', normalise_reference),
+        (Lower('email'), str.lower),
+    )
+    search_help_text = "Order number, transaction id or email address, or the start of one."
+    keyset_ordering = ('-created_at', '-id')
+    change_list_template = 'admin/mpgepmc_core/donation/change_list.html'
+    readonly_fields = ('created_at', 'updated_at', 'donation_order_number', 'slip_reused', 'reference_reused', 'reused_by')
     
     fieldsets = (
         ('Donation Summary', {
@@ -101,25 +188,81 @@ class DonationAdmin(admin.ModelAdmin):
         ('Donor Verification Details', {
             'fields': ('full_name', 'email', 'transaction_id', 'sender_account_name', 'sender_account_number', 'transaction_slip')
         }),
+        # ⭐️ Set when the donation was submitted; see slips.py ⭐️
+        ('Duplicate Receipt Checks', {
+            'fields': ('slip_reused', 'reference_reused', 'reused_by')
+        }),
         ('Timestamps', {
             'fields': ('created_at', 'updated_at'),
             'classes': ('collapse',)
         }),
     )
     
-    actions = ['mark_as_completed', 'mark_as_failed']
+    inlines = [DonationStatusTransitionInline]
+    actions = ['mark_as_completed', 'mark_as_failed', *EXPORT_ACTIONS]
+
+    @admin.display(description="Other donations with this slip or reference")
+    def reused_by(self, obj):
+        if not (obj.slip_reused or obj.reference_reused):
+            return "-"
+        matches = Donation.objects.exclude(pk=obj.pk).filter(
+            (Q(slip_sha256=obj.slip_sha256) & ~Q(slip_sha256='')) |
+            (Q(transaction_reference=obj.transaction_reference) & ~Q(transaction_reference=''))
+        )
+        return format_html_join(
+            ', ', '<a href="{}">{}</a>',
+            ((reverse('admin:mpgepmc_core_donation_change', args=[pk]), number)
+             for pk, number in matches.values_list('pk', 'donation_order_number')[:20]),
+        ) or "-"
+
+    def get_urls(self):
+        dashboard = path(
+            'dashboard/', self.admin_site.admin_view(self.dashboard_view), name='mpgepmc_core_donation_dashboard'
+        )
+        return [dashboard, *super().get_urls()]
+
+    def dashboard_view(self, request):
+        # ⭐️ Reads only the rollup tables (see rollups.py): the cost follows the date range, not the donations ⭐️
+        if not self.has_view_permission(request):
+            raise PermissionDenied
+        today = timezone.localdate()
+        form = DonationReportForm(request.GET or {'start': today - timedelta(days=29), 'end': today})
+        report = None
+        if form.is_valid():
+            report = donation_report(form.cleaned_data['start'], form.cleaned_data['end'], form.cleaned_data['by'])
+        context = {
+            **self.admin_site.each_context(request),
+            'title': "Donation totals",
+            'opts': self.model._meta,
+            'form': form,
+            'by': form.cleaned_data.get('by') if form.is_valid() else None,
+            'report': report,
+            'status_labels': [Donation.DonationStatus(status).label for status in STATUSES],
+            'columns': 1 + 2 * len(STATUSES),
+        }
+        return TemplateResponse(request, 'admin/mpgepmc_core/donation/dashboard.html', context)
+
+    def save_model(self, request, obj, form, change):
+        # Picked up by signals.record_status_change for the transition log
+        obj._status_changed_by = request.user
+        super().save_model(request, obj, form, change)
+
+    def _transition(self, request, queryset, status):
+        # Set-wise update + transition log + batched donor emails, all in one transaction
+        changed = transition_donations(queryset, status, changed_by=request.user)
+        self.message_user(request, f"{changed} donation(s) marked as {status.label}; donor emails queued.")
 
     def mark_as_completed(self, request, queryset):
-        queryset.update(status=Donation.DonationStatus.COMPLETED)
+        self._transition(request, queryset, Donation.DonationStatus.COMPLETED)
     mark_as_completed.short_description = "Mark selected donations as Completed"
 
     def mark_as_failed(self, request, queryset):
-        queryset.update(status=Donation.DonationStatus.FAILED)
+        self._transition(request, queryset, Donation.DonationStatus.FAILED)
     mark_as_failed.short_description = "Mark selected donations as Failed"
 
 
 @admin.register(BankAccount)
-class BankAccountAdmin(admin.ModelAdmin):
+class BankAccountAdmin(ShortWriteAdminMixin, admin.ModelAdmin):
     list_display = ('account_title', 'bank_name', 'account_number', 'is_active')
     list_filter = ('is_active',)
     actions = ['activate_account']
@@ -128,9 +271,26 @@ class BankAccountAdmin(admin.ModelAdmin):
         if queryset.count() == 1:
             BankAccount.objects.update(is_active=False)
             queryset.update(is_active=True)
+            # update() skips post_save, so refresh the site snapshot ourselves
+            bump_versions(version_name(BankAccount))
             self.message_user(request, "The selected account has been activated for donations.")
         else:
             self.message_user(request, "Please select only one account to activate.", level='error')
     activate_account.short_description = "Set as the active donation account"
 
 
+@admin.register(OutboundEmail)
+class OutboundEmailAdmin(ShortWriteAdminMixin, admin.ModelAdmin):
+    list_display = ('subject', 'status', 'attempts', 'next_attempt_at', 'created_at', 'sent_at')
+    list_filter = ('status',)
+    search_fields = ('subject',)
+    readonly_fields = ('subject', 'body', 'html_body', 'from_email', 'recipients', 'attempts',
+                       'claim_token', 'last_error', 'created_at', 'sent_at')
+    actions = ['retry_now']
+
+    def retry_now(self, request, queryset):
+        count = queryset.exclude(status=OutboundEmail.EmailStatus.SENT).update(
+            status=OutboundEmail.EmailStatus.PENDING, attempts=0, next_attempt_at=timezone.now(), claim_token=''
+        )
+        self.message_user(request, f"{count} email(s) queued for another attempt.")
+    retry_now.short_description = "Retry selected emails now"
@@ -0,0 +1,213 @@
+# mpgepmc_core/admin_scale.py
+"""
+Admin changelists for tables that only ever grow (donations, service requests).
+
+Django's defaults cost more the more rows there are. Paging runs COUNT(*)
+twice (filtered and total) and then OFFSET n. The search box runs
+LIKE '%term%' over every search field. The date hierarchy runs
+SELECT DISTINCT over the whole table. ScaleAdminMixin replaces each of those
+with index work:
+
+- Pages in the default ordering are keyset pages (?after=<cursor>, the same
+  cursors as the public listings in pagination.py), so the last page costs
+  the same as the first. Sorting by a column falls back to numbered pages.
+- Counts stop at ADMIN_COUNT_LIMIT. Above it, the unfiltered list shows the
+  database's own row estimate (sqlite_stat1 after ANALYZE, or pg_class),
+  and a filtered list shows "more than <limit>".
+- Search is a prefix match (`term` <= value < `term`\\U0010ffff) on
+  normalised, indexed values; see `search_prefixes`.
+- The date hierarchy finds its years, months and days by skipping through
+  the date index, one seek per period that has rows.
+"""
+import datetime
+
+from django.conf import settings
+from django.contrib.admin.options import IncorrectLookupParameters
+from django.contrib.admin.views.main import ORDER_VAR, ChangeList
+from django.core.exceptions import BadRequest
+from django.core.paginator import Paginator
+from django.db import DatabaseError, connections, models
+from django.db.models import Q
+from django.utils import timezone
+from django.utils.functional import cached_property
+
+from .pagination import CURSOR_PARAM, paginate_queryset
+
+# Sorts after every character, so [prefix, prefix + PREFIX_END) is "starts with prefix"
+PREFIX_END = '\U0010ffff'
+
+
+def estimated_rows(model, using='default'):
+    """The database's estimate of the rows in `model`'s table, or None if it has none."""
+    connection = connections[using]
+    table = model._meta.db_table
+    try:
+        with connection.cursor() as cursor:
+            if connection.vendor == 'sqlite':
+                # Written by ANALYZE / PRAGMA optimize; the first number is the table's row count
+                cursor.execute("SELECT stat FROM sqlite_stat1 WHERE tbl = %s", [table])
+                row = cursor.fetchone()
+                return int(row[0].split()[0]) if row else None
+            if connection.vendor == 'postgresql':
+                cursor.execute("SELECT reltuples::bigint FROM pg_class WHERE oid = %s::regclass", [table])
+                row = cursor.fetchone()
+                return row[0] if row and row[0] >= 0 else None
+    except DatabaseError:
+        # sqlite_stat1 only exists once ANALYZE has run
+        return None
+    return None
+
+
+class CappedCountPaginator(Paginator):
+    """A paginator whose count stops at ADMIN_COUNT_LIMIT + 1 instead of counting every row."""
+
+    @cached_property
+    def count(self):
+        limit = settings.ADMIN_COUNT_LIMIT
+        return self.object_list.order_by()[:limit + 1].count()
+
+    @property
+    def is_capped(self):
+        return self.count > settings.ADMIN_COUNT_LIMIT
+
+
+class ScaleChangeList(ChangeList):
+    """A changelist that pages by cursor in the model admin's keyset_ordering."""
+
+    def __init__(self, request, *args, **kwargs):
+        self.cursor = request.GET.get(CURSOR_PARAM) or None
+        self.keyset_page = None
+        super().__init__(request, *args, **kwargs)
+        self.params.pop(CURSOR_PARAM, None)
+
+    def get_filters_params(self, params=None):
+        lookup_params = super().get_filters_params(params)
+        lookup_params.pop(CURSOR_PARAM, None)
+        return lookup_params
+
+    def get_query_string(self, new_params=None, remove=None):
+        # Changing a filter, the search or the sorting starts again from the first page
+        if not new_params or CURSOR_PARAM not in new_params:
+            remove = [*(remove or []), CURSOR_PARAM]
+        return super().get_query_string(new_params, remove)
+
+    @property
+    def uses_keyset(self):
+        return ORDER_VAR not in self.params and not self.show_all
+
+    def get_results(self, request):
+        if not self.uses_keyset:
+            if self.cursor:
+                raise IncorrectLookupParameters
+            return super().get_results(request)
+
+        try:
+            page = paginate_queryset(
+                self.queryset, self.model_admin.keyset_ordering, self.cursor, self.list_per_page
+            )
+        except BadRequest:
+            raise IncorrectLookupParameters
+        self.paginator = self.model_admin.get_paginator(request, self.queryset, self.list_per_page)
+        self.result_count = self.paginator.count
+        self.full_result_count = None
+        self.show_full_result_count = False
+        self.show_admin_actions = True
+        self.result_list = page.items
+        self.can_show_all = False
+        self.multi_page = page.has_next or not page.is_first
+        self.keyset_page = page
+
+    @property
+    def count_label(self):
+        """The result count as shown under the list: exact, or an estimate past ADMIN_COUNT_LIMIT."""
+        if not self.paginator.is_capped:
+            return f"{self.result_count:,}"
+        estimate = None if self.has_active_filters or self.query else estimated_rows(self.model)
+        if estimate and estimate > settings.ADMIN_COUNT_LIMIT:
+            return f"about {estimate:,}"
+        return f"more than {settings.ADMIN_COUNT_LIMIT:,}"
+
+    def next_page_url(self):
+        return self.get_query_string({CURSOR_PARAM: self.keyset_page.next_cursor})
+
+    def first_page_url(self):
+        return self.get_query_string()
+
+
+def _period_start(value, kind):
+    """The first day of the year, month or day `value` falls in, in the current time zone."""
+    if isinstance(value, datetime.datetime):
+        if timezone.is_aware(value):
+            value = timezone.localtime(value)
+        value = value.date()
+    return value.replace(month=1 if kind == 'year' else value.month, day=1 if kind != 'day' else value.day)
+
+
+def _next_period(day, kind):
+    if kind == 'year':
+        return day.replace(year=day.year + 1, month=1, day=1)
+    if kind == 'month':
+        return day.replace(year=day.year + day.month // 12, month=day.month % 12 + 1, day=1)
+    return day + datetime.timedelta(days=1)
+
+
+def date_periods(queryset, field_name, kind):
+    """
+    The distinct years, months or days (as dates) of `field_name` in
+    `queryset`, oldest first. Each one is an ORDER BY field LIMIT 1 seek
+    starting where the previous period ends, so the cost follows the number
+    of periods rather than the number of rows.
+    """
+    field = queryset.model._meta.get_field(field_name)
+    values = queryset.order_by(field_name).values_list(field_name, flat=True)
+    periods = []
+    value = values.first()
+    while value is not None:
+        period = _period_start(value, kind)
+        periods.append(period)
+        boundary = _next_period(period, kind)
+        if isinstance(field, models.DateTimeField):
+            boundary = datetime.datetime.combine(boundary, datetime.time.min)
+            if settings.USE_TZ:
+                boundary = timezone.make_aware(boundary)
+        value = values.filter(**{f'{field_name}__gte': boundary}).first()
+    return periods
+
+
+class ScaleAdminMixin:
+    """
+    For ModelAdmins of tables with a large history. Set `keyset_ordering`
+    (the default ordering, ending in a unique field, all one direction) and
+    `search_prefixes`, pairs of (field name or expression, normaliser). Each
+    field or expression needs an index, and the normaliser turns what an
+    admin types into the stored form, returning '' to skip that field.
+    """
+    keyset_ordering = ('-pk',)
+    search_prefixes = ()
+    show_full_result_count = False
+    change_list_template = 'admin/mpgepmc_core/scale_change_list.html'
+
+    def get_changelist(self, request, **kwargs):
+        return ScaleChangeList
+
+    def get_paginator(self, request, queryset, per_page, orphans=0, allow_empty_first_page=True):
+        return CappedCountPaginator(queryset, per_page, orphans, allow_empty_first_page)
+
+    def get_search_results(self, request, queryset, search_term):
+        term = search_term.strip()
+        if not term:
+            return queryset, False
+        condition = Q()
+        for index, (target, normalise) in enumerate(self.search_prefixes):
+            prefix = normalise(term)
+            if not prefix:
+                continue
+            if not isinstance(target, str):
+                name, target = f'search_prefix_{index}', target
+                queryset = queryset.alias(**{name: target})
+            else:
+                name = target
+            condition |= Q(**{f'{name}__gte': prefix, f'{name}__lt': prefix + PREFIX_END})
+        if not condition:
+            return queryset.none(), False
+        return queryset.filter(condition), False
@@ -0,0 +1,84 @@
+# mpgepmc_core/benchmarking.py
+"""
+Shared helpers for the benchmark management commands.
+
+Benchmarks never touch the real database: `scratch_database()` builds a
+throwaway file-backed SQLite copy of the schema (the same way the test
+runner does) and points the default connection at it. A file rather than
+`:memory:` is used so that every benchmark thread gets its own real
+connection with real locking behaviour.
+"""
+import json
+import os
+import re
+import statistics
+import tempfile
+import time
+from contextlib import contextmanager
+
+from django.db import connection, connections
+
+
+@contextmanager
+def scratch_database(keep=False):
+    """Yields the path of a freshly migrated scratch database; removes it afterwards."""
+    old_name = connection.settings_dict['NAME']
+    fd, path = tempfile.mkstemp(prefix='mpgepmc-bench-', suffix='.sqlite3')
+    os.close(fd)
+    connection.settings_dict.setdefault('TEST', {})['NAME'] = path
+    connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+    try:
+        yield path
+    finally:
+        connections.close_all()
+        connection.creation.destroy_test_db(old_name, verbosity=0, keepdb=keep)
+
+
+class QueryCounter:
+    """
+    execute_wrapper that counts statements by verb on one connection,
+    e.g. counter.counts['INSERT']. Works without DEBUG. With `table`, only
+    statements that insert into, select from or update that table are
+    counted (signal handlers write to other tables in the same save).
+    """
+    def __init__(self, table=None):
+        self.counts = {}
+        self.total_time = 0.0
+        self.table_re = table and re.compile(
+            rf'\b(?:INTO|FROM|UPDATE)\s+"?{re.escape(table)}"?(?:[\s(]|$)', re.IGNORECASE
+        )
+
+    def __call__(self, execute, sql, params, many, context):
+        if not self.table_re or self.table_re.search(sql):
+            verb = sql.lstrip().split(None, 1)[0].upper()
+            self.counts[verb] = self.counts.get(verb, 0) + 1
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.total_time += time.perf_counter() - started
+
+
+def percentiles(samples):
+    """p50/p95/p99 (and mean/max) of a list of durations in seconds, reported in ms."""
+    if not samples:
+        return {'count': 0}
+    ordered = sorted(samples)
+
+    def pick(fraction):
+        return ordered[min(len(ordered) - 1, int(round(fraction * (len(ordered) - 1))))] * 1000
+
+    return {
+        'count': len(ordered),
+        'mean_ms': round(statistics.fmean(ordered) * 1000, 3),
+        'p50_ms': round(pick(0.50), 3),
+        'p95_ms': round(pick(0.95), 3),
+        'p99_ms': round(pick(0.99), 3),
+        'max_ms': round(ordered[-1] * 1000, 3),
+    }
+
+
+def write_report(report, path):
+    """Saves a benchmark report as pretty-printed JSON so runs can be diffed."""
+    with open(path, 'w') as fh:
+        json.dump(report, fh, indent=2, sort_keys=True, default=str)
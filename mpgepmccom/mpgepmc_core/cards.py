@@ -0,0 +1,26 @@
+# mpgepmc_core/cards.py
+"""
+Card projections for list pages, the footer and related-content blocks.
+
+A card only shows a title, slug, summary, image and date, so these querysets
+load just those columns and defer the HTML bodies (MpgBlog.content,
+Project.full_description, MpgService.full_description). Memory and transfer
+per list request then no longer grow with article length.
+
+The rows are still model instances, so templates, get_category_display() and
+the image tags work unchanged. Touching a deferred field costs one query per
+row, so a template that needs another column should add it here rather than
+reach for it; the query budget tests catch the difference.
+"""
+from .models import MpgBlog, MpgService, Project
+
+CARD_FIELDS = {
+    MpgBlog: ('id', 'title', 'slug', 'short_summary', 'feature_image', 'posted_date'),
+    Project: ('id', 'title', 'slug', 'category', 'short_description', 'image', 'posted_date'),
+    MpgService: ('id', 'name', 'slug', 'short_description', 'image', 'created_at'),
+}
+
+
+def cards(queryset):
+    """`queryset` restricted to the columns its model's cards render."""
+    return queryset.only(*CARD_FIELDS[queryset.model])
@@ -0,0 +1,136 @@
+# mpgepmc_core/catalog.py
+"""
+Snapshot of the service catalog: active services -> active packages ->
+features, with each service's package count and min/max price worked out
+once at build time.
+
+It is built with three prefetching queries, stored in the content cache as
+one structure keyed on the MpgService/ServicePackage/ServiceFeature version
+stamps, and memoised per process, so the services list and every service
+detail page render without touching the database once it is warm. Saving or
+deleting any of the three models bumps its version (see signals.py).
+"""
+import threading
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import caches
+from django.db.models import Prefetch
+
+from .models import MpgService, ServiceFeature, ServicePackage
+from .versions import aget_versions, get_versions, version_name
+
+CATALOG_MODELS = (MpgService, ServicePackage, ServiceFeature)
+CATALOG_VERSION_NAMES = tuple(version_name(model) for model in CATALOG_MODELS)
+
+_local = None  # (version, catalog) for this process
+_lock = threading.Lock()
+
+
+def _feature(feature):
+    return {
+        'feature_text': feature.feature_text,
+        'is_included': feature.is_included,
+    }
+
+
+def _package(package):
+    return {
+        'id': package.pk,
+        'name': package.name,
+        'slug': package.slug,
+        'description': package.description,
+        'price': package.price,
+        'duration': package.duration,
+        'features': [
+            _feature(feature)
+            for feature in sorted(package.features.all(), key=lambda feature: (feature.order, feature.feature_text))
+        ],
+    }
+
+
+def _service(service):
+    packages = [
+        _package(package)
+        for package in sorted(service.packages.all(), key=lambda package: (package.order, package.price))
+    ]
+    prices = [package['price'] for package in packages]
+    return {
+        'id': service.pk,
+        'name': service.name,
+        'slug': service.slug,
+        'short_description': service.short_description,
+        'full_description': service.full_description,
+        'image': service.image.name if service.image else '',  # the image tags accept storage names
+        'has_packages_for_purchase': service.has_packages_for_purchase,
+        'packages': packages,
+        'package_count': len(packages),
+        'min_price': min(prices) if prices else None,
+        'max_price': max(prices) if prices else None,
+    }
+
+
+def build_catalog():
+    """Reads the whole active catalog in three queries (services, packages, features)."""
+    # The prefetches fetch rows for many parents at once (WHERE service_id IN ...),
+    # so ordering them in SQL always needs a temp B-tree; the few rows per parent
+    # are sorted in Python instead, in the models' Meta ordering.
+    packages = (
+        ServicePackage.objects.filter(is_active=True)
+        .order_by()
+        .prefetch_related(Prefetch('features', queryset=ServiceFeature.objects.order_by()))
+    )
+    services = (
+        MpgService.objects.filter(is_active=True)
+        .order_by('name')
+        .prefetch_related(Prefetch('packages', queryset=packages))
+    )
+    catalog_services = [_service(service) for service in services]
+    return {
+        'services': catalog_services,
+        # Same dicts as in 'services'; pickling keeps them shared
+        'by_slug': {service['slug']: service for service in catalog_services},
+    }
+
+
+def catalog_version():
+    return ':'.join(get_versions(*CATALOG_VERSION_NAMES))
+
+
+def get_catalog():
+    """The current catalog, from this process, then the content cache, then the database."""
+    global _local
+    version = catalog_version()
+    local = _local
+    if local is not None and local[0] == version:
+        return local[1]
+
+    with _lock:
+        if _local is not None and _local[0] == version:
+            return _local[1]
+        cache = caches[settings.CONTENT_CACHE_ALIAS]
+        key = f"catalog:{version}"
+        catalog = cache.get(key)
+        if catalog is None:
+            catalog = build_catalog()
+            cache.set(key, catalog, settings.PAGE_CACHE_TIMEOUT)
+        _local = (version, catalog)
+        return catalog
+
+
+def get_service(slug):
+    """One active service (with its packages and features) by slug, or None."""
+    return get_catalog()['by_slug'].get(slug)
+
+
+async def aget_catalog():
+    """get_catalog() for async views: a warm catalog is returned without leaving the event loop."""
+    version = ':'.join(await aget_versions(*CATALOG_VERSION_NAMES))
+    local = _local
+    if local is not None and local[0] == version:
+        return local[1]
+    return await sync_to_async(get_catalog)()
+
+
+async def aget_service(slug):
+    return (await aget_catalog())['by_slug'].get(slug)
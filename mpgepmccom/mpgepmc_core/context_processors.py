@@ -1,17 +1,30 @@
-from .models import MpgService, MpgBlog
+from django.utils.functional import SimpleLazyObject
+
+from .site_snapshot import aget_site_snapshot, get_site_snapshot
 
 def global_context(request):
     """
     Provides global context to all templates, specifically for the footer.
+    Values are lazy: pages that never render the footer never load the snapshot.
+    """
+    snapshot = SimpleLazyObject(get_site_snapshot)
+
+    return {
+        'latest_services_footer': SimpleLazyObject(lambda: snapshot.latest_services_footer),
+        'latest_blogs_footer': SimpleLazyObject(lambda: snapshot.latest_blogs_footer),
+    }
+
+
+async def afooter_context(request, context):
+    """
+    `context` plus the footer lists, for async views. Loading the snapshot and
+    the session up front means rendering the template afterwards (messages
+    included) never needs a synchronous query.
     """
-    try:
-        latest_services_footer = MpgService.objects.filter(is_active=True).order_by('-created_at')[:4]
-        latest_blogs_footer = MpgBlog.objects.filter(is_published=True).order_by('-posted_date')[:4]
-    except Exception:
-        latest_services_footer = []
-        latest_blogs_footer = []
-        
+    await request.auser()
+    snapshot = await aget_site_snapshot()
     return {
-        'latest_services_footer': latest_services_footer,
-        'latest_blogs_footer': latest_blogs_footer,
+        'latest_services_footer': snapshot.latest_services_footer,
+        'latest_blogs_footer': snapshot.latest_blogs_footer,
+        **context,
     }
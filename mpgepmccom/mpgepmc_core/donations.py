@@ -0,0 +1,96 @@
+# mpgepmc_core/donations.py
+"""
+Donation status transitions and the notifications that go with them.
+
+`transition_donations()` settles any number of donations set-wise: per
+chunk, one locking re-read and one UPDATE, one bulk INSERT of DonationStatusTransition rows, and the
+completed/failed emails rendered and queued to the outbox in the same
+transaction, so a status change and its notification commit together. The
+daily/monthly totals (rollups.py) move in that transaction too.
+"""
+from django.conf import settings
+from django.db import transaction
+from django.template.loader import get_template
+from django.utils import timezone
+from django.utils.html import strip_tags
+
+from .models import Donation, DonationStatusTransition
+from .outbox import enqueue_emails
+from .rollups import apply_changes as apply_rollup_changes
+
+# Status -> (subject template, email template) for the donor notification
+STATUS_EMAILS = {
+    Donation.DonationStatus.COMPLETED: (
+        "Your Donation to MPG EPMC is Complete! ({order_number})",
+        'mpgepmc/email/donation_completed_user.html',
+    ),
+    Donation.DonationStatus.FAILED: (
+        "Update Regarding Your Donation to MPG EPMC ({order_number})",
+        'mpgepmc/email/donation_failed_user.html',
+    ),
+}
+
+BULK_CHUNK_SIZE = 500
+
+
+def status_email(donation, template=None):
+    """
+    enqueue_email() arguments for the donor notification of the donation's
+    current status, or None if that status (or the donation) has no email.
+    """
+    if donation.status not in STATUS_EMAILS or not donation.email:
+        return None
+    subject, template_name = STATUS_EMAILS[donation.status]
+    html_message = (template or get_template(template_name)).render({'donation': donation})
+    return (
+        subject.format(order_number=donation.donation_order_number),
+        strip_tags(html_message),
+        settings.DEFAULT_FROM_EMAIL,
+        [donation.email],
+        html_message,
+    )
+
+
+def _chunks(items, size):
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+def transition_donations(queryset, to_status, changed_by=None, notify=True):
+    """
+    Moves every donation in `queryset` that isn't already in `to_status` to it.
+    Records one transition row per donation and queues the donor emails.
+    Returns the number of donations that actually changed.
+    """
+    template = get_template(STATUS_EMAILS[to_status][1]) if notify and to_status in STATUS_EMAILS else None
+    changed = 0
+    with transaction.atomic():
+        candidates = list(queryset.exclude(status=to_status).values_list('pk', flat=True))
+        now = timezone.now()
+        for chunk in _chunks(candidates, BULK_CHUNK_SIZE):
+            # Lock the chunk and read it again, so the transition rows, rollup deltas and
+            # emails come from the rows this UPDATE changes, as they are now. A donation
+            # another request moved since the scan above keeps that request's change.
+            current = list(
+                Donation.objects.select_for_update().filter(pk__in=chunk).exclude(status=to_status)
+                .values_list('pk', 'status', 'amount', 'created_at')
+            )
+            if not current:
+                continue
+            ids = [pk for pk, *_rest in current]
+            changed += Donation.objects.filter(pk__in=ids).update(status=to_status, updated_at=now)
+            DonationStatusTransition.objects.bulk_create([
+                DonationStatusTransition(
+                    donation_id=pk, from_status=from_status, to_status=to_status, changed_by=changed_by
+                )
+                for pk, from_status, _amount, _created_at in current
+            ])
+            apply_rollup_changes(
+                change
+                for _pk, from_status, amount, created_at in current
+                for change in ((created_at, from_status, -1, -amount), (created_at, to_status, 1, amount))
+            )
+            if template is not None:
+                emails = (status_email(donation, template) for donation in Donation.objects.filter(pk__in=ids))
+                enqueue_emails(email for email in emails if email)
+    return changed
@@ -0,0 +1,185 @@
+# mpgepmc_core/exports.py
+"""
+Streaming CSV / JSON Lines exports of donations and service requests.
+
+Rows are read with queryset.values_list(...).iterator(chunk_size=...): a
+server-side cursor on PostgreSQL, fetchmany() batches on SQLite, and no
+model instances or result cache either way. Each row is formatted as soon as
+it is read, collected into blocks of about BLOCK_SIZE bytes, gzip-compressed
+as it goes if asked, and handed on block by block: to a
+StreamingHttpResponse for the admin actions, or to a file or stdout for the
+`export_records` command. Memory use depends on the chunk and block sizes,
+not on the number of rows.
+"""
+import csv
+import datetime
+import json
+import zlib
+from decimal import Decimal
+
+from django.conf import settings
+from django.http import StreamingHttpResponse
+from django.utils import timezone
+
+from .models import Donation, ServiceRequest
+
+EXPORT_CHUNK_SIZE = 2000
+BLOCK_SIZE = 64 * 1024
+
+# kind -> (model, date field for --since/--until, [(column, field path)])
+EXPORTS = {
+    'donations': (Donation, 'created_at', [
+        ('order_number', 'donation_order_number'),
+        ('amount', 'amount'),
+        ('status', 'status'),
+        ('full_name', 'full_name'),
+        ('email', 'email'),
+        ('transaction_id', 'transaction_id'),
+        ('sender_account_name', 'sender_account_name'),
+        ('sender_account_number', 'sender_account_number'),
+        ('transaction_slip', 'transaction_slip'),
+        ('slip_reused', 'slip_reused'),
+        ('reference_reused', 'reference_reused'),
+        ('created_at', 'created_at'),
+        ('updated_at', 'updated_at'),
+    ]),
+    'service_requests': (ServiceRequest, 'request_date', [
+        ('id', 'id'),
+        ('service', 'mpgservice__name'),
+        ('full_name', 'user_full_name'),
+        ('email', 'user_email'),
+        ('phone_number', 'phone_number'),
+        ('message', 'user_message'),
+        ('request_date', 'request_date'),
+        ('is_processed', 'is_processed'),
+    ]),
+}
+MODEL_EXPORTS = {model: kind for kind, (model, _date_field, _columns) in EXPORTS.items()}
+
+# format -> (content type, file extension, label)
+FORMATS = {
+    'csv': ('text/csv; charset=utf-8', 'csv', 'CSV'),
+    'jsonl': ('application/x-ndjson', 'jsonl', 'JSON Lines'),
+}
+
+# Spreadsheet apps run cells starting with these as formulas
+_FORMULA_START = ('=', '+', '-', '@', '\t', '\r')
+
+
+def _value(value, tz):
+    """Dates in local time (`tz`) with their offset, decimals as exact strings."""
+    if isinstance(value, datetime.datetime):
+        return (value.astimezone(tz) if value.tzinfo else value).isoformat()
+    if isinstance(value, datetime.date):
+        return value.isoformat()
+    if isinstance(value, Decimal):
+        return str(value)
+    return value
+
+
+def _csv_cell(value, tz):
+    value = _value(value, tz)
+    if value is None:
+        return ''
+    if isinstance(value, str) and value.startswith(_FORMULA_START):
+        return "'" + value
+    return value
+
+
+def export_rows(kind, queryset):
+    """(column names, iterator of value tuples) for `queryset`, in primary key order."""
+    _model, _date_field, columns = EXPORTS[kind]
+    rows = (
+        queryset.order_by('pk')
+        .values_list(*(path for _column, path in columns))
+        .iterator(chunk_size=EXPORT_CHUNK_SIZE)
+    )
+    return [column for column, _path in columns], rows
+
+
+class _Echo:
+    """csv.writer target that hands each formatted line back instead of storing it."""
+    def write(self, value):
+        return value
+
+
+def csv_lines(kind, queryset):
+    header, rows = export_rows(kind, queryset)
+    tz = timezone.get_current_timezone()  # once, not per value
+    writer = csv.writer(_Echo())
+    yield writer.writerow(header)
+    for row in rows:
+        yield writer.writerow([_csv_cell(value, tz) for value in row])
+
+
+def jsonl_lines(kind, queryset):
+    header, rows = export_rows(kind, queryset)
+    tz = timezone.get_current_timezone()
+    for row in rows:
+        yield json.dumps({column: _value(value, tz) for column, value in zip(header, row)}, ensure_ascii=False) + '\n'
+
+
+LINE_WRITERS = {'csv': csv_lines, 'jsonl': jsonl_lines}
+
+
+def _blocks(lines):
+    block, size = [], 0
+    for line in lines:
+        data = line.encode('utf-8')
+        block.append(data)
+        size += len(data)
+        if size >= BLOCK_SIZE:
+            yield b''.join(block)
+            block, size = [], 0
+    if block:
+        yield b''.join(block)
+
+
+def _gzip(blocks):
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 16 + zlib.MAX_WBITS)  # gzip header and trailer
+    for block in blocks:
+        data = compressor.compress(block)
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+def export_stream(kind, queryset, fmt='csv', compress=False):
+    """The export as an iterator of bytes blocks. Nothing is queried until it is consumed."""
+    blocks = _blocks(LINE_WRITERS[fmt](kind, queryset))
+    return _gzip(blocks) if compress else blocks
+
+
+def export_filename(kind, fmt, compress=False):
+    extension = FORMATS[fmt][1] + ('.gz' if compress else '')
+    return f"{kind}-{timezone.localtime():%Y%m%d-%H%M%S}.{extension}"
+
+
+def export_response(kind, queryset, fmt='csv', compress=False):
+    """A download of the export, streamed to the client as it is generated."""
+    response = StreamingHttpResponse(
+        export_stream(kind, queryset, fmt, compress),
+        content_type='application/gzip' if compress else FORMATS[fmt][0],
+    )
+    response['Content-Disposition'] = f'attachment; filename="{export_filename(kind, fmt, compress)}"'
+    return response
+
+
+def _day_start(day):
+    start = datetime.datetime.combine(day, datetime.time.min)
+    return timezone.make_aware(start) if settings.USE_TZ else start
+
+
+def filtered_queryset(kind, since=None, until=None, status=None, open_only=False):
+    """The rows of `kind` created from local date `since` to `until` (inclusive), optionally narrowed."""
+    model, date_field, _columns = EXPORTS[kind]
+    queryset = model.objects.all()
+    if since:
+        queryset = queryset.filter(**{f'{date_field}__gte': _day_start(since)})
+    if until:
+        queryset = queryset.filter(**{f'{date_field}__lt': _day_start(until + datetime.timedelta(days=1))})
+    if status:
+        queryset = queryset.filter(status=status)
+    if open_only:
+        queryset = queryset.filter(is_processed=False)
+    return queryset
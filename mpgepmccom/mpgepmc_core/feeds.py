@@ -0,0 +1,239 @@
+# mpgepmc_core/feeds.py
+"""
+Pre-generated sitemap and RSS/Atom feeds for blogs, projects and services.
+
+Crawlers read these as plain files instead of rendering anything per
+request. Everything lives under PUBLISHED_ROOT, each file next to a gzipped
+copy that is sent to clients that accept it (see media.send_file):
+
+    sitemap.xml                 sitemap index
+    sitemaps/pages.xml          the fixed pages
+    sitemaps/blogs-0.xml        published blogs with 0 <= id < SITEMAP_CHUNK_SIZE
+    sitemaps/blogs-1.xml        ... and so on for projects and services
+    feeds/blogs.rss             latest FEED_ITEMS items, RSS 2.0
+    feeds/blogs.atom            the same, Atom 1.0
+
+Sitemap chunks are fixed id ranges, so saving or deleting one item rewrites
+only its own chunk, its section's two feeds and the index, however many
+items there are. <lastmod> comes from updated_date / updated_at.
+`build_sitemaps_and_feeds` rebuilds everything; a file that is missing when
+requested is built on the spot.
+"""
+import gzip
+import os
+import re
+from io import BytesIO
+
+from django.conf import settings
+from django.db.models import F, Max
+from django.http import Http404
+from django.urls import reverse
+from django.utils import feedgenerator
+from django.utils.xmlutils import SimplerXMLGenerator
+
+from .media import send_file
+from .models import MpgBlog, MpgService, Project
+
+SITEMAP_CHUNK_SIZE = getattr(settings, 'SITEMAP_CHUNK_SIZE', 10000)  # the protocol allows 50,000 URLs per file
+FEED_ITEMS = getattr(settings, 'FEED_ITEMS', 20)
+CACHE_CONTROL = 'public, max-age=3600'
+
+SITEMAP_NS = 'http://www.sitemaps.org/schemas/sitemap/0.9'
+
+# Section -> (model, published flag, lastmod field, date field, detail URL name, title field, summary field, label)
+SECTIONS = {
+    'blogs': (MpgBlog, 'is_published', 'updated_date', 'posted_date', 'mpgepmc_core:blog_detail',
+              'title', 'short_summary', 'Blog'),
+    'projects': (Project, 'is_published', 'updated_date', 'posted_date', 'mpgepmc_core:project_detail',
+                 'title', 'short_description', 'Projects'),
+    'services': (MpgService, 'is_active', 'updated_at', 'created_at', 'mpgepmc_core:service_detail',
+                 'name', 'short_description', 'Services'),
+}
+MODEL_SECTIONS = {model: section for section, (model, *_rest) in SECTIONS.items()}
+
+# Fixed pages listed in sitemaps/pages.xml
+PAGE_URL_NAMES = (
+    'home', 'blogs', 'projects', 'services', 'support', 'contact', 'privacy_policy', 'terms_and_conditions',
+)
+
+CONTENT_TYPES = {
+    '.xml': 'application/xml; charset=utf-8',
+    '.rss': 'application/rss+xml; charset=utf-8',
+    '.atom': 'application/atom+xml; charset=utf-8',
+}
+PUBLISHED_NAME_RE = re.compile(
+    r'^(?:sitemap\.xml|sitemaps/pages\.xml|sitemaps/(?P<chunk_section>[a-z]+)-(?P<chunk>\d+)\.xml'
+    r'|feeds/(?P<feed_section>[a-z]+)\.(?:rss|atom))$'
+)
+
+
+def absolute_url(path):
+    return settings.SITE_URL.rstrip('/') + path
+
+
+def _path(name):
+    return os.path.join(settings.PUBLISHED_ROOT, *name.split('/'))
+
+
+def _write(name, content):
+    """Writes `name` and `name`.gz atomically, so a crawler never reads half a file."""
+    path = _path(name)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    for target, data in ((path, content), (path + '.gz', gzip.compress(content, mtime=0))):
+        temporary = f"{target}.tmp{os.getpid()}"
+        with open(temporary, 'wb') as handle:
+            handle.write(data)
+        os.replace(temporary, target)
+
+
+def _remove(name):
+    for target in (_path(name), _path(name) + '.gz'):
+        if os.path.exists(target):
+            os.remove(target)
+
+
+def _xml(root, entries):
+    """<urlset>/<sitemapindex> document; `entries` yields (loc, lastmod or None)."""
+    stream = BytesIO()
+    xml = SimplerXMLGenerator(stream, 'utf-8')
+    xml.startDocument()
+    xml.startElement(root, {'xmlns': SITEMAP_NS})
+    item = 'url' if root == 'urlset' else 'sitemap'
+    for loc, lastmod in entries:
+        xml.startElement(item, {})
+        xml.addQuickElement('loc', loc)
+        if lastmod:
+            xml.addQuickElement('lastmod', lastmod.isoformat(timespec='seconds'))
+        xml.endElement(item)
+    xml.endElement(root)
+    xml.endDocument()
+    return stream.getvalue()
+
+
+def _published(section):
+    model, flag, *_rest = SECTIONS[section]
+    return model.objects.filter(**{flag: True})
+
+
+def build_pages_sitemap():
+    _write('sitemaps/pages.xml', _xml('urlset', (
+        (absolute_url(reverse(f'mpgepmc_core:{name}')), None) for name in PAGE_URL_NAMES
+    )))
+
+
+def build_sitemap_chunk(section, chunk):
+    """Rewrites (or removes, if it's now empty) one id-range chunk. Returns its URL count."""
+    _model, _flag, lastmod_field, _date, url_name, *_rest = SECTIONS[section]
+    rows = list(
+        _published(section)
+        .filter(pk__gte=chunk * SITEMAP_CHUNK_SIZE, pk__lt=(chunk + 1) * SITEMAP_CHUNK_SIZE)
+        .order_by('pk').values_list('slug', lastmod_field)
+    )
+    name = f'sitemaps/{section}-{chunk}.xml'
+    if not rows:
+        _remove(name)
+        return 0
+    _write(name, _xml('urlset', (
+        (absolute_url(reverse(url_name, args=[slug])), lastmod) for slug, lastmod in rows
+    )))
+    return len(rows)
+
+
+def sitemap_chunks(section):
+    """{chunk number: newest lastmod} for a section's non-empty chunks, in one grouped query."""
+    lastmod_field = SECTIONS[section][2]
+    return dict(
+        _published(section).order_by()
+        .annotate(chunk=F('pk') / SITEMAP_CHUNK_SIZE)
+        .values_list('chunk')
+        .annotate(lastmod=Max(lastmod_field))
+        .values_list('chunk', 'lastmod')
+    )
+
+
+def build_sitemap_index():
+    entries = [(absolute_url('/sitemaps/pages.xml'), None)]
+    for section in SECTIONS:
+        for chunk, lastmod in sorted(sitemap_chunks(section).items()):
+            entries.append((absolute_url(f'/sitemaps/{section}-{chunk}.xml'), lastmod))
+    _write('sitemap.xml', _xml('sitemapindex', entries))
+
+
+def build_feeds(section):
+    """Writes feeds/<section>.rss and .atom with the latest FEED_ITEMS items."""
+    (_model, _flag, lastmod_field, date_field, url_name,
+     title_field, summary_field, label) = SECTIONS[section]
+    rows = list(
+        _published(section).order_by(f'-{date_field}')
+        .values_list('slug', title_field, summary_field, date_field, lastmod_field)[:FEED_ITEMS]
+    )
+    list_url = absolute_url(reverse(f'mpgepmc_core:{section}'))
+    for extension, feed_class in (('rss', feedgenerator.Rss201rev2Feed), ('atom', feedgenerator.Atom1Feed)):
+        feed = feed_class(
+            title=f"MPGEPMC {label}", link=list_url, description=f"The latest from MPGEPMC: {label.lower()}.",
+            language='en', feed_url=absolute_url(f'/feeds/{section}.{extension}'),
+        )
+        for slug, title, summary, published, updated in rows:
+            link = absolute_url(reverse(url_name, args=[slug]))
+            feed.add_item(title=title, link=link, description=summary or '', unique_id=link,
+                          pubdate=published, updateddate=updated)
+        _write(f'feeds/{section}.{extension}', feed.writeString('utf-8').encode('utf-8'))
+
+
+def rebuild_section(section):
+    """Every chunk of one section (dropping stale ones) plus its feeds. Returns the URL count."""
+    chunks = sitemap_chunks(section)
+    directory = _path('sitemaps')
+    if os.path.isdir(directory):
+        for filename in os.listdir(directory):
+            match = re.fullmatch(rf'{section}-(\d+)\.xml', filename)
+            if match and int(match.group(1)) not in chunks:
+                _remove(f'sitemaps/{filename}')
+    count = sum(build_sitemap_chunk(section, chunk) for chunk in chunks)
+    build_feeds(section)
+    return count
+
+
+def rebuild_published_files():
+    """Everything, from scratch. Returns {section: URLs in its sitemap}."""
+    build_pages_sitemap()
+    counts = {section: rebuild_section(section) for section in SECTIONS}
+    build_sitemap_index()
+    return counts
+
+
+def refresh_published_files(model, pk):
+    """After one item of `model` was saved or deleted: its chunk, its feeds and the index."""
+    section = MODEL_SECTIONS[model]
+    build_sitemap_chunk(section, pk // SITEMAP_CHUNK_SIZE)
+    build_feeds(section)
+    build_sitemap_index()
+
+
+def ensure_published_file(name):
+    """Full path of `name`, building it first if it's missing; None for an empty chunk."""
+    path = _path(name)
+    if os.path.isfile(path):
+        return path
+    match = PUBLISHED_NAME_RE.match(name)
+    if name == 'sitemap.xml':
+        build_sitemap_index()
+    elif name == 'sitemaps/pages.xml':
+        build_pages_sitemap()
+    elif match.group('chunk_section'):
+        build_sitemap_chunk(match.group('chunk_section'), int(match.group('chunk')))
+    else:
+        build_feeds(match.group('feed_section'))
+    return path if os.path.isfile(path) else None
+
+
+def serve_published_file(request, name):
+    """Serves a sitemap or feed file (see the module docstring)."""
+    match = PUBLISHED_NAME_RE.match(name)
+    section = match and (match.group('chunk_section') or match.group('feed_section'))
+    if not match or (section and section not in SECTIONS):
+        raise Http404("Not found.")
+    path = ensure_published_file(name)
+    if path is None:
+        raise Http404("Not found.")
+    return send_file(request, path, CACHE_CONTROL, content_type=CONTENT_TYPES[os.path.splitext(name)[1]])
@@ -130,3 +130,30 @@ class DonationVerificationForm(forms.ModelForm):
 
 
 
+
+
+class DonationReportForm(forms.Form):
+    """Date range for the donation dashboard in the admin (read from the rollups, see rollups.py)."""
+    # Longer daily reports are shown per month instead
+    MAX_DAILY_DAYS = 366
+
+    BY_CHOICES = [
+        ('day', 'Per day'),
+        ('month', 'Per month'),
+    ]
+
+    start = forms.DateField(label="From", widget=forms.DateInput(attrs={'type': 'date'}))
+    end = forms.DateField(label="To", widget=forms.DateInput(attrs={'type': 'date'}))
+    by = forms.ChoiceField(choices=BY_CHOICES, required=False, label="Group")
+
+    def clean(self):
+        cleaned_data = super().clean()
+        start, end = cleaned_data.get('start'), cleaned_data.get('end')
+        if start and end:
+            if end < start:
+                raise forms.ValidationError("The end date must not be before the start date.")
+            if not cleaned_data.get('by'):
+                cleaned_data['by'] = 'day' if (end - start).days < 62 else 'month'
+            elif cleaned_data['by'] == 'day' and (end - start).days >= self.MAX_DAILY_DAYS:
+                cleaned_data['by'] = 'month'
+        return cleaned_data
@@ -0,0 +1,271 @@
+# mpgepmc_core/management/commands/benchmark_asgi.py
+import asyncio
+import random
+import shutil
+import sys
+import tempfile
+import threading
+import time
+from io import BytesIO
+
+from django.conf import settings
+from django.core.asgi import get_asgi_application
+from django.core.management.base import BaseCommand
+from django.core.wsgi import get_wsgi_application
+from django.db import connections
+from django.db.backends.signals import connection_created
+from django.test import override_settings
+from django.urls import reverse
+
+from mpgepmc_core.benchmarking import percentiles, scratch_database, write_report
+from mpgepmc_core.models import MpgBlog, MpgService, Project
+from mpgepmc_core.synthetic import DEFAULT_SCALE, generate
+
+PER_PARENT_COUNTS = ('packages_per_service', 'features_per_package')
+HOST = 'testserver'
+
+
+class Command(BaseCommand):
+    help = (
+        "Generate a synthetic dataset on a scratch database, then send the same content-page "
+        "requests through the WSGI and the ASGI application (as mpgepmccom/wsgi.py and asgi.py "
+        "build them) at several levels of concurrency within this one process, and report "
+        "throughput, p50/p95/p99 latency and the threads each needed."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--scale', type=float, default=0.2,
+                            help="Multiplier for the default dataset size.")
+        parser.add_argument('--concurrency', type=int, nargs='+', default=[1, 8, 32],
+                            help="Requests in flight: WSGI worker threads, or ASGI tasks on one event loop.")
+        parser.add_argument('--requests', type=int, default=400, help="Requests per level and interface.")
+        parser.add_argument('--query-latency-ms', type=float, default=0.0,
+                            help="Add this much latency to every query, to model a database across the network.")
+        parser.add_argument('--no-page-cache', action='store_true',
+                            help="Measure the views themselves rather than page cache hits.")
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--output', help="Write the report as JSON to this path.")
+
+    def handle(self, *args, **options):
+        scale = {
+            name: default if name in PER_PARENT_COUNTS else max(1, int(default * options['scale']))
+            for name, default in DEFAULT_SCALE.items()
+        }
+        media_root = tempfile.mkdtemp(prefix='mpgepmc-bench-media-')
+        overrides = {
+            'ALLOWED_HOSTS': [*settings.ALLOWED_HOSTS, HOST],
+            'MEDIA_ROOT': media_root,
+            'PAGE_CACHE_ENABLED': settings.PAGE_CACHE_ENABLED and not options['no_page_cache'],
+            'REQUEST_METRICS_ENABLED': False,
+        }
+        latency = options['query_latency_ms'] / 1000
+
+        def slow_queries(execute, sql, params, many, context):
+            time.sleep(latency)
+            return execute(sql, params, many, context)
+
+        def add_latency(sender, connection, **kwargs):
+            # A thread's connection object is reopened for every request; wrap it once
+            if slow_queries not in connection.execute_wrappers:
+                connection.execute_wrappers.append(slow_queries)
+
+        try:
+            with scratch_database(), override_settings(**overrides):
+                self.stdout.write(f"Generating dataset: {scale}")
+                generate(scale, seed=options['seed'], published_files=False)
+                paths = self._paths(random.Random(options['seed']), options['requests'])
+                connections.close_all()
+                if latency:
+                    connection_created.connect(add_latency)
+                try:
+                    levels = [self._level(concurrency, paths) for concurrency in options['concurrency']]
+                finally:
+                    connection_created.disconnect(add_latency)
+        finally:
+            shutil.rmtree(media_root, ignore_errors=True)
+
+        report = {
+            'levels': levels,
+            'config': {
+                'dataset': scale,
+                'requests': options['requests'],
+                'query_latency_ms': options['query_latency_ms'],
+                'page_cache': overrides['PAGE_CACHE_ENABLED'],
+            },
+        }
+        self._print(report)
+        if options['output']:
+            write_report(report, options['output'])
+            self.stdout.write(f"Report written to {options['output']}")
+
+    def _paths(self, rng, count):
+        """`count` content-page URLs, spread over the list and detail views."""
+        def sample(queryset):
+            return list(queryset.values_list('slug', flat=True)[:200])
+
+        details = {
+            'mpgepmc_core:blog_detail': sample(MpgBlog.objects.filter(is_published=True).order_by('?')),
+            'mpgepmc_core:project_detail': sample(Project.objects.filter(is_published=True).order_by('?')),
+            'mpgepmc_core:service_detail': sample(MpgService.objects.filter(is_active=True).order_by('?')),
+        }
+        lists = [reverse(f'mpgepmc_core:{name}') for name in ('home', 'blogs', 'projects', 'services')]
+        paths = []
+        for n in range(count):
+            if n % 2:
+                paths.append(lists[n // 2 % len(lists)])
+            else:
+                name, slugs = rng.choice([(name, slugs) for name, slugs in details.items() if slugs])
+                paths.append(reverse(name, args=[rng.choice(slugs)]))
+        return paths
+
+    def _level(self, concurrency, paths):
+        wsgi = self._run_wsgi(get_wsgi_application(), paths, concurrency)
+        asgi = asyncio.run(self._run_asgi(get_asgi_application(), paths, concurrency))
+        return {'concurrency': concurrency, 'wsgi': wsgi, 'asgi': asgi}
+
+    def _run_wsgi(self, application, paths, concurrency):
+        """`concurrency` threads, as in a threaded WSGI worker, each serving one request at a time."""
+        for path in dict.fromkeys(paths):
+            wsgi_get(application, path)  # warm-up
+        pending = iter(paths)
+        lock = threading.Lock()
+        samples, errors, peak = [], [0], [threading.active_count()]
+
+        def worker():
+            while True:
+                with lock:
+                    path = next(pending, None)
+                if path is None:
+                    return
+                started = time.perf_counter()
+                status = wsgi_get(application, path)
+                elapsed = time.perf_counter() - started
+                with lock:
+                    samples.append(elapsed)
+                    errors[0] += status != 200
+                    peak[0] = max(peak[0], threading.active_count())
+
+        pool = [threading.Thread(target=worker) for _ in range(concurrency)]
+        started = time.perf_counter()
+        for thread in pool:
+            thread.start()
+        for thread in pool:
+            thread.join()
+        return _summary(samples, errors[0], time.perf_counter() - started, peak[0])
+
+    async def _run_asgi(self, application, paths, concurrency):
+        """`concurrency` tasks on one event loop; Django runs each request's queries off the loop."""
+        for path in dict.fromkeys(paths):
+            await asgi_get(application, path)  # warm-up
+        pending = iter(paths)
+        samples, errors, peak = [], [0], [threading.active_count()]
+
+        async def worker():
+            for path in pending:
+                started = time.perf_counter()
+                status = await asgi_get(application, path)
+                samples.append(time.perf_counter() - started)
+                errors[0] += status != 200
+                peak[0] = max(peak[0], threading.active_count())
+
+        started = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        return _summary(samples, errors[0], time.perf_counter() - started, peak[0])
+
+    def _print(self, report):
+        self.stdout.write(
+            f"{'in flight':>9} {'interface':>9} {'req/s':>8} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} "
+            f"{'threads':>8} {'errors':>7}"
+        )
+        errors = 0
+        for level in report['levels']:
+            for interface in ('wsgi', 'asgi'):
+                result = level[interface]
+                errors += result['errors']
+                self.stdout.write(
+                    f"{level['concurrency']:>9} {interface:>9} {result['throughput_rps']:>8} "
+                    f"{result['latency']['p50_ms']:>9} {result['latency']['p95_ms']:>9} "
+                    f"{result['latency']['p99_ms']:>9} {result['threads_peak']:>8} {result['errors']:>7}"
+                )
+        style = self.style.ERROR if errors else self.style.SUCCESS
+        self.stdout.write(style("Done."))
+
+
+def _summary(samples, errors, elapsed, threads_peak):
+    return {
+        'elapsed_s': round(elapsed, 3),
+        'throughput_rps': round(len(samples) / elapsed, 1) if elapsed else None,
+        'errors': errors,
+        'latency': percentiles(samples),
+        'threads_peak': threads_peak,
+    }
+
+
+def wsgi_get(application, path):
+    """One GET through a WSGI application, the way a WSGI server calls it. Returns the status code."""
+    environ = {
+        'REQUEST_METHOD': 'GET',
+        'SCRIPT_NAME': '',
+        'PATH_INFO': path,
+        'QUERY_STRING': '',
+        'SERVER_NAME': HOST,
+        'SERVER_PORT': '443',
+        'SERVER_PROTOCOL': 'HTTP/1.1',
+        'HTTP_HOST': HOST,
+        'REMOTE_ADDR': '127.0.0.1',
+        'wsgi.version': (1, 0),
+        'wsgi.url_scheme': 'https',
+        'wsgi.input': BytesIO(),
+        'wsgi.errors': sys.stderr,
+        'wsgi.multithread': True,
+        'wsgi.multiprocess': False,
+        'wsgi.run_once': False,
+    }
+    status = []
+
+    def start_response(line, headers, exc_info=None):
+        status.append(int(line.split(' ', 1)[0]))
+        return lambda data: None
+
+    response = application(environ, start_response)
+    try:
+        for _chunk in response:
+            pass
+    finally:
+        response.close()
+    return status[0]
+
+
+async def asgi_get(application, path):
+    """One GET through an ASGI application, the way an ASGI server calls it. Returns the status code."""
+    scope = {
+        'type': 'http',
+        'asgi': {'version': '3.0'},
+        'http_version': '1.1',
+        'method': 'GET',
+        'scheme': 'https',
+        'path': path,
+        'raw_path': path.encode(),
+        'query_string': b'',
+        'root_path': '',
+        'headers': [(b'host', HOST.encode())],
+        'client': ('127.0.0.1', 50000),
+        'server': (HOST, 443),
+    }
+    status = []
+    body_read = False
+
+    async def receive():
+        nonlocal body_read
+        if not body_read:
+            body_read = True
+            return {'type': 'http.request', 'body': b'', 'more_body': False}
+        # The client stays connected; Django stops listening once the response is sent
+        await asyncio.Event().wait()
+
+    async def send(message):
+        if message['type'] == 'http.response.start':
+            status.append(message['status'])
+
+    await application(scope, receive, send)
+    return status[0]
@@ -0,0 +1,109 @@
+# mpgepmc_core/management/commands/benchmark_order_numbers.py
+import threading
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import OperationalError, connection, connections
+
+from mpgepmc_core import models as core_models
+from mpgepmc_core.benchmarking import QueryCounter, percentiles, scratch_database, write_report
+from mpgepmc_core.models import Donation
+
+
+class Command(BaseCommand):
+    help = (
+        "Stress-test donation order number generation: many threads create donations "
+        "concurrently on a scratch database and we count collisions and INSERTs into the donation table per donation."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--threads', type=int, default=8)
+        parser.add_argument('--per-thread', type=int, default=250)
+        parser.add_argument('--length', type=int, default=None,
+                            help="Shrink the random part of the order number to force collisions "
+                                 "and exercise the retry path (e.g. --length 3).")
+        parser.add_argument('--output', help="Write the report as JSON to this path.")
+
+    def handle(self, *args, **options):
+        if options['length']:
+            core_models.ORDER_NUMBER_LENGTH = options['length']
+
+        with scratch_database():
+            report = self._run(options['threads'], options['per_thread'])
+
+        report['order_number_length'] = core_models.ORDER_NUMBER_LENGTH
+        for key in ('donations_created', 'unique_order_numbers', 'collisions_escaped',
+                    'lock_errors', 'insert_statements', 'inserts_per_donation',
+                    'precheck_selects', 'throughput_per_s'):
+            self.stdout.write(f"{key:>22}: {report[key]}")
+        self.stdout.write(f"{'latency':>22}: {report['latency']}")
+        if options['output']:
+            write_report(report, options['output'])
+            self.stdout.write(f"Report written to {options['output']}")
+
+        if report['collisions_escaped'] or report['unique_order_numbers'] != report['donations_created']:
+            self.stderr.write(self.style.ERROR("Order number collisions detected."))
+        else:
+            self.stdout.write(self.style.SUCCESS("Zero collisions."))
+
+    def _run(self, threads, per_thread):
+        counters = []
+        latencies = []
+        errors = {'integrity': 0, 'locked': 0}
+        lock = threading.Lock()
+        barrier = threading.Barrier(threads)
+
+        def worker():
+            counter = QueryCounter(table=Donation._meta.db_table)
+            samples = []
+            try:
+                with connection.execute_wrapper(counter):
+                    barrier.wait()
+                    for _ in range(per_thread):
+                        started = time.perf_counter()
+                        try:
+                            Donation.objects.create(amount=100, status=Donation.DonationStatus.PENDING)
+                        except OperationalError:
+                            with lock:
+                                errors['locked'] += 1
+                            continue
+                        except Exception:
+                            with lock:
+                                errors['integrity'] += 1
+                            continue
+                        samples.append(time.perf_counter() - started)
+            finally:
+                connection.close()
+            with lock:
+                counters.append(counter)
+                latencies.extend(samples)
+
+        pool = [threading.Thread(target=worker) for _ in range(threads)]
+        started = time.perf_counter()
+        for thread in pool:
+            thread.start()
+        for thread in pool:
+            thread.join()
+        elapsed = time.perf_counter() - started
+
+        connections.close_all()
+        created = Donation.objects.count()
+        unique = Donation.objects.values('donation_order_number').distinct().count()
+        # Only statements on the donation table: the rollup post_save upserts are not order numbers
+        inserts = sum(counter.counts.get('INSERT', 0) for counter in counters)
+        selects = sum(counter.counts.get('SELECT', 0) for counter in counters)
+        return {
+            'threads': threads,
+            'per_thread': per_thread,
+            'donations_created': created,
+            'unique_order_numbers': unique,
+            'collisions_escaped': errors['integrity'],
+            'lock_errors': errors['locked'],
+            'insert_statements': inserts,
+            'inserts_per_donation': round(inserts / created, 4) if created else None,
+            # SELECTs only happen on the collision path (to confirm which constraint failed)
+            'precheck_selects': selects,
+            'elapsed_s': round(elapsed, 3),
+            'throughput_per_s': round(created / elapsed, 1) if elapsed else None,
+            'latency': percentiles(latencies),
+        }
@@ -0,0 +1,167 @@
+# mpgepmc_core/management/commands/benchmark_sqlite.py
+import random
+import threading
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import OperationalError, close_old_connections, connection, connections, transaction
+
+from mpgepmc_core.benchmarking import percentiles, scratch_database, write_report
+from mpgepmc_core.models import Donation, MpgBlog
+from mpgepmc_core.sqlite import connection_status
+from mpgepmc_core.synthetic import DEFAULT_SCALE, generate
+
+PER_PARENT_COUNTS = ('packages_per_service', 'features_per_package')
+
+# Django's out-of-the-box SQLite setup (the journal mode is stored in the file, so set it back)
+DEFAULT_MODE = {
+    'OPTIONS': {'init_command': 'PRAGMA journal_mode=DELETE'},
+    'CONN_MAX_AGE': 0,
+    'CONN_HEALTH_CHECKS': False,
+}
+
+
+class Command(BaseCommand):
+    help = (
+        "Generate a synthetic dataset on a scratch database, then run concurrent readers (public "
+        "listing, checkout lookup, admin donation list) and writers (support page donations, admin "
+        "status changes) under Django's default SQLite setup and under SQLITE_PRODUCTION_SETTINGS, "
+        "and report read and write throughput, latency and 'database is locked' errors for each."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--scale', type=float, default=0.2,
+                            help="Multiplier for the default dataset size.")
+        parser.add_argument('--readers', type=int, default=8, help="Reader threads.")
+        parser.add_argument('--writers', type=int, default=4, help="Writer threads.")
+        parser.add_argument('--seconds', type=float, default=10.0, help="How long each mode runs.")
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--output', help="Write the report as JSON to this path.")
+
+    def handle(self, *args, **options):
+        scale = {
+            name: default if name in PER_PARENT_COUNTS else max(1, int(default * options['scale']))
+            for name, default in DEFAULT_SCALE.items()
+        }
+        settings_dict = connection.settings_dict
+        saved = {key: settings_dict.get(key) for key in DEFAULT_MODE}
+        modes = {}
+        try:
+            with scratch_database():
+                self.stdout.write(f"Generating dataset: {scale}")
+                generate(scale, seed=options['seed'], published_files=False)
+                donations = list(Donation.objects.values_list('pk', 'donation_order_number'))
+                for name, mode in (('default', DEFAULT_MODE), ('production', settings.SQLITE_PRODUCTION_SETTINGS)):
+                    connections.close_all()
+                    settings_dict.update(mode)
+                    status = connection_status()
+                    connections.close_all()
+                    self.stdout.write(f"Running {name}: {status}")
+                    modes[name] = {'connection': status, **self._run(donations, options)}
+        finally:
+            settings_dict.update(saved)
+
+        report = {
+            'modes': modes,
+            'config': {
+                'dataset': scale,
+                'readers': options['readers'],
+                'writers': options['writers'],
+                'seconds': options['seconds'],
+            },
+        }
+        self._print(report)
+        if options['output']:
+            write_report(report, options['output'])
+            self.stdout.write(f"Report written to {options['output']}")
+
+    def _run(self, donations, options):
+        """Every thread repeats its operations until the time is up, each one handled like a request."""
+        deadline = time.perf_counter() + options['seconds']
+        lock = threading.Lock()
+        samples = {'reads': [], 'writes': []}
+        errors = {'reads': 0, 'writes': 0}
+
+        def worker(kind, operation, seed):
+            rng = random.Random(seed)
+            try:
+                while time.perf_counter() < deadline:
+                    close_old_connections()  # request_started
+                    started = time.perf_counter()
+                    try:
+                        operation(rng, donations)
+                        failed = False
+                    except OperationalError:
+                        failed = True  # "database is locked"
+                    elapsed = time.perf_counter() - started
+                    close_old_connections()  # request_finished
+                    with lock:
+                        if failed:
+                            errors[kind] += 1
+                        else:
+                            samples[kind].append(elapsed)
+            finally:
+                connection.close()
+
+        threads = [
+            threading.Thread(target=worker, args=('reads', read, options['seed'] + n))
+            for n in range(options['readers'])
+        ] + [
+            threading.Thread(target=worker, args=('writes', write, options['seed'] + 1000 + n))
+            for n in range(options['writers'])
+        ]
+        started = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - started
+        return {
+            kind: {
+                'ops': len(samples[kind]),
+                'ops_per_s': round(len(samples[kind]) / elapsed, 1),
+                'errors': errors[kind],
+                'latency': percentiles(samples[kind]),
+            }
+            for kind in samples
+        }
+
+    def _print(self, report):
+        self.stdout.write(
+            f"{'mode':>10} {'kind':>6} {'ops/s':>8} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'errors':>7}"
+        )
+        for name, result in report['modes'].items():
+            for kind in ('reads', 'writes'):
+                stats = result[kind]
+                latency = stats['latency']
+                self.stdout.write(
+                    f"{name:>10} {kind:>6} {stats['ops_per_s']:>8} {latency.get('p50_ms', '-'):>9} "
+                    f"{latency.get('p95_ms', '-'):>9} {latency.get('p99_ms', '-'):>9} {stats['errors']:>7}"
+                )
+        errors = report['modes']['production']['reads']['errors'] + report['modes']['production']['writes']['errors']
+        style = self.style.ERROR if errors else self.style.SUCCESS
+        self.stdout.write(style("Done."))
+
+
+def read(rng, donations):
+    """One of: a blog listing page, the checkout page's donation lookup, the admin's pending donations."""
+    choice = rng.randrange(3)
+    if choice == 0:
+        list(MpgBlog.objects.filter(is_published=True).order_by('-posted_date', '-id')
+             .values('title', 'slug', 'posted_date')[:12])
+    elif choice == 1:
+        Donation.objects.filter(donation_order_number=rng.choice(donations)[1]).first()
+    else:
+        list(Donation.objects.filter(status=Donation.DonationStatus.PENDING).order_by('-created_at')[:50])
+
+
+def write(rng, donations):
+    """A new donation from the support page, or an admin changing one's status (read, then save, in one transaction)."""
+    if rng.randrange(2):
+        Donation.objects.create(amount=rng.randrange(500, 50000), status=Donation.DonationStatus.PENDING)
+        return
+    with transaction.atomic():
+        donation = Donation.objects.get(pk=rng.choice(donations)[0])
+        donation.status = rng.choice(Donation.DonationStatus.values)
+        donation.save()
@@ -0,0 +1,18 @@
+# mpgepmc_core/management/commands/build_related_index.py
+import time
+
+from django.core.management.base import BaseCommand
+
+from mpgepmc_core.related import INDEXED_MODELS, rebuild_related_index
+
+
+class Command(BaseCommand):
+    help = "Rebuild the precomputed related-content lists for blog posts and projects."
+
+    def handle(self, *args, **options):
+        for model in INDEXED_MODELS:
+            started = time.perf_counter()
+            count = rebuild_related_index(model)
+            elapsed = time.perf_counter() - started
+            self.stdout.write(f"{model._meta.verbose_name_plural}: {count} links in {elapsed:.2f}s")
+        self.stdout.write(self.style.SUCCESS("Related-content index rebuilt."))
@@ -0,0 +1,22 @@
+# mpgepmc_core/management/commands/build_sitemaps_and_feeds.py
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from mpgepmc_core.feeds import rebuild_published_files
+
+
+class Command(BaseCommand):
+    help = (
+        "Rebuild sitemap.xml, the per-section sitemap chunks and the RSS/Atom feeds "
+        "(with gzipped copies) under PUBLISHED_ROOT."
+    )
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        counts = rebuild_published_files()
+        elapsed = time.perf_counter() - started
+        for section, count in counts.items():
+            self.stdout.write(f"{section}: {count} URLs")
+        self.stdout.write(self.style.SUCCESS(f"Sitemaps and feeds written to {settings.PUBLISHED_ROOT} in {elapsed:.2f}s."))
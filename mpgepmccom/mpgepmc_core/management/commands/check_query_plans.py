@@ -0,0 +1,36 @@
+# mpgepmc_core/management/commands/check_query_plans.py
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+from mpgepmc_core.query_plans import check_query_plans
+
+
+class Command(BaseCommand):
+    help = (
+        "Run EXPLAIN QUERY PLAN on every hot view, catalog, outbox and admin query and fail if any "
+        "of them reads a whole table or sorts in a temp B-tree instead of using an index."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--verbose-plans', action='store_true',
+                            help="Print the full plan for every query, not just the failing ones.")
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'sqlite':
+            raise CommandError("check_query_plans reads SQLite's EXPLAIN QUERY PLAN output; "
+                               f"the default database is {connection.vendor}.")
+
+        failures = 0
+        for name, plan, problems in check_query_plans():
+            if problems:
+                failures += 1
+                self.stdout.write(self.style.ERROR(f"FAIL {name}: {'; '.join(problems)}"))
+            else:
+                self.stdout.write(f"ok   {name}")
+            if problems or options['verbose_plans']:
+                for step in plan:
+                    self.stdout.write(f"       {step}")
+
+        if failures:
+            raise CommandError(f"{failures} quer{'y' if failures == 1 else 'ies'} without a usable index.")
+        self.stdout.write(self.style.SUCCESS("Every hot query is served by an index."))
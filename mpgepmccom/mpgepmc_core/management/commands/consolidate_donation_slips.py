@@ -0,0 +1,30 @@
+# mpgepmc_core/management/commands/consolidate_donation_slips.py
+from django.core.management.base import BaseCommand
+
+from mpgepmc_core.models import Donation
+from mpgepmc_core.slips import consolidate_slips, refresh_reuse_flags
+
+
+class Command(BaseCommand):
+    help = (
+        "Move donation slips uploaded before content-addressed storage to their hash-based names, "
+        "keeping one copy of byte-identical slips, and flag donations that share a slip or a "
+        "transaction reference."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dry-run', action='store_true', help="Only report what would change.")
+
+    def handle(self, *args, **options):
+        stats = consolidate_slips(Donation, dry_run=options['dry_run'])
+        verb = "would be" if options['dry_run'] else "were"
+        self.stdout.write(
+            f"{stats['hashed']} slip(s) hashed: {stats['stored']} unique file(s) {verb} stored, "
+            f"{stats['removed']} old file(s) {verb} removed, {stats['missing']} missing."
+        )
+        if options['dry_run']:
+            return
+        slips, references = refresh_reuse_flags(Donation)
+        self.stdout.write(self.style.SUCCESS(
+            f"{slips} donation(s) share a slip, {references} share a transaction reference."
+        ))
@@ -0,0 +1,70 @@
+# mpgepmc_core/management/commands/export_records.py
+import datetime
+import os
+import sys
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from mpgepmc_core.exports import EXPORTS, FORMATS, export_stream, filtered_queryset
+from mpgepmc_core.models import Donation
+
+
+def _date(value):
+    try:
+        return datetime.date.fromisoformat(value)
+    except ValueError:
+        raise CommandError(f"Not a date (YYYY-MM-DD): {value}")
+
+
+class Command(BaseCommand):
+    help = (
+        "Stream donations or service requests to a CSV or JSON Lines file (or stdout), "
+        "optionally gzip-compressed, without loading them into memory."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('kind', choices=sorted(EXPORTS))
+        parser.add_argument('--format', choices=sorted(FORMATS), default='csv')
+        parser.add_argument('--gzip', action='store_true', help="Compress the output with gzip.")
+        parser.add_argument('--output', '-o', help="File to write; stdout if omitted.")
+        parser.add_argument('--since', type=_date, help="Only rows created on or after this local date.")
+        parser.add_argument('--until', type=_date, help="Only rows created on or before this local date.")
+        parser.add_argument('--status', choices=Donation.DonationStatus.values, help="Donations in this status only.")
+        parser.add_argument('--open', action='store_true', help="Unprocessed service requests only.")
+
+    def handle(self, *args, **options):
+        kind = options['kind']
+        if options['status'] and kind != 'donations':
+            raise CommandError("--status only applies to donations.")
+        if options['open'] and kind != 'service_requests':
+            raise CommandError("--open only applies to service requests.")
+        queryset = filtered_queryset(
+            kind, since=options['since'], until=options['until'], status=options['status'], open_only=options['open'],
+        )
+        blocks = export_stream(kind, queryset, options['format'], options['gzip'])
+
+        started = time.perf_counter()
+        output = options['output']
+        if not output:
+            written = self._write(blocks, sys.stdout.buffer)
+        else:
+            # Write next to the target and rename, so a reader never sees half an export
+            temporary = f"{output}.tmp{os.getpid()}"
+            try:
+                with open(temporary, 'wb') as handle:
+                    written = self._write(blocks, handle)
+                os.replace(temporary, output)
+            finally:
+                if os.path.exists(temporary):
+                    os.remove(temporary)
+        elapsed = time.perf_counter() - started
+        self.stderr.write(f"{kind}: {written:,} bytes written in {elapsed:.2f}s", style_func=self.style.SUCCESS)
+
+    def _write(self, blocks, handle):
+        written = 0
+        for block in blocks:
+            handle.write(block)
+            written += len(block)
+        handle.flush()
+        return written
@@ -0,0 +1,43 @@
+# mpgepmc_core/management/commands/export_static_site.py
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from mpgepmc_core.static_export import export_site
+
+
+class Command(BaseCommand):
+    help = (
+        "Render the read-only public pages (home, listings, blog posts, projects, services, legal pages) "
+        "to static HTML plus assets for nginx/CDN serving. Only pages whose data changed since the last "
+        "run are re-rendered."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--output', help=f"Export directory (default EXPORT_ROOT, {settings.EXPORT_ROOT}).")
+        parser.add_argument('--full', action='store_true', help="Ignore the manifest and render every page.")
+        parser.add_argument('--dry-run', action='store_true', help="Only list the pages that would change.")
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        result = export_site(root=options['output'], full=options['full'], dry_run=options['dry_run'],
+                             stdout=self.stdout if options['verbosity'] > 1 else None)
+        elapsed = time.perf_counter() - started
+
+        if options['dry_run']:
+            for path in result['rendered']:
+                self.stdout.write(f"would render {path}")
+            for path in result['removed']:
+                self.stdout.write(f"would remove {path}")
+            self.stdout.write(f"{result['unchanged']} page(s) unchanged.")
+            return
+
+        for path, status in result['failed']:
+            self.stderr.write(f"{path}: HTTP {status}")
+        self.stdout.write(
+            f"Rendered {len(result['rendered'])}, removed {len(result['removed'])}, "
+            f"unchanged {result['unchanged']}, copied {result['assets']} asset(s) in {elapsed:.1f}s."
+        )
+        if result['failed']:
+            raise CommandError(f"{len(result['failed'])} page(s) failed to render.")
@@ -0,0 +1,36 @@
+# mpgepmc_core/management/commands/generate_renditions.py
+from django.core.management.base import BaseCommand
+
+from mpgepmc_core.models import MpgBlog, MpgService, Project
+from mpgepmc_core.renditions import RENDITION_FORMATS, generate_renditions, ensure_renditions
+
+
+class Command(BaseCommand):
+    help = "Generate responsive WebP/AVIF renditions for blog, service and project images."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--force', action='store_true',
+                            help="Re-encode renditions even if they already exist.")
+
+    def handle(self, *args, **options):
+        self.stdout.write(f"Formats: {', '.join(RENDITION_FORMATS) or 'none available'}")
+        sources = (
+            (MpgBlog, 'feature_image'),
+            (MpgService, 'image'),
+            (Project, 'image'),
+        )
+        total = 0
+        for model, field_name in sources:
+            names = (
+                model.objects.exclude(**{field_name: ''})
+                .exclude(**{f'{field_name}__isnull': True})
+                .values_list(field_name, flat=True)
+            )
+            for name in names.iterator():
+                info = generate_renditions(name, force=True) if options['force'] else ensure_renditions(name)
+                if info is None:
+                    self.stderr.write(self.style.WARNING(f"Missing original: {name}"))
+                    continue
+                total += 1
+                self.stdout.write(f"  {name} ({info['width']}x{info['height']})")
+        self.stdout.write(self.style.SUCCESS(f"Renditions ready for {total} image(s)."))
@@ -0,0 +1,42 @@
+# mpgepmc_core/management/commands/generate_synthetic_data.py
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+from mpgepmc_core.synthetic import DEFAULT_SCALE, generate
+
+
+class Command(BaseCommand):
+    help = (
+        "Add realistic synthetic blogs, projects, services (with packages and features), "
+        "donations and service requests for load testing, then rebuild the search and related-content "
+        "indexes, donation totals, sitemaps and feeds. Donations point at slip files that don't exist. "
+        "Never run this against production."
+    )
+
+    def add_arguments(self, parser):
+        for name, default in DEFAULT_SCALE.items():
+            parser.add_argument(f"--{name.replace('_', '-')}", type=int, default=default,
+                                help=f"(default {default})")
+        parser.add_argument('--seed', type=int, help="Random seed, for reproducible datasets.")
+        parser.add_argument('--yes', action='store_true',
+                            help="Don't ask before writing to the configured database.")
+
+    def handle(self, *args, **options):
+        scale = {name: options[name] for name in DEFAULT_SCALE}
+        if any(value < 0 for value in scale.values()):
+            raise CommandError("Counts can't be negative.")
+
+        database = connection.settings_dict['NAME']
+        if not options['yes']:
+            answer = input(f"This adds {sum(scale.values())}+ rows to {database}. Continue? [y/N] ")
+            if answer.lower() not in ('y', 'yes'):
+                raise CommandError("Aborted.")
+
+        started = time.perf_counter()
+        created = generate(scale, seed=options['seed'], stdout=self.stdout)
+        elapsed = time.perf_counter() - started
+        self.stdout.write(self.style.SUCCESS(
+            f"Created {sum(created.values())} rows in {elapsed:.1f}s."
+        ))
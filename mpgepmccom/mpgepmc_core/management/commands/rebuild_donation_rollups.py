@@ -0,0 +1,37 @@
+# mpgepmc_core/management/commands/rebuild_donation_rollups.py
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from mpgepmc_core.rollups import rebuild_rollups, rollup_drift
+
+
+class Command(BaseCommand):
+    help = (
+        "Recompute the daily and monthly donation totals from the donations themselves "
+        "(backfill, or repair after bulk imports), or with --check only report buckets that differ."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--check', action='store_true',
+                            help="Compare the stored totals with the donations instead of rebuilding; "
+                                 "exits with an error if any bucket differs.")
+
+    def handle(self, *args, **options):
+        if options['check']:
+            drift = rollup_drift()
+            for table, period, status, stored, actual in drift:
+                self.stdout.write(
+                    f"{table} {period} {status}: stored {stored[0]} / {stored[1]}, actual {actual[0]} / {actual[1]}"
+                )
+            if drift:
+                raise CommandError(f"{len(drift)} donation total(s) are out of date; run rebuild_donation_rollups.")
+            self.stdout.write(self.style.SUCCESS("Donation totals match the donations."))
+            return
+
+        started = time.perf_counter()
+        daily, monthly = rebuild_rollups()
+        elapsed = time.perf_counter() - started
+        self.stdout.write(self.style.SUCCESS(
+            f"Donation totals rebuilt: {daily} daily and {monthly} monthly rows in {elapsed:.2f}s."
+        ))
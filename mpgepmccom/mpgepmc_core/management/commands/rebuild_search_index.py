@@ -0,0 +1,14 @@
+# mpgepmc_core/management/commands/rebuild_search_index.py
+from django.core.management.base import BaseCommand, CommandError
+
+from mpgepmc_core.search import is_available, rebuild_search_index
+
+
+class Command(BaseCommand):
+    help = "Rebuild the FTS5 site search index from scratch."
+
+    def handle(self, *args, **options):
+        if not is_available():
+            raise CommandError("Full-text search needs the SQLite database backend.")
+        count = rebuild_search_index()
+        self.stdout.write(self.style.SUCCESS(f"Indexed {count} document(s)."))
@@ -0,0 +1,212 @@
+# mpgepmc_core/management/commands/run_benchmarks.py
+import random
+import shutil
+import tempfile
+import threading
+import time
+
+from django.conf import settings
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test import Client, override_settings
+from django.urls import reverse
+
+from mpgepmc_core.benchmarking import QueryCounter, percentiles, scratch_database, write_report
+from mpgepmc_core.models import MpgBlog, MpgService, Project, ServicePackage
+from mpgepmc_core.synthetic import DEFAULT_SCALE, TOPICS, generate
+
+PER_PARENT_COUNTS = ('packages_per_service', 'features_per_package')
+
+SLIP = b'%PDF-1.4\n% benchmark transaction slip\n'
+
+
+class Command(BaseCommand):
+    help = (
+        "Generate a synthetic dataset on a scratch database, then drive every public page and "
+        "the donation flow from concurrent clients and report throughput and p50/p95/p99 latency."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--scale', type=float, default=1.0,
+                            help="Multiplier for the default dataset size.")
+        for name in DEFAULT_SCALE:
+            parser.add_argument(f"--{name.replace('_', '-')}", type=int,
+                                help="Override one dataset count, e.g. --blogs 50000.")
+        parser.add_argument('--threads', type=int, default=4)
+        parser.add_argument('--iterations', type=int, default=10,
+                            help="Passes over every route (plus one donation flow) per thread.")
+        parser.add_argument('--no-page-cache', action='store_true',
+                            help="Measure the views themselves rather than page cache hits.")
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--output', help="Write the report as JSON to this path.")
+
+    def handle(self, *args, **options):
+        # --scale grows the number of rows, not the shape of each service
+        scale = {
+            name: default if name in PER_PARENT_COUNTS else max(1, int(default * options['scale']))
+            for name, default in DEFAULT_SCALE.items()
+        }
+        scale.update({name: options[name] for name in DEFAULT_SCALE if options[name] is not None})
+        media_root = tempfile.mkdtemp(prefix='mpgepmc-bench-media-')
+        overrides = {
+            'ALLOWED_HOSTS': [*settings.ALLOWED_HOSTS, 'testserver'],
+            'MEDIA_ROOT': media_root,
+            'PAGE_CACHE_ENABLED': settings.PAGE_CACHE_ENABLED and not options['no_page_cache'],
+        }
+        try:
+            with scratch_database(), override_settings(**overrides):
+                self.stdout.write(f"Generating dataset: {scale}")
+                started = time.perf_counter()
+                created = generate(scale, seed=options['seed'], published_files=False)
+                generate_s = time.perf_counter() - started
+                report = self._run(options['threads'], options['iterations'], random.Random(options['seed']))
+        finally:
+            shutil.rmtree(media_root, ignore_errors=True)
+
+        report['dataset'] = created
+        report['generate_s'] = round(generate_s, 2)
+        report['config'] = {
+            'threads': options['threads'],
+            'iterations': options['iterations'],
+            'page_cache': overrides['PAGE_CACHE_ENABLED'],
+            'database': connection.vendor,
+        }
+        self._print(report)
+        if options['output']:
+            write_report(report, options['output'])
+            self.stdout.write(f"Report written to {options['output']}")
+
+    def _targets(self, rng):
+        """Every public GET route, with a random object for the detail pages."""
+        def sample(queryset):
+            return list(queryset.values_list('slug', flat=True)[:200]) or ['missing']
+
+        blogs = sample(MpgBlog.objects.filter(is_published=True).order_by('?'))
+        projects = sample(Project.objects.filter(is_published=True).order_by('?'))
+        services = sample(MpgService.objects.filter(is_active=True).order_by('?'))
+        packages = sample(ServicePackage.objects.filter(is_active=True, service__is_active=True).order_by('?'))
+        words = ' '.join(TOPICS.values()).split()
+
+        def url(name, *args):
+            return lambda: reverse(f'mpgepmc_core:{name}', args=[rng.choice(arg) for arg in args])
+
+        return {
+            'home': url('home'),
+            'blogs': url('blogs'),
+            'blog_detail': url('blog_detail', blogs),
+            'projects': url('projects'),
+            'project_detail': url('project_detail', projects),
+            'services': url('services'),
+            'service_detail': url('service_detail', services),
+            'request_service': url('request_service', services),
+            'checkout': url('checkout', packages),
+            'search': lambda: f"{reverse('mpgepmc_core:search')}?q={rng.choice(words)}",
+            'contact': url('contact'),
+            'thank_you': url('thank_you'),
+            'payment_success_page': url('payment_success_page'),
+            'privacy_policy': url('privacy_policy'),
+            'terms_and_conditions': url('terms_and_conditions'),
+        }
+
+    def _run(self, threads, iterations, rng):
+        targets = self._targets(rng)
+        samples = {}
+        errors = {}
+        queries = {}
+        lock = threading.Lock()
+        barrier = threading.Barrier(threads)
+
+        def worker():
+            client = Client(raise_request_exception=False)
+            counter = QueryCounter()
+            local_samples, local_errors, local_queries = {}, {}, {}
+
+            def timed(name, method, path, data=None, expect=200):
+                before = sum(counter.counts.values())
+                started = time.perf_counter()
+                response = getattr(client, method)(path, data, secure=True)
+                local_samples.setdefault(name, []).append(time.perf_counter() - started)
+                local_queries.setdefault(name, []).append(sum(counter.counts.values()) - before)
+                if response.status_code != expect:
+                    local_errors[name] = local_errors.get(name, 0) + 1
+                return response
+
+            try:
+                with connection.execute_wrapper(counter):
+                    barrier.wait()
+                    for _ in range(iterations):
+                        for name, target in targets.items():
+                            timed(name, 'get', target())
+                        flow_started = time.perf_counter()
+                        if self._donation_flow(timed):
+                            local_samples.setdefault('donation_flow', []).append(time.perf_counter() - flow_started)
+                        else:
+                            local_errors['donation_flow'] = local_errors.get('donation_flow', 0) + 1
+            finally:
+                connection.close()
+            with lock:
+                for name, values in local_samples.items():
+                    samples.setdefault(name, []).extend(values)
+                for name, values in local_queries.items():
+                    queries.setdefault(name, []).extend(values)
+                for name, count in local_errors.items():
+                    errors[name] = errors.get(name, 0) + count
+
+        pool = [threading.Thread(target=worker) for _ in range(threads)]
+        started = time.perf_counter()
+        for thread in pool:
+            thread.start()
+        for thread in pool:
+            thread.join()
+        elapsed = time.perf_counter() - started
+
+        requests = sum(len(values) for name, values in samples.items() if name != 'donation_flow')
+        every_sample = [value for name, values in samples.items() if name != 'donation_flow' for value in values]
+        routes = {}
+        for name in sorted(samples):
+            route = percentiles(samples[name])
+            route['errors'] = errors.get(name, 0)
+            if name in queries:
+                route['queries_mean'] = round(sum(queries[name]) / len(queries[name]), 2)
+            routes[name] = route
+        return {
+            'elapsed_s': round(elapsed, 3),
+            'requests': requests,
+            'throughput_rps': round(requests / elapsed, 1) if elapsed else None,
+            'errors': sum(errors.values()),
+            'latency': percentiles(every_sample),
+            'routes': routes,
+        }
+
+    def _donation_flow(self, timed):
+        """support_page -> donation_checkout_page -> donation_success_page, as a donor would."""
+        timed('support (GET)', 'get', reverse('mpgepmc_core:support'))
+        response = timed('support (POST)', 'post', reverse('mpgepmc_core:support'),
+                         {'amount': '2500', 'payment_method': 'bank_transfer'}, expect=302)
+        if response.status_code != 302:
+            return False
+        checkout_url = response['Location']
+        timed('donation_checkout (GET)', 'get', checkout_url)
+        response = timed('donation_checkout (POST)', 'post', checkout_url, {
+            'full_name': 'Benchmark Donor', 'email': 'donor@example.com', 'transaction_id': 'TX-BENCH',
+            'transaction_slip': SimpleUploadedFile('slip.pdf', SLIP, content_type='application/pdf'),
+        }, expect=302)
+        if response.status_code != 302:
+            return False
+        timed('donation_success', 'get', response['Location'])
+        return True
+
+    def _print(self, report):
+        self.stdout.write(f"{'route':<26} {'n':>6} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'queries':>8} {'errors':>7}")
+        for name, route in report['routes'].items():
+            self.stdout.write(
+                f"{name:<26} {route['count']:>6} {route['p50_ms']:>9} {route['p95_ms']:>9} {route['p99_ms']:>9} "
+                f"{route.get('queries_mean', ''):>8} {route['errors']:>7}"
+            )
+        self.stdout.write(
+            f"{report['requests']} requests in {report['elapsed_s']}s = {report['throughput_rps']} req/s, "
+            f"{report['errors']} error(s), overall {report['latency']}"
+        )
+        style = self.style.ERROR if report['errors'] else self.style.SUCCESS
+        self.stdout.write(style("Done."))
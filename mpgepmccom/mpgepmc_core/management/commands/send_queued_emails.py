@@ -0,0 +1,30 @@
+# mpgepmc_core/management/commands/send_queued_emails.py
+import time
+
+from django.core.management.base import BaseCommand
+
+from mpgepmc_core.outbox import send_due_emails
+
+
+class Command(BaseCommand):
+    help = "Deliver queued emails from the outbox over a single SMTP connection per run."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=None,
+                            help="Emails claimed per batch (default: EMAIL_OUTBOX_BATCH_SIZE).")
+        parser.add_argument('--loop', action='store_true',
+                            help="Keep running and poll the outbox until interrupted.")
+        parser.add_argument('--interval', type=float, default=5.0,
+                            help="Seconds to sleep between polls in --loop mode.")
+
+    def handle(self, *args, **options):
+        while True:
+            sent, failed = send_due_emails(batch_size=options['batch_size'])
+            if sent or failed or not options['loop']:
+                self.stdout.write(f"Sent {sent}, failed {failed}.")
+            if not options['loop']:
+                break
+            try:
+                time.sleep(options['interval'])
+            except KeyboardInterrupt:
+                break
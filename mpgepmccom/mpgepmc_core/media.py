@@ -0,0 +1,191 @@
+# mpgepmc_core/media.py
+"""
+Delivery of uploaded files under MEDIA_URL, in production as well as DEBUG.
+
+Public images (blog, service and project uploads and their renditions) have
+a random hash in every file name, so a name never points at different bytes
+and they are sent with a one-year `immutable` Cache-Control. Everything else
+(donation slips) is private: only staff who can view donations get it, with
+`private, no-store`, and anyone else gets a 404 so slip names can't be probed.
+
+Responses support conditional GET (ETag / Last-Modified from the file's
+stat), single `Range: bytes=...` requests (206 / 416), and precompressed
+`.br` / `.gz` siblings for compressible types when the client accepts them.
+
+With MEDIA_SENDFILE set to 'x-accel-redirect' (nginx) or 'x-sendfile'
+(Apache, lighttpd) Django only does the checks above and hands the file to
+the web server, which then streams it and handles ranges itself. Public
+images can equally be served by the web server straight from MEDIA_ROOT,
+bypassing Django entirely.
+"""
+import mimetypes
+import os
+import re
+
+from django.conf import settings
+from django.core.exceptions import SuspiciousFileOperation
+from django.http import FileResponse, Http404, HttpResponse, StreamingHttpResponse
+from django.utils._os import safe_join
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date
+
+# Upload directories anyone may read; see the *_upload_path functions in models.py.
+PUBLIC_MEDIA_DIRS = tuple(getattr(settings, 'MEDIA_PUBLIC_DIRS', ('mpgblog_images', 'mpgservice_images', 'project_images')))
+
+PUBLIC_CACHE_CONTROL = 'public, max-age=31536000, immutable'
+PRIVATE_CACHE_CONTROL = 'private, no-store'
+
+# Only worth looking for a precompressed sibling for types that actually compress.
+COMPRESSIBLE_TYPES = (
+    'text/', 'image/svg+xml', 'application/json', 'application/javascript', 'application/xml',
+    'application/rss+xml', 'application/atom+xml',
+)
+ENCODINGS = (('br', '.br'), ('gzip', '.gz'))
+
+CHUNK_SIZE = 64 * 1024
+RANGE_RE = re.compile(r'^bytes=(\d*)-(\d*)$')
+
+
+class RangeNotSatisfiable(Exception):
+    pass
+
+
+def is_public(path):
+    return path.split('/', 1)[0] in PUBLIC_MEDIA_DIRS
+
+
+def can_view_private_media(user):
+    return user.is_active and user.is_staff and user.has_perm('mpgepmc_core.view_donation')
+
+
+def parse_range(header, size):
+    """
+    (start, end), inclusive, for a single byte range; None to send the whole
+    file (no header, or several ranges, which we don't split into multipart).
+    """
+    match = RANGE_RE.match(header.strip()) if header else None
+    if not match:
+        return None
+    first, last = match.groups()
+    if not first and not last:
+        return None
+    if not first:  # "bytes=-500": the last 500 bytes
+        length = int(last)
+        if not length or not size:
+            raise RangeNotSatisfiable
+        return max(size - length, 0), size - 1
+    start = int(first)
+    end = min(int(last), size - 1) if last else size - 1
+    if start >= size or start > end:
+        raise RangeNotSatisfiable
+    return start, end
+
+
+def _accepted_encodings(request):
+    accepted = set()
+    for item in request.headers.get('Accept-Encoding', '').split(','):
+        coding, _, params = item.strip().partition(';')
+        if params.replace(' ', '') not in ('q=0', 'q=0.0', 'q=0.00', 'q=0.000'):
+            accepted.add(coding.strip().lower())
+    return accepted
+
+
+def _representation(request, full_path, content_type):
+    """(path to send, Content-Encoding or None): a precompressed sibling if there is a usable one."""
+    if content_type.startswith(COMPRESSIBLE_TYPES) and 'Range' not in request.headers:
+        accepted = _accepted_encodings(request)
+        for coding, suffix in ENCODINGS:
+            if coding in accepted and os.path.isfile(full_path + suffix):
+                return full_path + suffix, coding
+    return full_path, None
+
+
+def _file_chunks(full_path, start, length):
+    with open(full_path, 'rb') as handle:
+        handle.seek(start)
+        remaining = length
+        while remaining > 0:
+            chunk = handle.read(min(CHUNK_SIZE, remaining))
+            if not chunk:
+                break
+            remaining -= len(chunk)
+            yield chunk
+
+
+def _handoff(full_path, mode):
+    response = HttpResponse()
+    if mode == 'x-accel-redirect':
+        name = os.path.relpath(full_path, settings.MEDIA_ROOT).replace(os.sep, '/')
+        response['X-Accel-Redirect'] = settings.MEDIA_ACCEL_REDIRECT_PREFIX.rstrip('/') + '/' + name
+    else:
+        response['X-Sendfile'] = full_path
+    return response
+
+
+def _file_response(request, full_path, size, etag, last_modified):
+    try:
+        byte_range = parse_range(request.headers.get('Range'), size)
+    except RangeNotSatisfiable:
+        response = HttpResponse(status=416)
+        response['Content-Range'] = f"bytes */{size}"
+        return response
+
+    # If-Range: only honour the range if the client's copy is still this file
+    if_range = request.headers.get('If-Range')
+    if byte_range and if_range and if_range not in (etag, http_date(last_modified)):
+        byte_range = None
+
+    if byte_range is None:
+        response = FileResponse(open(full_path, 'rb'))
+    else:
+        start, end = byte_range
+        response = StreamingHttpResponse(_file_chunks(full_path, start, end - start + 1), status=206)
+        response['Content-Length'] = str(end - start + 1)
+        response['Content-Range'] = f"bytes {start}-{end}/{size}"
+    response['Accept-Ranges'] = 'bytes'
+    return response
+
+
+def send_file(request, full_path, cache_control, content_type=None, handoff=False):
+    """
+    The response for an existing file: 304, 206/416 for ranges, or the whole
+    (possibly precompressed) file. With `handoff`, a file under MEDIA_ROOT is
+    passed to the web server when MEDIA_SENDFILE is set.
+    """
+    content_type = content_type or mimetypes.guess_type(full_path)[0] or 'application/octet-stream'
+    send_path, encoding = _representation(request, full_path, content_type)
+    stat = os.stat(send_path)
+    etag = f'"{int(stat.st_mtime):x}-{stat.st_size:x}{"-" + encoding if encoding else ""}"'
+    last_modified = int(stat.st_mtime)
+
+    response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+    mode = getattr(settings, 'MEDIA_SENDFILE', None)
+    if response is None and handoff and mode:
+        response = _handoff(send_path, mode)
+    elif response is None:
+        response = _file_response(request, send_path, stat.st_size, etag, last_modified)
+
+    if response.status_code != 416:
+        response['Content-Type'] = content_type
+    if encoding:
+        response['Content-Encoding'] = encoding
+    if content_type.startswith(COMPRESSIBLE_TYPES):
+        response['Vary'] = 'Accept-Encoding'
+    response['ETag'] = etag
+    response['Last-Modified'] = http_date(last_modified)
+    response['Cache-Control'] = cache_control
+    return response
+
+
+def serve_media(request, path):
+    """Serves MEDIA_ROOT/`path`; see the module docstring for the rules."""
+    try:
+        full_path = safe_join(settings.MEDIA_ROOT, path)
+    except SuspiciousFileOperation:
+        raise Http404("Not found.")
+    public = is_public(path)
+    if not public and not can_view_private_media(request.user):
+        raise Http404("Not found.")
+    if not os.path.isfile(full_path):
+        raise Http404("Not found.")
+    return send_file(request, full_path, PUBLIC_CACHE_CONTROL if public else PRIVATE_CACHE_CONTROL, handoff=True)
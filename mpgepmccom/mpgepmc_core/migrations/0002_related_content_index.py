@@ -0,0 +1,48 @@
+# Generated by Django 5.2.18 on 2026-10-16 23:01
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('mpgepmc_core', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RelatedBlog',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('rank', models.PositiveSmallIntegerField()),
+                ('score', models.FloatField()),
+                ('source', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='related_links', to='mpgepmc_core.mpgblog')),
+                ('target', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='related_from', to='mpgepmc_core.mpgblog')),
+            ],
+            options={
+                'verbose_name': 'Related Blog Post',
+                'verbose_name_plural': 'Related Blog Posts',
+                'ordering': ['rank'],
+                'abstract': False,
+                'unique_together': {('source', 'rank')},
+            },
+        ),
+        migrations.CreateModel(
+            name='RelatedProject',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('rank', models.PositiveSmallIntegerField()),
+                ('score', models.FloatField()),
+                ('source', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='related_links', to='mpgepmc_core.project')),
+                ('target', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='related_from', to='mpgepmc_core.project')),
+            ],
+            options={
+                'verbose_name': 'Related Project',
+                'verbose_name_plural': 'Related Projects',
+                'ordering': ['rank'],
+                'abstract': False,
+                'unique_together': {('source', 'rank')},
+            },
+        ),
+    ]
@@ -0,0 +1,63 @@
+# FTS5 full-text index for site search (see mpgepmc_core/search.py)
+#
+# The DDL and the backfill are spelled out here rather than imported from
+# search.py, so later changes to search.py don't change what this migration does.
+
+from django.db import migrations
+from django.utils.html import strip_tags
+
+TABLE = 'mpgepmc_core_searchindex'
+ROWID_STRIDE = 8
+
+# kind -> (model, code used in the rowid, title field, text fields, published flag)
+INDEXED = {
+    'blog': ('MpgBlog', 1, 'title', ('short_summary', 'content'), 'is_published'),
+    'project': ('Project', 2, 'title', ('short_description', 'full_description'), 'is_published'),
+    'service': ('MpgService', 3, 'name', ('short_description', 'full_description'), 'is_active'),
+}
+
+
+def create_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    schema_editor.execute(
+        f"CREATE VIRTUAL TABLE IF NOT EXISTS {TABLE} USING fts5("
+        "kind UNINDEXED, object_id UNINDEXED, slug UNINDEXED, published UNINDEXED, "
+        "title, body, tokenize = 'porter unicode61 remove_diacritics 2')"
+    )
+    using = schema_editor.connection.alias
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute(f"DELETE FROM {TABLE}")
+        for kind, (model_name, code, title_field, text_fields, flag_field) in INDEXED.items():
+            model = apps.get_model('mpgepmc_core', model_name)
+            rows = model._default_manager.using(using).values('id', 'slug', title_field, flag_field, *text_fields)
+            documents = []
+            for values in rows.iterator(chunk_size=500):
+                body = ' '.join(strip_tags(values[field] or '') for field in text_fields)
+                documents.append((
+                    values['id'] * ROWID_STRIDE + code, kind, values['id'], values['slug'] or '',
+                    1 if values[flag_field] else 0, values[title_field], ' '.join(body.split()),
+                ))
+            cursor.executemany(
+                f"INSERT INTO {TABLE} (rowid, kind, object_id, slug, published, title, body) "
+                f"VALUES (%s, %s, %s, %s, %s, %s, %s)",
+                documents,
+            )
+        cursor.execute(f"INSERT INTO {TABLE}({TABLE}) VALUES ('optimize')")
+
+
+def drop_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    schema_editor.execute(f"DROP TABLE IF EXISTS {TABLE}")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('mpgepmc_core', '0002_related_content_index'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
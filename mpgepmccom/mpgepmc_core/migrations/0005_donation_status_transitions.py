@@ -0,0 +1,32 @@
+# Generated by Django 5.2.18 on 2026-10-16 23:05
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('mpgepmc_core', '0004_email_outbox'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DonationStatusTransition',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('from_status', models.CharField(choices=[('PENDING', 'Pending User Action'), ('AWAITING_VERIFICATION', 'Awaiting Verification'), ('COMPLETED', 'Completed'), ('FAILED', 'Failed')], max_length=30)),
+                ('to_status', models.CharField(choices=[('PENDING', 'Pending User Action'), ('AWAITING_VERIFICATION', 'Awaiting Verification'), ('COMPLETED', 'Completed'), ('FAILED', 'Failed')], max_length=30)),
+                ('changed_at', models.DateTimeField(auto_now_add=True)),
+                ('changed_by', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to=settings.AUTH_USER_MODEL)),
+                ('donation', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='status_transitions', to='mpgepmc_core.donation')),
+            ],
+            options={
+                'verbose_name': 'Donation Status Change',
+                'verbose_name_plural': 'Donation Status Changes',
+                'ordering': ['-changed_at'],
+            },
+        ),
+    ]
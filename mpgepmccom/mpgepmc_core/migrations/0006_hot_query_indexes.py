@@ -0,0 +1,45 @@
+# Generated by Django 5.2.18 on 2026-10-16 23:19
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('mpgepmc_core', '0005_donation_status_transitions'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='donation',
+            index=models.Index(fields=['status', 'created_at'], name='donation_status_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='mpgblog',
+            index=models.Index(condition=models.Q(('is_published', True)), fields=['posted_date'], name='blog_published_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='mpgservice',
+            index=models.Index(condition=models.Q(('is_active', True)), fields=['created_at'], name='service_active_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='project',
+            index=models.Index(condition=models.Q(('is_published', True)), fields=['posted_date'], name='project_published_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='project',
+            index=models.Index(condition=models.Q(('is_published', True)), fields=['category', 'posted_date'], name='project_category_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='servicepackage',
+            index=models.Index(fields=['service', 'is_active', 'order'], name='package_service_active_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='servicerequest',
+            index=models.Index(fields=['request_date'], name='servicerequest_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='servicerequest',
+            index=models.Index(condition=models.Q(('is_processed', False)), fields=['request_date'], name='servicerequest_open_idx'),
+        ),
+    ]
@@ -0,0 +1,55 @@
+# Content-addressed donation slips and reused-receipt flags (see mpgepmc_core/slips.py)
+
+from django.db import migrations, models
+
+
+def backfill_references(apps, schema_editor):
+    # Slip hashes need the files; `consolidate_donation_slips` fills those in
+    from mpgepmc_core.slips import normalise_reference, refresh_reuse_flags
+
+    Donation = apps.get_model('mpgepmc_core', 'Donation')
+    using = schema_editor.connection.alias
+    donations = list(Donation.objects.using(using).exclude(transaction_id='').only('transaction_id'))
+    for donation in donations:
+        donation.transaction_reference = normalise_reference(donation.transaction_id)
+    Donation.objects.using(using).bulk_update(donations, ['transaction_reference'], batch_size=500)
+    refresh_reuse_flags(Donation, using=using)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('mpgepmc_core', '0006_hot_query_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='donation',
+            name='reference_reused',
+            field=models.BooleanField(default=False, editable=False, help_text='Another donation was submitted with the same transaction reference.'),
+        ),
+        migrations.AddField(
+            model_name='donation',
+            name='slip_reused',
+            field=models.BooleanField(default=False, editable=False, help_text='Another donation was submitted with a byte-identical slip.'),
+        ),
+        migrations.AddField(
+            model_name='donation',
+            name='slip_sha256',
+            field=models.CharField(blank=True, default='', editable=False, max_length=64, verbose_name='Slip SHA-256'),
+        ),
+        migrations.AddField(
+            model_name='donation',
+            name='transaction_reference',
+            field=models.CharField(blank=True, default='', editable=False, help_text='The transaction id, upper-cased, without spaces or separators.', max_length=100),
+        ),
+        migrations.AddIndex(
+            model_name='donation',
+            index=models.Index(fields=['slip_sha256'], name='donation_slip_sha256_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='donation',
+            index=models.Index(fields=['transaction_reference'], name='donation_reference_idx'),
+        ),
+        migrations.RunPython(backfill_references, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,26 @@
+# Generated by Django 5.2.18 on 2026-10-16 23:42
+
+import django.db.models.functions.text
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('mpgepmc_core', '0007_donation_slip_dedup'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='donation',
+            index=models.Index(fields=['created_at'], name='donation_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='donation',
+            index=models.Index(django.db.models.functions.text.Lower('email'), name='donation_email_lower_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='servicerequest',
+            index=models.Index(django.db.models.functions.text.Lower('user_email'), name='servicerequest_email_lower_idx'),
+        ),
+    ]
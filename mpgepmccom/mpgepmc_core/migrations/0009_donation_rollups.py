@@ -0,0 +1,74 @@
+# Daily and monthly donation totals per status (see mpgepmc_core/rollups.py)
+
+from collections import defaultdict
+from decimal import Decimal
+
+from django.db import migrations, models
+from django.db.models import Count, Sum
+from django.db.models.functions import TruncDate
+
+
+def backfill_rollups(apps, schema_editor):
+    Donation = apps.get_model('mpgepmc_core', 'Donation')
+    DonationDailyRollup = apps.get_model('mpgepmc_core', 'DonationDailyRollup')
+    DonationMonthlyRollup = apps.get_model('mpgepmc_core', 'DonationMonthlyRollup')
+    using = schema_editor.connection.alias
+    rows = (
+        Donation.objects.using(using).annotate(day=TruncDate('created_at')).order_by()
+        .values_list('day', 'status').annotate(count=Count('pk'), amount=Sum('amount'))
+    )
+    daily, monthly = [], defaultdict(lambda: [0, Decimal(0)])
+    for day, status, count, amount in rows:
+        daily.append(DonationDailyRollup(day=day, status=status, count=count, amount=amount))
+        bucket = monthly[day.replace(day=1), status]
+        bucket[0] += count
+        bucket[1] += amount
+    DonationDailyRollup.objects.using(using).bulk_create(daily, batch_size=500)
+    DonationMonthlyRollup.objects.using(using).bulk_create(
+        [DonationMonthlyRollup(month=month, status=status, count=count, amount=amount)
+         for (month, status), (count, amount) in monthly.items()],
+        batch_size=500,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('mpgepmc_core', '0008_admin_scale_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DonationDailyRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('status', models.CharField(choices=[('PENDING', 'Pending User Action'), ('AWAITING_VERIFICATION', 'Awaiting Verification'), ('COMPLETED', 'Completed'), ('FAILED', 'Failed')], max_length=30)),
+                ('count', models.IntegerField(default=0)),
+                ('amount', models.DecimalField(decimal_places=2, default=0, max_digits=16)),
+                ('day', models.DateField(help_text='Local date the donations were created.')),
+            ],
+            options={
+                'verbose_name': 'Daily Donation Total',
+                'verbose_name_plural': 'Daily Donation Totals',
+                'ordering': ['-day', 'status'],
+                'constraints': [models.UniqueConstraint(fields=('day', 'status'), name='donation_daily_rollup_unique')],
+            },
+        ),
+        migrations.CreateModel(
+            name='DonationMonthlyRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('status', models.CharField(choices=[('PENDING', 'Pending User Action'), ('AWAITING_VERIFICATION', 'Awaiting Verification'), ('COMPLETED', 'Completed'), ('FAILED', 'Failed')], max_length=30)),
+                ('count', models.IntegerField(default=0)),
+                ('amount', models.DecimalField(decimal_places=2, default=0, max_digits=16)),
+                ('month', models.DateField(help_text='First day of the month the donations were created.')),
+            ],
+            options={
+                'verbose_name': 'Monthly Donation Total',
+                'verbose_name_plural': 'Monthly Donation Totals',
+                'ordering': ['-month', 'status'],
+                'constraints': [models.UniqueConstraint(fields=('month', 'status'), name='donation_monthly_rollup_unique')],
+            },
+        ),
+        migrations.RunPython(backfill_rollups, migrations.RunPython.noop),
+    ]
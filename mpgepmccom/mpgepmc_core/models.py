@@ -1,12 +1,16 @@
 # mpgepmc_core/models.py
 import os
 import uuid
-from django.db import models
+from django.conf import settings
+from django.db import IntegrityError, models, transaction
+from django.db.models.functions import Lower
 from django.utils.text import slugify
 from django.utils import timezone
 from django.core.validators import FileExtensionValidator
-import random # ⭐️ Import the random module
+import secrets # ⭐️ Import the secrets module (OS randomness, safe across forked workers)
 import string # ⭐️ Import the string module
+from .tracking import ChangeTrackingMixin # ⭐️ Saves write only the columns that changed
+from .slips import flag_matches, normalise_reference, release_slip, restore_slip, reuse_flags, store_slip
 
 
 # Custom upload path for Project images
@@ -21,7 +25,7 @@ def project_image_upload_path(instance, filename):
     new_filename = f"{sanitized_title}-{unique_hash}.{ext}"
     return os.path.join('project_images', new_filename)
 
-class Project(models.Model):
+class Project(ChangeTrackingMixin, models.Model):
     """
     Represents a single welfare or development project.
     """
@@ -52,6 +56,11 @@ class Project(models.Model):
         verbose_name = "Welfare Project"
         verbose_name_plural = "Welfare Projects"
         ordering = ['-posted_date']
+        indexes = [
+            # Listing, keyset pages and category filter: WHERE is_published ORDER BY posted_date, id
+            models.Index(fields=['posted_date'], condition=models.Q(is_published=True), name='project_published_date_idx'),
+            models.Index(fields=['category', 'posted_date'], condition=models.Q(is_published=True), name='project_category_date_idx'),
+        ]
 
     def __str__(self):
         return self.title
@@ -66,7 +75,7 @@ class Project(models.Model):
 
 
 # ⭐️ NEW MODEL FOR BANK ACCOUNT DETAILS ⭐️
-class BankAccount(models.Model):
+class BankAccount(ChangeTrackingMixin, models.Model):
     account_title = models.CharField(max_length=200)
     account_number = models.CharField(max_length=50)
     bank_name = models.CharField(max_length=100)
@@ -81,6 +90,20 @@ class BankAccount(models.Model):
         return f"{self.account_title} - {self.bank_name}"
 
 
+ORDER_NUMBER_PREFIX = "MPGepmc-"
+ORDER_NUMBER_ALPHABET = string.ascii_uppercase + string.digits
+ORDER_NUMBER_LENGTH = 6
+# 36^6 ≈ 2.2 billion candidates, so even one retry is rare; this only bounds the worst case.
+ORDER_NUMBER_ATTEMPTS = 10
+
+
+def generate_order_number(length=None):
+    """A human-friendly order number such as 'MPGepmc-7K2Q9D'."""
+    random_id = ''.join(secrets.choice(ORDER_NUMBER_ALPHABET) for _ in range(length or ORDER_NUMBER_LENGTH))
+    return f"{ORDER_NUMBER_PREFIX}{random_id}"
+
+
+# Only used by migrations now: new slips are stored by content (see slips.py)
 def donation_slip_upload_path(instance, filename):
     ext = filename.split('.')[-1]
     unique_id = instance.donation_order_number or uuid.uuid4().hex[:10]
@@ -91,7 +114,7 @@ def donation_slip_upload_path(instance, filename):
 # -----------------------------------------------------
 # ⭐️ CORRECTED DONATION MODEL ⭐️
 # -----------------------------------------------------
-class Donation(models.Model):
+class Donation(ChangeTrackingMixin, models.Model):
     class DonationStatus(models.TextChoices):
         PENDING = 'PENDING', 'Pending User Action'
         AWAITING_VERIFICATION = 'AWAITING_VERIFICATION', 'Awaiting Verification'
@@ -116,38 +139,161 @@ class Donation(models.Model):
         validators=[FileExtensionValidator(allowed_extensions=['jpg', 'jpeg', 'png', 'pdf'])]
     )
 
+    # ⭐️ Reused-receipt checks (see slips.py) ⭐️
+    slip_sha256 = models.CharField(max_length=64, blank=True, default='', editable=False,
+                                   verbose_name="Slip SHA-256")
+    transaction_reference = models.CharField(max_length=100, blank=True, default='', editable=False,
+                                             help_text="The transaction id, upper-cased, without spaces or separators.")
+    slip_reused = models.BooleanField(default=False, editable=False,
+                                      help_text="Another donation was submitted with a byte-identical slip.")
+    reference_reused = models.BooleanField(default=False, editable=False,
+                                           help_text="Another donation was submitted with the same transaction reference.")
+
     # Timestamps
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
-    
-    def __init__(self, *args, **kwargs):
-        super().__init__(*args, **kwargs)
-        # Store the original status when the model instance is created
-        self.__original_status = self.status
 
     def save(self, *args, **kwargs):
+        after_commit = self._store_slip()
+        if self._check_receipt():
+            # The donation and the flags on the donations it matches commit together
+            with transaction.atomic():
+                self._save_with_order_number(*args, **kwargs)
+                flag_matches(self)
+        else:
+            self._save_with_order_number(*args, **kwargs)
+        # Registered after the save: outside a transaction on_commit runs at once
+        for callback in after_commit:
+            transaction.on_commit(callback)
+
+    def _store_slip(self):
+        """Stores a newly uploaded slip by content (see slips.py). Returns what to run once the save commits."""
+        if not self.transaction_slip or self.transaction_slip._committed:
+            return []
+        old_slip, old_digest = self.get_original('transaction_slip'), self.get_original('slip_sha256')
+        upload = self.transaction_slip.file
+        self.slip_sha256 = store_slip(self.transaction_slip)
+        storage, name = self.transaction_slip.storage, self.transaction_slip.name
+        after_commit = [lambda: restore_slip(storage, name, upload)]
+        if old_slip and old_slip != name:
+            after_commit.append(lambda: release_slip(Donation, storage, old_slip, old_digest))
+        return after_commit
+
+    def _check_receipt(self):
+        """Works out the reuse flags. True if other donations need flagging."""
+        self.transaction_reference = normalise_reference(self.transaction_id)
+        if not (self.slip_sha256 or self.transaction_reference):
+            return False
+        if not (self.has_changed('slip_sha256') or self.has_changed('transaction_reference')):
+            return False
+        self.slip_reused, self.reference_reused = reuse_flags(self)
+        return self.slip_reused or self.reference_reused
+
+    def _save_with_order_number(self, *args, **kwargs):
         # ⭐️ UPDATED ORDER NUMBER LOGIC ⭐️
-        if not self.donation_order_number:
-            # Generate a unique 6-character alphanumeric ID
-            while True:
-                random_id = ''.join(random.choices(string.ascii_uppercase + string.digits, k=6))
-                new_order_number = f"MPGepmc-{random_id}"
-                # Check if this order number already exists
-                if not Donation.objects.filter(donation_order_number=new_order_number).exists():
-                    self.donation_order_number = new_order_number
-                    break
-        super().save(*args, **kwargs)
+        if self.donation_order_number:
+            return super().save(*args, **kwargs)
+
+        # Insert-and-retry: no exists() pre-check, the unique constraint is the arbiter.
+        # Each attempt runs in a savepoint so a collision doesn't break an outer transaction.
+        for attempt in range(ORDER_NUMBER_ATTEMPTS):
+            self.donation_order_number = generate_order_number()
+            try:
+                with transaction.atomic():
+                    return super().save(*args, **kwargs)
+            except IntegrityError:
+                # Only retry if it was the order number that collided (checked on this rare path only)
+                collided = Donation.objects.filter(donation_order_number=self.donation_order_number).exists()
+                self.donation_order_number = ''
+                if not collided or attempt == ORDER_NUMBER_ATTEMPTS - 1:
+                    raise
 
     class Meta:
         verbose_name = "Donation Record"
         verbose_name_plural = "Donation Records"
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['status', 'created_at'], name='donation_status_created_idx'),
+            # The admin changelist: default ordering, date hierarchy and email prefix search
+            models.Index(fields=['created_at'], name='donation_created_idx'),
+            models.Index(Lower('email'), name='donation_email_lower_idx'),
+            models.Index(fields=['slip_sha256'], name='donation_slip_sha256_idx'),
+            models.Index(fields=['transaction_reference'], name='donation_reference_idx'),
+        ]
 
     def __str__(self):
         return f"Donation {self.donation_order_number} for PKR {self.amount}"
 
 
 
+class DonationStatusTransition(models.Model):
+    """
+    Audit trail of every change to Donation.status, whether made one at a
+    time or by a bulk admin action.
+    """
+    donation = models.ForeignKey(Donation, on_delete=models.CASCADE, related_name='status_transitions')
+    from_status = models.CharField(max_length=30, choices=Donation.DonationStatus.choices)
+    to_status = models.CharField(max_length=30, choices=Donation.DonationStatus.choices)
+    changed_by = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.SET_NULL, null=True, blank=True,
+                                   related_name='+')
+    changed_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        verbose_name = "Donation Status Change"
+        verbose_name_plural = "Donation Status Changes"
+        ordering = ['-changed_at']
+
+    def __str__(self):
+        return f"{self.donation_id}: {self.from_status} -> {self.to_status}"
+
+
+# -----------------------------------------------------
+# ⭐️ DONATION ROLLUPS (kept up to date by rollups.py) ⭐️
+# -----------------------------------------------------
+class DonationRollup(models.Model):
+    """
+    Number and total amount of the donations created in one period that are
+    currently in one status. Each status change moves a donation from one
+    bucket to another, so the reports never have to read Donation itself.
+    """
+    status = models.CharField(max_length=30, choices=Donation.DonationStatus.choices)
+    count = models.IntegerField(default=0)
+    amount = models.DecimalField(max_digits=16, decimal_places=2, default=0)
+
+    class Meta:
+        abstract = True
+
+
+class DonationDailyRollup(DonationRollup):
+    day = models.DateField(help_text="Local date the donations were created.")
+
+    class Meta:
+        verbose_name = "Daily Donation Total"
+        verbose_name_plural = "Daily Donation Totals"
+        ordering = ['-day', 'status']
+        constraints = [
+            models.UniqueConstraint(fields=['day', 'status'], name='donation_daily_rollup_unique'),
+        ]
+
+    def __str__(self):
+        return f"{self.day} {self.status}: {self.count}"
+
+
+class DonationMonthlyRollup(DonationRollup):
+    month = models.DateField(help_text="First day of the month the donations were created.")
+
+    class Meta:
+        verbose_name = "Monthly Donation Total"
+        verbose_name_plural = "Monthly Donation Totals"
+        ordering = ['-month', 'status']
+        constraints = [
+            models.UniqueConstraint(fields=['month', 'status'], name='donation_monthly_rollup_unique'),
+        ]
+
+    def __str__(self):
+        return f"{self.month:%Y-%m} {self.status}: {self.count}"
+
+
 # Custom upload path for MpgService images (existing)
 def mpgservice_image_upload_path(instance, filename):
     ext = filename.split('.')[-1]
@@ -165,7 +311,7 @@ def mpgblog_image_upload_path(instance, filename):
     return os.path.join('mpgblog_images', new_filename)
 
 
-class MpgService(models.Model):
+class MpgService(ChangeTrackingMixin, models.Model):
     name = models.CharField(max_length=200, unique=True)
     slug = models.SlugField(max_length=200, unique=True, blank=True, null=True,
                             help_text="A unique URL-friendly version of the service name.") # ADDED SLUG
@@ -184,6 +330,10 @@ class MpgService(models.Model):
         verbose_name = "MPG Service"
         verbose_name_plural = "MPG Services"
         ordering = ['name']
+        indexes = [
+            # Footer / home "latest services": WHERE is_active ORDER BY created_at DESC
+            models.Index(fields=['created_at'], condition=models.Q(is_active=True), name='service_active_created_idx'),
+        ]
 
     def __str__(self):
         return self.name
@@ -193,7 +343,7 @@ class MpgService(models.Model):
             self.slug = slugify(self.name)
         super().save(*args, **kwargs)
 
-class ServicePackage(models.Model): # NEW MODEL
+class ServicePackage(ChangeTrackingMixin, models.Model): # NEW MODEL
     service = models.ForeignKey(MpgService, on_delete=models.CASCADE, related_name='packages',
                                 help_text="The service this package belongs to.")
     name = models.CharField(max_length=100, help_text="e.g., Basic, Standard, Premium, Enterprise")
@@ -212,6 +362,9 @@ class ServicePackage(models.Model): # NEW MODEL
         unique_together = ('service', 'name') # Ensures unique package names per service
         unique_together = ('service', 'slug') # ADDED TO ENSURE SLUG IS UNIQUE PER SERVICE
         ordering = ['order', 'price']
+        indexes = [
+            models.Index(fields=['service', 'is_active', 'order'], name='package_service_active_idx'),
+        ]
 
     def __str__(self):
         return f"{self.service.name} - {self.name} (PKR{self.price})"
@@ -221,7 +374,7 @@ class ServicePackage(models.Model): # NEW MODEL
             self.slug = slugify(self.name)
         super().save(*args, **kwargs)
 
-class ServiceFeature(models.Model): # NEW MODEL
+class ServiceFeature(ChangeTrackingMixin, models.Model): # NEW MODEL
     package = models.ForeignKey(ServicePackage, on_delete=models.CASCADE, related_name='features',
                                 help_text="The package this feature belongs to.")
     feature_text = models.TextField(help_text="e.g., 10 GB Storage, Priority Support, Custom Reports (HTML allowed)")
@@ -237,7 +390,7 @@ class ServiceFeature(models.Model): # NEW MODEL
         return f"{self.package.name} - {self.feature_text}"
 
 
-class MpgBlog(models.Model):
+class MpgBlog(ChangeTrackingMixin, models.Model):
     title = models.CharField(max_length=250, unique=True)
     slug = models.SlugField(max_length=250, unique=True, blank=True, null=True,
                             help_text="A unique URL-friendly version of the title.")
@@ -253,6 +406,10 @@ class MpgBlog(models.Model):
         verbose_name = "MPG Blog Post"
         verbose_name_plural = "MPG Blog Posts"
         ordering = ['-posted_date']
+        indexes = [
+            # Listing, keyset pages, footer and previous/next: WHERE is_published ORDER BY posted_date, id
+            models.Index(fields=['posted_date'], condition=models.Q(is_published=True), name='blog_published_date_idx'),
+        ]
 
     def __str__(self):
         return self.title
@@ -263,7 +420,49 @@ class MpgBlog(models.Model):
         super().save(*args, **kwargs)
 
 
-class ServiceRequest(models.Model):
+# -----------------------------------------------------
+# Related-content index (built by mpgepmc_core/related.py)
+# -----------------------------------------------------
+class RelatedContentLink(models.Model):
+    """
+    One ranked neighbour in a precomputed "related items" list.
+    Rank 0 is the most similar item.
+    """
+    rank = models.PositiveSmallIntegerField()
+    score = models.FloatField()
+
+    class Meta:
+        abstract = True
+        ordering = ['rank']
+
+
+class RelatedBlog(RelatedContentLink):
+    source = models.ForeignKey(MpgBlog, on_delete=models.CASCADE, related_name='related_links')
+    target = models.ForeignKey(MpgBlog, on_delete=models.CASCADE, related_name='related_from')
+
+    class Meta(RelatedContentLink.Meta):
+        verbose_name = "Related Blog Post"
+        verbose_name_plural = "Related Blog Posts"
+        unique_together = ('source', 'rank')
+
+    def __str__(self):
+        return f"{self.source_id} -> {self.target_id} (#{self.rank})"
+
+
+class RelatedProject(RelatedContentLink):
+    source = models.ForeignKey(Project, on_delete=models.CASCADE, related_name='related_links')
+    target = models.ForeignKey(Project, on_delete=models.CASCADE, related_name='related_from')
+
+    class Meta(RelatedContentLink.Meta):
+        verbose_name = "Related Project"
+        verbose_name_plural = "Related Projects"
+        unique_together = ('source', 'rank')
+
+    def __str__(self):
+        return f"{self.source_id} -> {self.target_id} (#{self.rank})"
+
+
+class ServiceRequest(ChangeTrackingMixin, models.Model):
     mpgservice = models.ForeignKey(MpgService, on_delete=models.SET_NULL, null=True, blank=True,
                                 help_text="The MPG service being requested.")
     user_full_name = models.CharField(max_length=100)
@@ -277,6 +476,49 @@ class ServiceRequest(models.Model):
         verbose_name = "MPG Service Request"
         verbose_name_plural = "MPG Service Requests"
         ordering = ['-request_date']
+        indexes = [
+            models.Index(fields=['request_date'], name='servicerequest_date_idx'),
+            # The open queue: WHERE NOT is_processed ORDER BY request_date
+            models.Index(fields=['request_date'], condition=models.Q(is_processed=False), name='servicerequest_open_idx'),
+            models.Index(Lower('user_email'), name='servicerequest_email_lower_idx'),
+        ]
+
+    def __str__(self):
+        return f"Request for {self.mpgservice.name if self.mpgservice else 'N/A'} by {self.user_full_name}"
+
+
+# -----------------------------------------------------
+# ⭐️ EMAIL OUTBOX (drained by `send_queued_emails`) ⭐️
+# -----------------------------------------------------
+class OutboundEmail(models.Model):
+    class EmailStatus(models.TextChoices):
+        PENDING = 'PENDING', 'Pending'
+        SENT = 'SENT', 'Sent'
+        DEAD = 'DEAD', 'Dead Letter'
+
+    subject = models.CharField(max_length=255)
+    body = models.TextField(help_text="Plain-text body.")
+    html_body = models.TextField(blank=True, default='')
+    from_email = models.CharField(max_length=254)
+    recipients = models.JSONField(default=list)
+
+    status = models.CharField(max_length=10, choices=EmailStatus.choices, default=EmailStatus.PENDING)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    next_attempt_at = models.DateTimeField(default=timezone.now,
+                                           help_text="Not sent before this time. Also acts as the worker's lease while sending.")
+    claim_token = models.CharField(max_length=32, blank=True, default='')
+    last_error = models.TextField(blank=True, default='')
+
+    created_at = models.DateTimeField(auto_now_add=True)
+    sent_at = models.DateTimeField(blank=True, null=True)
+
+    class Meta:
+        verbose_name = "Outbound Email"
+        verbose_name_plural = "Outbound Emails"
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['status', 'next_attempt_at'], name='outbox_due_idx'),
+        ]
 
     def __str__(self):
-        return f"Request for {self.mpgservice.name if self.mpgservice else 'N/A'} by {self.user_full_name}"
\ No newline at end of file
+        return f"{self.subject} -> {', '.join(self.recipients)} ({self.status})"
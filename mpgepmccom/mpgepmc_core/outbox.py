@@ -0,0 +1,172 @@
+# mpgepmc_core/outbox.py
+"""
+Database-backed email outbox.
+
+Views and signals call `enqueue_email()` (async views `aenqueue_email()`),
+which is a single INSERT, so request latency no longer depends on the SMTP
+server. The `send_queued_emails` worker calls `send_due_emails()`, which
+claims a batch, sends it over one reused SMTP connection and reschedules
+failures with exponential backoff until they move to the dead-letter state.
+"""
+import logging
+import random
+import uuid
+from datetime import timedelta
+from smtplib import SMTPServerDisconnected
+
+from django.conf import settings
+from django.core.mail import EmailMultiAlternatives, get_connection
+from django.utils import timezone
+
+from .models import OutboundEmail
+
+logger = logging.getLogger(__name__)
+
+# Seconds a worker may hold a claimed batch before another worker may retry it.
+CLAIM_LEASE_SECONDS = 300
+
+
+def _new_email(subject, plain_message, from_email, recipient_list, html_message=None):
+    return OutboundEmail(
+        subject=subject[:255],
+        body=plain_message,
+        html_body=html_message or '',
+        from_email=from_email,
+        recipients=list(recipient_list),
+    )
+
+
+def enqueue_email(subject, plain_message, from_email, recipient_list, html_message=None):
+    """Queues one email for the worker. Same arguments as the old EmailThread."""
+    email = _new_email(subject, plain_message, from_email, recipient_list, html_message)
+    email.save()
+    return email
+
+
+async def aenqueue_email(subject, plain_message, from_email, recipient_list, html_message=None):
+    """enqueue_email() for async views: the INSERT goes through the async ORM API."""
+    email = _new_email(subject, plain_message, from_email, recipient_list, html_message)
+    await email.asave()
+    return email
+
+
+def enqueue_emails(messages):
+    """Queues many emails in one INSERT. `messages` yields enqueue_email() argument tuples."""
+    return OutboundEmail.objects.bulk_create(
+        [_new_email(*message) for message in messages], batch_size=500
+    )
+
+
+def retry_delay(attempts):
+    """Exponential backoff with jitter: base, 2*base, 4*base... capped at the max."""
+    base = settings.EMAIL_OUTBOX_RETRY_BASE_SECONDS
+    delay = min(base * (2 ** max(attempts - 1, 0)), settings.EMAIL_OUTBOX_RETRY_MAX_SECONDS)
+    return timedelta(seconds=delay * random.uniform(0.8, 1.2))
+
+
+def claim_batch(batch_size):
+    """
+    Claims up to `batch_size` due emails for this worker. The claim pushes
+    next_attempt_at forward by the lease, so a crashed worker's batch becomes
+    due again on its own.
+    """
+    now = timezone.now()
+    token = uuid.uuid4().hex
+    due_ids = list(
+        OutboundEmail.objects.filter(status=OutboundEmail.EmailStatus.PENDING, next_attempt_at__lte=now)
+        .order_by('next_attempt_at', 'pk')
+        .values_list('pk', flat=True)[:batch_size]
+    )
+    if not due_ids:
+        return []
+    OutboundEmail.objects.filter(
+        pk__in=due_ids, status=OutboundEmail.EmailStatus.PENDING, next_attempt_at__lte=now
+    ).update(claim_token=token, next_attempt_at=now + timedelta(seconds=CLAIM_LEASE_SECONDS))
+    return list(OutboundEmail.objects.filter(claim_token=token).order_by('pk'))
+
+
+def _to_message(email, connection):
+    message = EmailMultiAlternatives(
+        email.subject, email.body, email.from_email, email.recipients, connection=connection
+    )
+    if email.html_body:
+        message.attach_alternative(email.html_body, 'text/html')
+    return message
+
+
+def send_batch(emails, connection):
+    """Sends `emails` over `connection`. Returns (sent, failed) counts."""
+    sent_ids = []
+    failed = []
+    for email in emails:
+        try:
+            try:
+                connection.send_messages([_to_message(email, connection)])
+            except SMTPServerDisconnected:
+                # The server dropped an idle connection; reconnect once and retry.
+                connection.close()
+                connection.open()
+                connection.send_messages([_to_message(email, connection)])
+        except Exception as e:
+            failed.append((email, e))
+        else:
+            sent_ids.append(email.pk)
+
+    if sent_ids:
+        OutboundEmail.objects.filter(pk__in=sent_ids).update(
+            status=OutboundEmail.EmailStatus.SENT, sent_at=timezone.now(), claim_token='', last_error=''
+        )
+    record_failures(failed)
+    return len(sent_ids), len(failed)
+
+
+def record_failures(failed):
+    """Schedules a retry with backoff for each (email, error), or dead-letters it."""
+    now = timezone.now()
+    for email, error in failed:
+        email.attempts += 1
+        email.last_error = f"{type(error).__name__}: {error}"[:2000]
+        email.claim_token = ''
+        if email.attempts >= settings.EMAIL_OUTBOX_MAX_ATTEMPTS:
+            email.status = OutboundEmail.EmailStatus.DEAD
+            logger.error("Email %s moved to dead letters after %s attempts: %s", email.pk, email.attempts, error)
+        else:
+            email.next_attempt_at = now + retry_delay(email.attempts)
+            logger.warning("Email %s failed (attempt %s), retrying: %s", email.pk, email.attempts, error)
+    if failed:
+        OutboundEmail.objects.bulk_update(
+            [email for email, _error in failed],
+            ['attempts', 'last_error', 'claim_token', 'status', 'next_attempt_at'],
+        )
+
+
+def send_due_emails(batch_size=None, max_batches=None):
+    """
+    Drains everything that is currently due, batch by batch, over a single
+    SMTP connection. Returns (sent, failed) totals.
+    """
+    batch_size = batch_size or settings.EMAIL_OUTBOX_BATCH_SIZE
+    total_sent = total_failed = 0
+    connection = None
+    batches = 0
+    try:
+        while max_batches is None or batches < max_batches:
+            emails = claim_batch(batch_size)
+            if not emails:
+                break
+            if connection is None:
+                connection = get_connection(fail_silently=False)
+            try:
+                connection.open()  # no-op while the connection is still open
+            except Exception as e:
+                record_failures([(email, e) for email in emails])
+                total_failed += len(emails)
+                break
+            sent, failed = send_batch(emails, connection)
+            total_sent += sent
+            total_failed += failed
+            batches += 1
+    finally:
+        if connection is not None:
+            connection.close()
+    return total_sent, total_failed
@@ -0,0 +1,197 @@
+# mpgepmc_core/page_cache.py
+"""
+Full-page cache for anonymous GET requests to the public content views.
+
+Entries are keyed on the version stamps (see versions.py) of the models a page
+is built from, so a post_save/post_delete on any of them invalidates exactly
+the pages that showed it. Pages with randomised content (home slider,
+related items) keep a small, bounded set of variants and pick one per request.
+
+The same stamps are the page's validators for conditional GET: a weak ETag
+over the URL and the stamps, and Last-Modified from the newest stamp. A
+returning reader or crawler whose copy is still current gets a 304 before
+the cache lookup or the view run, for the cost of one cache read.
+"""
+import hashlib
+import random
+from functools import wraps
+
+from asgiref.sync import iscoroutinefunction
+from django.conf import settings
+from django.contrib import messages
+from django.core.cache import caches
+from django.http import HttpResponse
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date
+
+from .models import MpgBlog, MpgService
+from .versions import aget_versions, changed_at, get_versions, version_name
+
+# Every page renders the footer, which lists the latest services and blogs.
+FOOTER_MODELS = (MpgService, MpgBlog)
+
+CACHE_HEADER = 'X-Page-Cache'
+
+
+def _is_cacheable_request(request):
+    if request.method not in ('GET', 'HEAD'):
+        return False
+    if request.user.is_authenticated:
+        return False
+    # Flash messages are one-off, so don't serve (or store) a shared copy while one is pending.
+    return not len(messages.get_messages(request))
+
+
+async def _ais_cacheable_request(request):
+    """_is_cacheable_request() without sync database access."""
+    if request.method not in ('GET', 'HEAD'):
+        return False
+    # Loads the session through its async API too, so the message check below stays in memory
+    if (await request.auser()).is_authenticated:
+        return False
+    return not len(messages.get_messages(request))
+
+
+def _is_cacheable_response(response):
+    return (
+        response.status_code == 200
+        and not response.streaming
+        and not response.cookies
+        and not response.has_header('Cache-Control')
+    )
+
+
+def _validators(view_name, request, versions):
+    """(ETag, Last-Modified timestamp or None) for this URL at these versions."""
+    digest = hashlib.md5(f"{view_name}:{request.get_full_path()}:{':'.join(versions)}".encode()).hexdigest()
+    # Weak: randomised pages differ byte for byte between variants, but any of them is current
+    return f'W/"{digest[:20]}"', changed_at(versions)
+
+
+def _set_validators(response, etag, last_modified):
+    response['ETag'] = etag
+    if last_modified is not None:
+        response['Last-Modified'] = http_date(last_modified)
+    # Browsers may keep the page, but must revalidate it rather than guess a freshness lifetime
+    patch_cache_control(response, no_cache=True)
+
+
+def _cache_key(view_name, request, versions, variant):
+    path_hash = hashlib.md5(request.get_full_path().encode()).hexdigest()
+    version_hash = hashlib.md5(':'.join(versions).encode()).hexdigest()[:12]
+    return f"page:{view_name}:{path_hash}:{version_hash}:{variant}"
+
+
+def _to_cache(response):
+    return response.content, dict(response.items())
+
+
+def _from_cache(cached):
+    content, headers = cached
+    response = HttpResponse(content, headers=headers)
+    response[CACHE_HEADER] = 'HIT'
+    return response
+
+
+def cache_public_page(*models, variants=1):
+    """
+    Caches the rendered view for anonymous visitors until any of `models`
+    (plus the footer models) changes, and answers conditional GETs for it.
+
+    `variants` > 1 stores up to that many renderings of the same URL and serves
+    a random one, for views that deliberately randomise their output.
+    Works on sync and async views alike; the async wrapper only uses the
+    async cache, session and auth APIs.
+    """
+    version_names = tuple(dict.fromkeys(version_name(model) for model in models + FOOTER_MODELS))
+
+    def decorator(view_func):
+        def _key(request, versions):
+            variant = random.randrange(variants) if variants > 1 else 0
+            return _cache_key(view_func.__name__, request, versions, variant)
+
+        def _not_modified(request, versions):
+            """(304 response or None, ETag, Last-Modified) for a conditional request."""
+            etag, last_modified = _validators(view_func.__name__, request, versions)
+            not_modified = get_conditional_response(request, etag=etag, last_modified=last_modified)
+            if not_modified is not None:
+                _set_validators(not_modified, etag, last_modified)
+            return not_modified, etag, last_modified
+
+        if iscoroutinefunction(view_func):
+            @wraps(view_func)
+            async def _async_wrapped_view(request, *args, **kwargs):
+                use_cache = settings.PAGE_CACHE_ENABLED
+                conditional = settings.CONDITIONAL_GET_ENABLED
+                if not (use_cache or conditional) or not await _ais_cacheable_request(request):
+                    return await view_func(request, *args, **kwargs)
+
+                versions = await aget_versions(*version_names)
+                if conditional:
+                    not_modified, etag, last_modified = _not_modified(request, versions)
+                    if not_modified is not None:
+                        return not_modified
+
+                if use_cache:
+                    response = await _acached_view(request, versions, args, kwargs)
+                else:
+                    response = await view_func(request, *args, **kwargs)
+                if conditional and _is_cacheable_response(response):
+                    _set_validators(response, etag, last_modified)
+                return response
+
+            async def _acached_view(request, versions, args, kwargs):
+                cache = caches[settings.CONTENT_CACHE_ALIAS]
+                key = _key(request, versions)
+
+                cached = await cache.aget(key)
+                if cached is not None:
+                    return _from_cache(cached)
+
+                response = await view_func(request, *args, **kwargs)
+                if _is_cacheable_response(response) and not len(messages.get_messages(request)):
+                    await cache.aset(key, _to_cache(response), settings.PAGE_CACHE_TIMEOUT)
+                response[CACHE_HEADER] = 'MISS'
+                return response
+
+            return _async_wrapped_view
+
+        @wraps(view_func)
+        def _wrapped_view(request, *args, **kwargs):
+            use_cache = settings.PAGE_CACHE_ENABLED
+            conditional = settings.CONDITIONAL_GET_ENABLED
+            if not (use_cache or conditional) or not _is_cacheable_request(request):
+                return view_func(request, *args, **kwargs)
+
+            versions = get_versions(*version_names)
+            if conditional:
+                not_modified, etag, last_modified = _not_modified(request, versions)
+                if not_modified is not None:
+                    return not_modified
+
+            if use_cache:
+                response = _cached_view(request, versions, args, kwargs)
+            else:
+                response = view_func(request, *args, **kwargs)
+            # Same rule as for the page cache: only a shared, successful page gets validators
+            if conditional and _is_cacheable_response(response):
+                _set_validators(response, etag, last_modified)
+            return response
+
+        def _cached_view(request, versions, args, kwargs):
+            cache = caches[settings.CONTENT_CACHE_ALIAS]
+            key = _key(request, versions)
+
+            cached = cache.get(key)
+            if cached is not None:
+                return _from_cache(cached)
+
+            response = view_func(request, *args, **kwargs)
+            if _is_cacheable_response(response) and not len(messages.get_messages(request)):
+                cache.set(key, _to_cache(response), settings.PAGE_CACHE_TIMEOUT)
+            response[CACHE_HEADER] = 'MISS'
+            return response
+
+        return _wrapped_view
+
+    return decorator
@@ -0,0 +1,170 @@
+# mpgepmc_core/pagination.py
+"""
+Keyset ("load more") pagination for the public listings.
+
+Instead of OFFSET, each page ends with an opaque cursor holding the sort key
+of its last item, and the next page is a WHERE on that key:
+
+    ORDER BY posted_date DESC, id DESC
+    WHERE posted_date <= :d AND (posted_date < :d OR (posted_date = :d AND id < :id))
+
+With an index on the sort columns that is a seek, so page 500 costs the same
+as page 1, and rows published while someone scrolls never shift items between
+pages. The trailing id makes the key unique, so nothing is skipped or repeated.
+"""
+import base64
+import binascii
+import bisect
+import json
+
+from django.conf import settings
+from django.core.exceptions import BadRequest, ValidationError
+from django.db.models import Q
+from django.shortcuts import render
+
+CURSOR_PARAM = 'after'
+FRAGMENT_PARAM = 'fragment'
+
+
+class KeysetPage:
+    def __init__(self, items, next_cursor, cursor=None):
+        self.items = items
+        self.next_cursor = next_cursor
+        self.cursor = cursor
+
+    @property
+    def has_next(self):
+        return self.next_cursor is not None
+
+    @property
+    def is_first(self):
+        return self.cursor is None
+
+    def __iter__(self):
+        return iter(self.items)
+
+    def __len__(self):
+        return len(self.items)
+
+
+def encode_cursor(values):
+    """Sort-key values -> URL-safe token. Dates become ISO strings."""
+    raw = json.dumps([value.isoformat() if hasattr(value, 'isoformat') else value for value in values],
+                     separators=(',', ':'))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor, length):
+    """Token -> list of raw values. Anything malformed is a 400, not a 500."""
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode()).decode())
+    except (ValueError, binascii.Error, UnicodeDecodeError):
+        raise BadRequest("Invalid page cursor.")
+    if not isinstance(values, list) or len(values) != length:
+        raise BadRequest("Invalid page cursor.")
+    return values
+
+
+def request_cursor(request):
+    return request.GET.get(CURSOR_PARAM) or None
+
+
+def wants_fragment(request):
+    """
+    "Load more" / infinite scroll asks for just the next batch of cards.
+    A query parameter rather than a header, so the page cache (keyed on the
+    full URL) never serves a fragment for a full page or vice versa.
+    """
+    return request.GET.get(FRAGMENT_PARAM) == '1'
+
+
+def render_listing(request, template_name, cards_template, context):
+    """The full listing page, or just the next batch of cards for ?fragment=1."""
+    if wants_fragment(request):
+        return render(request, 'mpgepmc/partials/load_more_fragment.html', {**context, 'cards_template': cards_template})
+    return render(request, template_name, context)
+
+
+def _after(ordering, values):
+    """WHERE clause for "strictly after `values`" in `ordering` (all one direction)."""
+    lookup = 'lt' if ordering[0].startswith('-') else 'gt'
+    fields = [name.lstrip('-') for name in ordering]
+    condition = Q()
+    for depth, field in enumerate(fields):
+        step = Q(**{f"{field}__{lookup}": values[depth]})
+        for previous, value in zip(fields[:depth], values[:depth]):
+            step &= Q(**{previous: value})
+        condition |= step
+    # Redundant with the OR above, but a plain range on the leading column is
+    # what lets SQLite seek into the index instead of scanning up to the cursor
+    return Q(**{f"{fields[0]}__{lookup}e": values[0]}) & condition
+
+
+def seek(queryset, ordering, values):
+    """`queryset` in `ordering`, starting strictly after the row whose sort key is `values`."""
+    if len({name.startswith('-') for name in ordering}) != 1:
+        raise ValueError("Keyset ordering fields must all sort in the same direction.")
+    return queryset.filter(_after(ordering, values)).order_by(*ordering)
+
+
+def paginate_queryset(queryset, ordering, cursor=None, per_page=None):
+    """
+    One page of `queryset` ordered by `ordering`, e.g. ('-posted_date', '-id').
+    The last field must be unique. Runs a single query for per_page + 1 rows.
+    """
+    queryset, fields, per_page = _page_query(queryset, ordering, cursor, per_page)
+    return _keyset_page(list(queryset), fields, per_page, cursor)
+
+
+async def apaginate_queryset(queryset, ordering, cursor=None, per_page=None):
+    """paginate_queryset() with the async ORM API."""
+    queryset, fields, per_page = _page_query(queryset, ordering, cursor, per_page)
+    return _keyset_page([item async for item in queryset], fields, per_page, cursor)
+
+
+def _page_query(queryset, ordering, cursor, per_page):
+    """(queryset sliced to per_page + 1 rows, sort fields, per_page) for one page."""
+    per_page = per_page or settings.LISTING_PAGE_SIZE
+    if len({name.startswith('-') for name in ordering}) != 1:
+        raise ValueError("Keyset ordering fields must all sort in the same direction.")
+    fields = [name.lstrip('-') for name in ordering]
+    queryset = queryset.order_by(*ordering)
+
+    if cursor:
+        raw = decode_cursor(cursor, len(fields))
+        try:
+            values = [queryset.model._meta.get_field(field).to_python(value) for field, value in zip(fields, raw)]
+        except ValidationError:
+            raise BadRequest("Invalid page cursor.")
+        if any(value is None for value in values):
+            raise BadRequest("Invalid page cursor.")
+        queryset = seek(queryset, ordering, values)
+    return queryset[:per_page + 1], fields, per_page
+
+
+def _keyset_page(items, fields, per_page, cursor):
+    next_cursor = None
+    if len(items) > per_page:
+        items = items[:per_page]
+        next_cursor = encode_cursor([getattr(items[-1], field) for field in fields])
+    return KeysetPage(items, next_cursor, cursor)
+
+
+def paginate_sequence(items, key, cursor=None, per_page=None):
+    """
+    Same cursors over an in-memory list already sorted ascending by `key`
+    (e.g. the cached service catalog); a binary search replaces the WHERE.
+    """
+    per_page = per_page or settings.LISTING_PAGE_SIZE
+    keys = [key(item) for item in items]
+    start = 0
+    if cursor and keys:
+        raw = decode_cursor(cursor, len(keys[0]))
+        try:
+            start = bisect.bisect_right(keys, tuple(raw))
+        except TypeError:
+            raise BadRequest("Invalid page cursor.")
+    page = items[start:start + per_page]
+    next_cursor = encode_cursor(keys[start + per_page - 1]) if start + per_page < len(items) else None
+    return KeysetPage(page, next_cursor, cursor)
@@ -0,0 +1,128 @@
+# mpgepmc_core/query_plans.py
+"""
+EXPLAIN QUERY PLAN checks for the queries the site runs on every request.
+
+Each entry in hot_queries() mirrors a filter + ordering used by a view, the
+site snapshot, the catalog, the outbox worker or an admin changelist. A plan
+fails the check if SQLite has to read a whole table ("SCAN table" with no
+index) or sort rows itself ("USE TEMP B-TREE"), which is what turns a 10 ms
+page into a 500 ms one once the tables hold tens of thousands of rows.
+Scanning *an index* in order is fine: with a LIMIT it stops after one page.
+
+SQLite only; see the check_query_plans management command.
+"""
+import re
+
+from django.db import connections
+from django.db.models import Q
+from django.db.models.functions import Lower
+from django.utils import timezone
+
+from .models import (
+    Donation, MpgBlog, MpgService, OutboundEmail, Project, ServiceFeature, ServicePackage, ServiceRequest,
+)
+from .admin_scale import PREFIX_END
+from .pagination import seek
+
+FULL_SCAN = re.compile(r'^SCAN (?:TABLE )?(\S+)(?: AS \S+)?$')
+TEMP_SORT = 'USE TEMP B-TREE'
+
+
+def explain(queryset):
+    """The detail column of EXPLAIN QUERY PLAN for `queryset`, one string per step."""
+    connection = connections[queryset.db]
+    sql, params = queryset.query.get_compiler(using=queryset.db).as_sql()
+    with connection.cursor() as cursor:
+        cursor.execute(f"EXPLAIN QUERY PLAN {sql}", params)
+        return [row[-1] for row in cursor.fetchall()]
+
+
+def plan_problems(plan):
+    problems = []
+    for step in plan:
+        scan = FULL_SCAN.match(step)
+        if scan:
+            problems.append(f"full scan of {scan.group(1)}")
+        elif TEMP_SORT in step:
+            problems.append(f"sorts in a temp B-tree ({step})")
+    return problems
+
+
+def hot_queries():
+    """{name: queryset}, with keys taken from real rows where there are any."""
+    now = timezone.now()
+    blog = MpgBlog.objects.order_by().first() or MpgBlog(pk=0, posted_date=now)
+    project = Project.objects.order_by().first() or Project(pk=0, posted_date=now)
+    published_blogs = MpgBlog.objects.filter(is_published=True)
+    published_projects = Project.objects.filter(is_published=True)
+    service_ids = list(MpgService.objects.order_by().values_list('pk', flat=True)[:20]) or [0]
+    package_ids = list(ServicePackage.objects.order_by().values_list('pk', flat=True)[:20]) or [0]
+    page = 13  # LISTING_PAGE_SIZE + 1, as paginate_queryset asks for
+
+    return {
+        # blogs / blog_detail
+        'blogs: first page': published_blogs.order_by('-posted_date', '-id')[:page],
+        'blogs: later page': seek(published_blogs, ('-posted_date', '-id'), (blog.posted_date, blog.pk))[:page],
+        'blog_detail: by slug': published_blogs.filter(slug=blog.slug or '').order_by(),
+        'blog_detail: previous post': seek(published_blogs, ('-posted_date', '-id'), (blog.posted_date, blog.pk))[:1],
+        'blog_detail: next post': seek(published_blogs, ('posted_date', 'id'), (blog.posted_date, blog.pk))[:1],
+        'blog_detail: related posts': published_blogs.filter(related_from__source=blog.pk).order_by('related_from__rank')[:6],
+        # projects / project_detail
+        'projects: first page': published_projects.order_by('-posted_date', '-id')[:page],
+        'projects: later page': seek(published_projects, ('-posted_date', '-id'), (project.posted_date, project.pk))[:page],
+        'projects: category': published_projects.filter(category=project.category or '').order_by('-posted_date', '-id')[:page],
+        'project_detail: by slug': published_projects.filter(slug=project.slug or '').order_by(),
+        'project_detail: related projects': (
+            published_projects.filter(related_from__source=project.pk).order_by('related_from__rank')[:6]
+        ),
+        # site snapshot (header/footer on every page)
+        'footer: latest services': MpgService.objects.filter(is_active=True).order_by('-created_at')[:4],
+        'footer: latest blogs': published_blogs.order_by('-posted_date')[:4],
+        # service catalog and checkout
+        'catalog: services': MpgService.objects.filter(is_active=True).order_by('name'),
+        'catalog: packages': ServicePackage.objects.filter(is_active=True, service_id__in=service_ids).order_by(),
+        'catalog: features': ServiceFeature.objects.filter(package_id__in=package_ids).order_by(),
+        'checkout: package by slug': ServicePackage.objects.filter(slug='basic', is_active=True).order_by(),
+        'donation pages: by order number': Donation.objects.filter(donation_order_number='MPG-0').order_by(),
+        'donation checkout: reused slip': Donation.objects.filter(slip_sha256='0' * 64).exclude(pk=0).order_by()[:1],
+        'donation checkout: reused reference': (
+            Donation.objects.filter(transaction_reference='TX0').exclude(pk=0).order_by()[:1]
+        ),
+        # background work and the admin
+        'outbox: due emails': (
+            OutboundEmail.objects.filter(status=OutboundEmail.EmailStatus.PENDING, next_attempt_at__lte=now)
+            .order_by('next_attempt_at', 'pk').values_list('pk', flat=True)[:50]
+        ),
+        'admin: donations': Donation.objects.order_by('-created_at', '-pk')[:101],
+        'admin: donations, next page': seek(
+            Donation.objects.all(), ('-created_at', '-id'), [now, 0]
+        )[:101],
+        'admin: donation prefix search': Donation.objects.alias(email_lower=Lower('email')).filter(
+            Q(donation_order_number__gte='MPGepmc-AB', donation_order_number__lt='MPGepmc-AB' + PREFIX_END)
+            | Q(transaction_reference__gte='AB', transaction_reference__lt='AB' + PREFIX_END)
+            | Q(email_lower__gte='ab', email_lower__lt='ab' + PREFIX_END)
+        ).order_by()[:101],
+        'admin: donation date hierarchy': (
+            Donation.objects.filter(created_at__gte=now).order_by('created_at').values_list('created_at')[:1]
+        ),
+        'admin: donations by status': (
+            Donation.objects.filter(status=Donation.DonationStatus.PENDING).order_by('-created_at', '-pk')[:100]
+        ),
+        'admin: service requests': ServiceRequest.objects.order_by('-request_date', '-pk')[:100],
+        'admin: service request email search': ServiceRequest.objects.alias(email_lower=Lower('user_email')).filter(
+            email_lower__gte='ab', email_lower__lt='ab' + PREFIX_END
+        ).order_by()[:101],
+        'admin: open service requests': (
+            ServiceRequest.objects.filter(is_processed=False).order_by('-request_date', '-pk')[:100]
+        ),
+    }
+
+
+def check_query_plans(queries=None):
+    """[(name, plan, problems)] for every hot query, in order."""
+    queries = hot_queries() if queries is None else queries
+    results = []
+    for name, queryset in queries.items():
+        plan = explain(queryset)
+        results.append((name, plan, plan_problems(plan)))
+    return results
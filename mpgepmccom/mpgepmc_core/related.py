@@ -0,0 +1,175 @@
+# mpgepmc_core/related.py
+"""
+Precomputed "related items" for blog posts and projects.
+
+Similarity is TF-IDF cosine over title, summary and body (HTML stripped),
+with the title and summary weighted higher than the body. Candidate pairs come
+from an inverted index over each document's strongest terms, so building the
+index is roughly linear in the number of documents instead of quadratic.
+
+The ranked neighbour lists are stored in RelatedBlog / RelatedProject and read
+by the detail views with a single indexed join. TF-IDF weights depend on every
+document, so the lists are rebuilt as a whole by `build_related_index`, not
+per save (see RELATED_INDEX_REBUILD_ON_SAVE).
+"""
+import heapq
+import math
+import random
+import re
+from collections import Counter, defaultdict
+
+from django.conf import settings
+from django.db import transaction
+from django.utils.html import strip_tags
+
+from .cards import cards
+from .models import MpgBlog, Project, RelatedBlog, RelatedProject
+from .versions import bump_versions, version_name
+
+# How many neighbours we store per item, and how many the views rotate through.
+RELATED_INDEX_SIZE = getattr(settings, 'RELATED_INDEX_SIZE', 10)
+RELATED_POOL_SIZE = getattr(settings, 'RELATED_POOL_SIZE', 6)
+
+# Only the strongest terms of each document take part in candidate generation.
+SIGNATURE_TERMS = 40
+
+FIELD_WEIGHTS = (3, 2, 1)  # title, summary, body
+
+TOKEN_RE = re.compile(r"[a-z0-9][a-z0-9'-]+")
+
+STOP_WORDS = frozenset("""
+am an as at be by do he if in is it me my no of on or so to up we
+about above after again against all also and any are because been before being below between both but
+can could did does doing down during each few for from further had has have having her here hers him his
+how into its itself just more most much must nor not now off once only other our ours out over own same
+she should some such than that the their theirs them then there these they this those through too under
+until very was were what when where which while who whom why will with would you your yours
+""".split())
+
+# model -> (link model, title field, summary field, body field)
+INDEXED_MODELS = {
+    MpgBlog: (RelatedBlog, 'title', 'short_summary', 'content'),
+    Project: (RelatedProject, 'title', 'short_description', 'full_description'),
+}
+
+
+def tokenize(text):
+    return [
+        token.strip("'-") for token in TOKEN_RE.findall(strip_tags(text or '').lower())
+        if token not in STOP_WORDS
+    ]
+
+
+def _weighted_terms(fields):
+    counts = Counter()
+    for weight, text in zip(FIELD_WEIGHTS, fields):
+        for token in tokenize(text):
+            counts[token] += weight
+    return counts
+
+
+def tfidf_vectors(documents):
+    """
+    documents: {pk: (title, summary, body)}
+    Returns {pk: {term: weight}} with sublinear TF and L2-normalised vectors.
+    """
+    term_counts = {pk: _weighted_terms(fields) for pk, fields in documents.items()}
+    document_frequency = Counter()
+    for counts in term_counts.values():
+        document_frequency.update(counts.keys())
+
+    total = len(documents)
+    vectors = {}
+    for pk, counts in term_counts.items():
+        vector = {
+            term: (1 + math.log(count)) * math.log((1 + total) / (1 + document_frequency[term]))
+            for term, count in counts.items()
+        }
+        norm = math.sqrt(sum(weight * weight for weight in vector.values())) or 1.0
+        vectors[pk] = {term: weight / norm for term, weight in vector.items() if weight > 0}
+    return vectors
+
+
+def compute_neighbours(documents, limit=RELATED_INDEX_SIZE):
+    """Returns {pk: [(neighbour_pk, score), ...]} ranked by cosine similarity."""
+    vectors = tfidf_vectors(documents)
+    document_frequency = Counter(term for vector in vectors.values() for term in vector)
+    # Terms unique to one document can't link it to anything, so they don't earn a signature slot.
+    signatures = {
+        pk: heapq.nlargest(
+            SIGNATURE_TERMS,
+            ((term, weight) for term, weight in vector.items() if document_frequency[term] > 1),
+            key=lambda item: item[1],
+        )
+        for pk, vector in vectors.items()
+    }
+
+    postings = defaultdict(list)
+    for pk, terms in signatures.items():
+        for term, weight in terms:
+            postings[term].append((pk, weight))
+
+    neighbours = {}
+    for pk, terms in signatures.items():
+        scores = defaultdict(float)
+        for term, weight in terms:
+            for other_pk, other_weight in postings[term]:
+                if other_pk != pk:
+                    scores[other_pk] += weight * other_weight
+        neighbours[pk] = heapq.nlargest(limit, scores.items(), key=lambda item: (item[1], -item[0]))
+    return neighbours
+
+
+def rebuild_related_index(model):
+    """
+    Recomputes and stores the neighbour lists of every published item of
+    `model`, then invalidates the cached pages that show them.
+    """
+    link_model, *fields = INDEXED_MODELS[model]
+    rows = model.objects.filter(is_published=True).values_list('pk', *fields)
+    documents = {pk: texts for pk, *texts in rows.iterator()}
+    neighbours = compute_neighbours(documents)
+
+    links = [
+        link_model(source_id=pk, target_id=target_pk, rank=rank, score=score)
+        for pk, ranked in neighbours.items()
+        for rank, (target_pk, score) in enumerate(ranked)
+    ]
+    with transaction.atomic():
+        link_model.objects.all().delete()
+        link_model.objects.bulk_create(links, batch_size=1000)
+        bump_versions(version_name(model))
+    return len(links)
+
+
+def related_items(instance, count=3):
+    """
+    Up to `count` related published items, rotated randomly through the top
+    RELATED_POOL_SIZE neighbours. Falls back to the latest items when the
+    index hasn't been built yet.
+    """
+    pool = list(_neighbour_pool(instance))
+    if not pool:
+        return list(_latest_others(instance, count))
+    return random.sample(pool, min(count, len(pool)))
+
+
+async def arelated_items(instance, count=3):
+    """related_items() with the async ORM API."""
+    pool = [item async for item in _neighbour_pool(instance)]
+    if not pool:
+        return [item async for item in _latest_others(instance, count)]
+    return random.sample(pool, min(count, len(pool)))
+
+
+def _neighbour_pool(instance):
+    model = type(instance)
+    return (
+        cards(model.objects.filter(is_published=True, related_from__source=instance))
+        .order_by('related_from__rank')[:RELATED_POOL_SIZE]
+    )
+
+
+def _latest_others(instance, count):
+    model = type(instance)
+    return cards(model.objects.filter(is_published=True)).exclude(pk=instance.pk).order_by('-posted_date')[:count]
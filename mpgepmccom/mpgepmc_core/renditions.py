@@ -0,0 +1,168 @@
+# mpgepmc_core/renditions.py
+"""
+Responsive image renditions for uploaded feature images.
+
+Every original in `mpgblog_images`, `mpgservice_images` and `project_images`
+gets width-bucketed WebP/AVIF copies stored right next to it, e.g.
+
+    mpgblog_images/my-post-1a2b3c4d.png
+    mpgblog_images/my-post-1a2b3c4d.480w.webp
+    mpgblog_images/my-post-1a2b3c4d.480w.avif
+    ...
+
+Renditions are generated once (on save, or by the `generate_renditions`
+management command) and the lookup used by templates is cached, so a page
+render never touches Pillow or the filesystem on a warm cache.
+"""
+import os
+from io import BytesIO
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from PIL import Image, features
+
+# Widths we generate. Anything wider than the original is skipped so we never upscale.
+RENDITION_WIDTHS = tuple(getattr(settings, 'IMAGE_RENDITION_WIDTHS', (480, 800, 1200, 1600)))
+
+# Preferred formats first; formats this Pillow build can't encode are dropped.
+RENDITION_FORMATS = tuple(
+    fmt for fmt in getattr(settings, 'IMAGE_RENDITION_FORMATS', ('avif', 'webp'))
+    if features.check(fmt)
+)
+
+RENDITION_QUALITY = {'avif': 55, 'webp': 78}
+MIME_TYPES = {'avif': 'image/avif', 'webp': 'image/webp'}
+
+CACHE_PREFIX = 'renditions:'
+CACHE_TIMEOUT = 60 * 60 * 24
+
+
+def rendition_name(name, width, fmt):
+    """
+    Storage name of a single rendition, stored next to the original.
+    Example: 'mpgblog_images/foo-1a2b3c4d.png' -> 'mpgblog_images/foo-1a2b3c4d.800w.webp'
+    """
+    root, _ext = os.path.splitext(name)
+    return f"{root}.{width}w.{fmt}"
+
+
+def _cache_key(name):
+    return f"{CACHE_PREFIX}{name}"
+
+
+def _target_widths(original_width):
+    """Width buckets for an original; always includes one bucket if the image is small."""
+    widths = [w for w in RENDITION_WIDTHS if w < original_width]
+    if not widths or original_width <= max(RENDITION_WIDTHS):
+        widths.append(original_width)
+    return sorted(set(widths))
+
+
+def generate_renditions(name, storage=default_storage, force=False):
+    """
+    Creates any missing renditions for the original stored under `name`
+    and refreshes the cached lookup. Returns the lookup dict (see `get_renditions`).
+    """
+    if not name or not storage.exists(name):
+        return None
+
+    with storage.open(name, 'rb') as fh:
+        original = Image.open(fh)
+        original.load()
+
+    width, height = original.size
+    if original.mode not in ('RGB', 'RGBA'):
+        original = original.convert('RGBA' if 'transparency' in original.info else 'RGB')
+
+    for target_width in _target_widths(width):
+        resized = None
+        for fmt in RENDITION_FORMATS:
+            target = rendition_name(name, target_width, fmt)
+            if not force and storage.exists(target):
+                continue
+            if resized is None:
+                target_height = max(1, round(height * target_width / width))
+                resized = original if target_width == width else original.resize(
+                    (target_width, target_height), Image.LANCZOS
+                )
+            buffer = BytesIO()
+            resized.save(buffer, format=fmt.upper(), quality=RENDITION_QUALITY.get(fmt, 80))
+            if storage.exists(target):
+                storage.delete(target)
+            storage.save(target, ContentFile(buffer.getvalue()))
+
+    cache.delete(_cache_key(name))
+    return get_renditions(name, storage=storage)
+
+
+def ensure_renditions(name, storage=default_storage):
+    """Generates renditions only if some width/format bucket is still missing."""
+    info = get_renditions(name, storage=storage)
+    if info and all(
+        len(info['sources'].get(fmt, [])) == len(_target_widths(info['width']))
+        for fmt in RENDITION_FORMATS
+    ):
+        return info
+    return generate_renditions(name, storage=storage)
+
+
+def delete_renditions(name, storage=default_storage):
+    """Removes every rendition generated for `name` (the original is left alone)."""
+    if not name:
+        return
+    directory, filename = os.path.split(name)
+    root = os.path.splitext(filename)[0]
+    try:
+        _dirs, files = storage.listdir(directory)
+    except FileNotFoundError:
+        files = []
+    for candidate in files:
+        stem, _ext = os.path.splitext(candidate)
+        if stem.startswith(f"{root}.") and stem.endswith('w') and stem[len(root) + 1:-1].isdigit():
+            storage.delete(os.path.join(directory, candidate))
+    cache.delete(_cache_key(name))
+
+
+def get_renditions(name, storage=default_storage):
+    """
+    Cached lookup of the renditions available for an original.
+
+    Returns a dict like:
+        {
+            'width': 1600, 'height': 900,
+            'sources': {'avif': [(480, url), (800, url), ...], 'webp': [...]},
+        }
+    or None when the original doesn't exist. Missing renditions are simply
+    absent from `sources`; templates then fall back to the original.
+    """
+    if not name:
+        return None
+    key = _cache_key(name)
+    info = cache.get(key)
+    if info is not None:
+        return info or None
+
+    if not storage.exists(name):
+        # Cache the miss too so a broken upload doesn't cost a stat() per render.
+        cache.set(key, {}, CACHE_TIMEOUT)
+        return None
+
+    with storage.open(name, 'rb') as fh:
+        # Image.open only parses the header, so this is cheap even for big PNGs.
+        width, height = Image.open(fh).size
+
+    sources = {}
+    for fmt in RENDITION_FORMATS:
+        available = [
+            (w, storage.url(rendition_name(name, w, fmt)))
+            for w in _target_widths(width)
+            if storage.exists(rendition_name(name, w, fmt))
+        ]
+        if available:
+            sources[fmt] = available
+
+    info = {'width': width, 'height': height, 'sources': sources}
+    cache.set(key, info, CACHE_TIMEOUT)
+    return info
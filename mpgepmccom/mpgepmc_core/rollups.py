@@ -0,0 +1,189 @@
+# mpgepmc_core/rollups.py
+"""
+Daily and monthly donation totals per status, maintained incrementally.
+
+DonationDailyRollup and DonationMonthlyRollup hold the number and the total
+amount of the donations created on a (local) day or in a month that are
+currently in each status. Every write that creates or deletes a donation, or
+changes its status or amount, adds the difference to its buckets:
+
+- Donation.save() / delete(): signals.update_donation_rollups and
+  signals.remove_from_donation_rollups
+- bulk status changes: donations.transition_donations()
+
+Each change is one INSERT ... ON CONFLICT DO UPDATE per table that adds to
+the stored totals, so concurrent writers never overwrite each other's
+increments. Writes that bypass both (bulk_create, queryset.update() on
+status or amount, raw SQL) need `rebuild_donation_rollups`, which
+recomputes the tables from Donation with one aggregate query.
+
+Reports read only these tables, so their cost follows the length of the
+date range rather than the number of donations.
+"""
+from collections import defaultdict
+from decimal import Decimal
+
+from django.db import IntegrityError, connections, router, transaction
+from django.db.models import Count, F, Sum
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from .models import Donation, DonationDailyRollup, DonationMonthlyRollup
+
+# Backends with INSERT ... ON CONFLICT (...) DO UPDATE; others update, then insert
+UPSERT_VENDORS = ('sqlite', 'postgresql')
+
+STATUSES = Donation.DonationStatus.values
+
+
+def donation_day(created_at):
+    """The local date a donation created at `created_at` is reported under."""
+    return timezone.localdate(created_at) if timezone.is_aware(created_at) else created_at.date()
+
+
+def month_of(day):
+    return day.replace(day=1)
+
+
+def apply_changes(changes, using=None):
+    """
+    Adds `changes`, an iterable of (created_at, status, count delta, amount
+    delta), to the daily and monthly buckets. Two statements whatever the
+    number of changes.
+    """
+    daily = defaultdict(lambda: [0, Decimal(0)])
+    for created_at, status, count, amount in changes:
+        bucket = daily[donation_day(created_at), status]
+        bucket[0] += count
+        bucket[1] += amount
+    _add(DonationDailyRollup, 'day', daily, using)
+    _add(DonationMonthlyRollup, 'month', _monthly(daily), using)
+
+
+def _add(model, period_field, buckets, using):
+    rows = [(period, status, count, amount) for (period, status), (count, amount) in buckets.items()
+            if count or amount]
+    if not rows:
+        return
+    using = using or router.db_for_write(model)
+    connection = connections[using]
+    if connection.vendor not in UPSERT_VENDORS:
+        for period, status, count, amount in rows:
+            _add_one(model.objects.using(using), {period_field: period, 'status': status}, count, amount)
+        return
+
+    quote = connection.ops.quote_name
+    table = quote(model._meta.db_table)
+    columns = [quote(name) for name in (period_field, 'status', 'count', 'amount')]
+    params = []
+    for period, status, count, amount in rows:
+        params += [connection.ops.adapt_datefield_value(period), status, count,
+                   connection.ops.adapt_decimalfield_value(amount)]
+    values = ', '.join(['(%s, %s, %s, %s)'] * len(rows))
+    sql = (
+        f"INSERT INTO {table} ({', '.join(columns)}) VALUES {values} "
+        f"ON CONFLICT ({columns[0]}, {columns[1]}) DO UPDATE SET "
+        f"{columns[2]} = {table}.{columns[2]} + excluded.{columns[2]}, "
+        f"{columns[3]} = {table}.{columns[3]} + excluded.{columns[3]}"
+    )
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+
+
+def _add_one(manager, bucket, count, amount):
+    increment = {'count': F('count') + count, 'amount': F('amount') + amount}
+    if manager.filter(**bucket).update(**increment):
+        return
+    try:
+        with transaction.atomic(using=manager.db):
+            manager.create(**bucket, count=count, amount=amount)
+    except IntegrityError:
+        # Another transaction created the bucket since our UPDATE
+        manager.filter(**bucket).update(**increment)
+
+
+def actual_totals(using=None):
+    """{(day, status): (count, amount)} computed from Donation itself, in one aggregate query."""
+    rows = (
+        Donation.objects.using(using).annotate(day=TruncDate('created_at')).order_by()
+        .values_list('day', 'status').annotate(count=Count('pk'), amount=Sum('amount'))
+    )
+    return {(day, status): (count, amount) for day, status, count, amount in rows}
+
+
+def _monthly(daily):
+    monthly = defaultdict(lambda: [0, Decimal(0)])
+    for (day, status), (count, amount) in daily.items():
+        bucket = monthly[month_of(day), status]
+        bucket[0] += count
+        bucket[1] += amount
+    return {key: tuple(value) for key, value in monthly.items()}
+
+
+def rebuild_rollups(using=None):
+    """Replaces both tables with totals recomputed from Donation. Returns (daily rows, monthly rows)."""
+    with transaction.atomic(using=using):
+        daily = actual_totals(using)
+        monthly = _monthly(daily)
+        DonationDailyRollup.objects.using(using).all().delete()
+        DonationMonthlyRollup.objects.using(using).all().delete()
+        DonationDailyRollup.objects.using(using).bulk_create(
+            [DonationDailyRollup(day=day, status=status, count=count, amount=amount)
+             for (day, status), (count, amount) in daily.items()],
+            batch_size=500,
+        )
+        DonationMonthlyRollup.objects.using(using).bulk_create(
+            [DonationMonthlyRollup(month=month, status=status, count=count, amount=amount)
+             for (month, status), (count, amount) in monthly.items()],
+            batch_size=500,
+        )
+    return len(daily), len(monthly)
+
+
+def rollup_drift(using=None):
+    """
+    [(table, period, status, stored (count, amount), actual (count, amount))]
+    for every bucket that doesn't match Donation. Empty buckets count as (0, 0).
+    """
+    daily = actual_totals(using)
+    expected = {DonationDailyRollup: daily, DonationMonthlyRollup: _monthly(daily)}
+    drift = []
+    for model, period_field in ((DonationDailyRollup, 'day'), (DonationMonthlyRollup, 'month')):
+        stored = {
+            (period, status): (count, amount)
+            for period, status, count, amount
+            in model.objects.using(using).values_list(period_field, 'status', 'count', 'amount')
+        }
+        actual = expected[model]
+        for key in sorted(set(stored) | set(actual)):
+            have, want = stored.get(key, (0, 0)), actual.get(key, (0, 0))
+            if have[0] != want[0] or Decimal(have[1]) != Decimal(want[1]):
+                drift.append((model._meta.db_table, *key, have, want))
+    return drift
+
+
+def donation_report(start, end, by='day'):
+    """
+    Totals for donations created from `start` to `end` (dates, inclusive),
+    per day or per month, read from the rollups only. A monthly report
+    covers the whole months that `start` and `end` fall in.
+
+    Returns {'rows': [(period, [(count, amount) per status])], 'totals': [(count, amount) per status]}
+    with statuses in STATUSES order, leaving out periods without donations.
+    """
+    if by == 'month':
+        rows = DonationMonthlyRollup.objects.filter(month__range=(month_of(start), month_of(end)))
+        period_field = 'month'
+    else:
+        rows = DonationDailyRollup.objects.filter(day__range=(start, end))
+        period_field = 'day'
+    column = {status: index for index, status in enumerate(STATUSES)}
+    periods = {}
+    totals = [(0, Decimal(0))] * len(STATUSES)
+    for period, status, count, amount in (
+        rows.exclude(count=0).order_by(period_field).values_list(period_field, 'status', 'count', 'amount')
+    ):
+        periods.setdefault(period, [(0, Decimal(0))] * len(STATUSES))[column[status]] = (count, amount)
+        total_count, total_amount = totals[column[status]]
+        totals[column[status]] = (total_count + count, total_amount + amount)
+    return {'rows': list(periods.items()), 'totals': totals}
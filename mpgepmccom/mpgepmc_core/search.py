@@ -0,0 +1,192 @@
+# mpgepmc_core/search.py
+"""
+Site search backed by an SQLite FTS5 index.
+
+Blog posts, projects and services share one virtual table,
+`mpgepmc_core_searchindex`, created in migration 0003. Each row's rowid is
+derived from (kind, object id), so signal handlers can replace or remove a
+single document with a rowid lookup instead of scanning the index.
+
+Bodies are indexed as plain text (HTML stripped); results are ranked with
+bm25() weighting titles above bodies and carry an FTS5 snippet().
+"""
+import re
+
+from django.db import connection, connections, transaction
+from django.db.models.expressions import RawSQL
+from django.urls import reverse
+from django.utils.html import escape, strip_tags
+from django.utils.safestring import mark_safe
+
+from .models import MpgBlog, MpgService, Project
+
+TABLE = 'mpgepmc_core_searchindex'
+
+# kind -> (code used in the rowid, title field, text fields, published flag, url name, url kwarg)
+SEARCH_KINDS = {
+    'blog': (1, 'title', ('short_summary', 'content'), 'is_published', 'mpgepmc_core:blog_detail', 'slug'),
+    'project': (2, 'title', ('short_description', 'full_description'), 'is_published', 'mpgepmc_core:project_detail', 'project_slug'),
+    'service': (3, 'name', ('short_description', 'full_description'), 'is_active', 'mpgepmc_core:service_detail', 'service_slug'),
+}
+KIND_MODELS = {'blog': MpgBlog, 'project': Project, 'service': MpgService}
+MODEL_KINDS = {model: kind for kind, model in KIND_MODELS.items()}
+
+KIND_LABELS = {'blog': 'Article', 'project': 'Project', 'service': 'Service'}
+
+ROWID_STRIDE = 8
+
+# bm25 column weights: kind, object_id, slug, published (unindexed), title, body
+BM25_WEIGHTS = '0.0, 0.0, 0.0, 0.0, 8.0, 1.0'
+
+# Private-use sentinels wrap snippet matches so the text can be escaped before adding <mark>.
+_MARK_OPEN, _MARK_CLOSE = '\ue000', '\ue001'
+
+_QUERY_TOKEN_RE = re.compile(r'\w+', re.UNICODE)
+
+
+class SearchResult:
+    def __init__(self, kind, object_id, slug, title, snippet):
+        self.kind = kind
+        self.object_id = object_id
+        self.slug = slug
+        self.title = title
+        self.snippet = snippet
+
+    @property
+    def kind_label(self):
+        return KIND_LABELS[self.kind]
+
+    @property
+    def url(self):
+        _code, _title, _fields, _flag, url_name, url_kwarg = SEARCH_KINDS[self.kind]
+        return reverse(url_name, kwargs={url_kwarg: self.slug})
+
+
+def is_available(using=None):
+    """FTS5 ships with every modern SQLite build, but other backends don't have it."""
+    return (using or connection).vendor == 'sqlite'
+
+
+def rowid_for(kind, object_id):
+    return object_id * ROWID_STRIDE + SEARCH_KINDS[kind][0]
+
+
+def _document(kind, values):
+    _code, title_field, text_fields, flag_field, _url, _kwarg = SEARCH_KINDS[kind]
+    body = ' '.join(strip_tags(values.get(field) or '') for field in text_fields)
+    return (
+        rowid_for(kind, values['id']), kind, values['id'], values['slug'] or '',
+        1 if values[flag_field] else 0, values[title_field], ' '.join(body.split()),
+    )
+
+
+def _upsert(cursor, documents):
+    documents = list(documents)
+    cursor.executemany(f"DELETE FROM {TABLE} WHERE rowid = %s", [(document[0],) for document in documents])
+    cursor.executemany(
+        f"INSERT INTO {TABLE} (rowid, kind, object_id, slug, published, title, body) "
+        f"VALUES (%s, %s, %s, %s, %s, %s, %s)",
+        documents,
+    )
+
+
+def index_object(instance):
+    """Adds or refreshes a single blog post, project or service in the index."""
+    if not is_available():
+        return
+    kind = MODEL_KINDS[type(instance)]
+    values = {field.attname: getattr(instance, field.attname) for field in instance._meta.concrete_fields}
+    with connection.cursor() as cursor:
+        _upsert(cursor, [_document(kind, values)])
+
+
+def remove_object(instance):
+    if not is_available():
+        return
+    kind = MODEL_KINDS[type(instance)]
+    with connection.cursor() as cursor:
+        cursor.execute(f"DELETE FROM {TABLE} WHERE rowid = %s", [rowid_for(kind, instance.pk)])
+
+
+def rebuild_search_index(models=None, using='default', batch_size=500):
+    """
+    Re-indexes everything. `models` maps kind -> model class and defaults to
+    the live models; migrations pass their historical models instead.
+    """
+    models = models or KIND_MODELS
+    db = connections[using]
+    if not is_available(db):
+        return 0
+    total = 0
+    with transaction.atomic(using=using), db.cursor() as cursor:
+        cursor.execute(f"DELETE FROM {TABLE}")
+        for kind, model in models.items():
+            _code, title_field, text_fields, flag_field, _url, _kwarg = SEARCH_KINDS[kind]
+            rows = model._default_manager.using(using).values('id', 'slug', title_field, flag_field, *text_fields)
+            batch = []
+            for values in rows.iterator(chunk_size=batch_size):
+                batch.append(_document(kind, values))
+                if len(batch) >= batch_size:
+                    _upsert(cursor, batch)
+                    total += len(batch)
+                    batch = []
+            _upsert(cursor, batch)
+            total += len(batch)
+        cursor.execute(f"INSERT INTO {TABLE}({TABLE}) VALUES ('optimize')")
+    return total
+
+
+def build_match_query(query):
+    """
+    Turns free text into a safe FTS5 MATCH expression: every word is quoted
+    (so operators and punctuation in user input can't break the syntax) and
+    the last word is a prefix match for search-as-you-type.
+    """
+    tokens = _QUERY_TOKEN_RE.findall(query or '')[:12]
+    if not tokens:
+        return ''
+    terms = [f'"{token}"' for token in tokens]
+    terms[-1] += '*'
+    return ' '.join(terms)
+
+
+def _render_snippet(raw):
+    return mark_safe(escape(raw).replace(_MARK_OPEN, '<mark>').replace(_MARK_CLOSE, '</mark>'))
+
+
+def search(query, kinds=None, limit=20, offset=0):
+    """Ranked public search over published content. Returns a list of SearchResult."""
+    match = build_match_query(query)
+    if not match or not is_available():
+        return []
+    kinds = [kind for kind in (kinds or SEARCH_KINDS) if kind in SEARCH_KINDS]
+    placeholders = ', '.join(['%s'] * len(kinds))
+    sql = (
+        f"SELECT kind, object_id, slug, title, "
+        f"snippet({TABLE}, 5, %s, %s, ' … ', 24) "
+        f"FROM {TABLE} WHERE {TABLE} MATCH %s AND published = 1 AND kind IN ({placeholders}) "
+        f"ORDER BY bm25({TABLE}, {BM25_WEIGHTS}) LIMIT %s OFFSET %s"
+    )
+    with connection.cursor() as cursor:
+        cursor.execute(sql, [_MARK_OPEN, _MARK_CLOSE, match, *kinds, limit, offset])
+        rows = cursor.fetchall()
+    return [
+        SearchResult(kind, object_id, slug, title, _render_snippet(snippet))
+        for kind, object_id, slug, title, snippet in rows
+    ]
+
+
+def matching_ids(model, query):
+    """
+    A subquery of the primary keys of every `model` object matching `query`,
+    published or not, for `.filter(pk__in=...)` (the admin search). Unranked
+    and unlimited, since the changelist applies its own ordering and paging.
+    None if the query has no searchable words.
+    """
+    match = build_match_query(query)
+    if not match:
+        return None
+    return RawSQL(
+        f"SELECT object_id FROM {TABLE} WHERE {TABLE} MATCH %s AND kind = %s",
+        [match, MODEL_KINDS[model]],
+    )
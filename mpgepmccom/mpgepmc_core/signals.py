@@ -1,42 +1,196 @@
 # mpgepmc/signals.py
-from django.db.models.signals import post_save
+import logging
+
+from django.db.models.signals import post_save, post_delete
 from django.dispatch import receiver
-from django.template.loader import render_to_string
-from django.utils.html import strip_tags
 from django.conf import settings
-from .models import Donation
-from .views import EmailThread # We can reuse the EmailThread class from views
+from django.db import transaction
+from .donations import status_email
+from .feeds import refresh_published_files
+from .models import Donation, DonationStatusTransition, MpgBlog, MpgService, Project, ServicePackage, ServiceFeature, BankAccount
+from .related import INDEXED_MODELS, rebuild_related_index
+from .renditions import ensure_renditions, delete_renditions
+from .rollups import apply_changes as apply_rollup_changes
+from .search import MODEL_KINDS, SEARCH_KINDS, index_object, remove_object
+from .slips import release_slip
+from .versions import bump_versions, version_name
+from .outbox import enqueue_email
+
+logger = logging.getLogger(__name__)
+
+# Model -> name of its feature image field, used for responsive renditions
+IMAGE_FIELDS = {
+    MpgBlog: 'feature_image',
+    MpgService: 'image',
+    Project: 'image',
+}
+
+
+def saved_fields_touch(update_fields, *field_names):
+    """
+    True if a save wrote any of `field_names`. Existing rows are saved with
+    update_fields limited to what changed (see tracking.ChangeTrackingMixin);
+    update_fields is None for new rows, which always count.
+    """
+    return update_fields is None or not update_fields.isdisjoint(field_names)
+
 
 @receiver(post_save, sender=Donation)
-def send_status_update_email(sender, instance, created, **kwargs):
+def record_status_change(sender, instance, created, update_fields=None, **kwargs):
     """
-    Send an email to the user when their donation status is updated
-    by an admin to 'Completed' or 'Failed'.
+    Log a one-at-a-time status change (e.g. from the admin change form) and
+    email the donor. Bulk changes go through donations.transition_donations(),
+    which does both set-wise.
     """
     # We only want to run this on an update, not on creation
-    if not created:
-        # Check if the status has actually changed
-        original_status = getattr(instance, '__original_status', None)
-        
-        if original_status != instance.status:
-            subject = ""
-            html_message = ""
-            
-            if instance.status == 'COMPLETED':
-                subject = f"Your Donation to MPG EPMC is Complete! ({instance.donation_order_number})"
-                html_message = render_to_string('mpgepmc/email/donation_completed_user.html', {'donation': instance})
-            
-            elif instance.status == 'FAILED':
-                subject = f"Update Regarding Your Donation to MPG EPMC ({instance.donation_order_number})"
-                html_message = render_to_string('mpgepmc/email/donation_failed_user.html', {'donation': instance})
-            
-            # If a subject was set (meaning status is COMPLETED or FAILED) and the user has an email, send it
-            if subject and instance.email:
-                plain_message = strip_tags(html_message)
-                EmailThread(
-                    subject,
-                    plain_message,
-                    settings.DEFAULT_FROM_EMAIL,
-                    [instance.email],
-                    html_message=html_message
-                ).start()
\ No newline at end of file
+    if created or not saved_fields_touch(update_fields, 'status'):
+        return
+    original_status = instance.get_original('status')
+    if original_status == instance.status:
+        return
+
+    DonationStatusTransition.objects.create(
+        donation=instance, from_status=original_status, to_status=instance.status,
+        changed_by=getattr(instance, '_status_changed_by', None),
+    )
+    # Only COMPLETED and FAILED have a donor email (see donations.STATUS_EMAILS),
+    # and only if the donor left an email address
+    email = status_email(instance)
+    if email:
+        enqueue_email(*email)
+
+
+@receiver(post_save, sender=Donation)
+def update_donation_rollups(sender, instance, created, update_fields=None, **kwargs):
+    """Move the donation between the daily/monthly totals (see rollups.py) in the same transaction."""
+    if created:
+        apply_rollup_changes([(instance.created_at, instance.status, 1, instance.amount)])
+        return
+    if not saved_fields_touch(update_fields, 'status', 'amount'):
+        return
+    old_status, old_amount = instance.get_original('status'), instance.get_original('amount')
+    if (old_status, old_amount) != (instance.status, instance.amount):
+        apply_rollup_changes([
+            (instance.created_at, old_status, -1, -old_amount),
+            (instance.created_at, instance.status, 1, instance.amount),
+        ])
+
+
+@receiver(post_delete, sender=Donation)
+def remove_from_donation_rollups(sender, instance, **kwargs):
+    apply_rollup_changes([(instance.created_at, instance.status, -1, -instance.amount)])
+
+
+@receiver(post_delete, sender=Donation)
+def release_donation_slip(sender, instance, **kwargs):
+    """Slips are shared by content (see slips.py): delete the file once its last donation is gone."""
+    if instance.slip_sha256:
+        slip = instance.transaction_slip
+        transaction.on_commit(lambda: release_slip(Donation, slip.storage, slip.name, instance.slip_sha256))
+
+
+@receiver(post_save, sender=MpgBlog)
+@receiver(post_save, sender=MpgService)
+@receiver(post_save, sender=Project)
+def generate_image_renditions(sender, instance, update_fields=None, **kwargs):
+    """
+    Create the WebP/AVIF renditions for a freshly saved feature image and
+    drop the ones belonging to the image it replaced.
+    """
+    field_name = IMAGE_FIELDS[sender]
+    if not saved_fields_touch(update_fields, field_name):
+        return
+    previous = instance.get_original(field_name)
+    image = getattr(instance, field_name)
+    if previous and previous != image.name:
+        delete_renditions(previous)
+    if image:
+        try:
+            ensure_renditions(image.name)
+        except Exception:
+            # A bad upload must never block saving the content itself
+            logger.exception("Generating renditions for %s failed", image.name)
+
+
+@receiver(post_delete, sender=MpgBlog)
+@receiver(post_delete, sender=MpgService)
+@receiver(post_delete, sender=Project)
+def remove_image_renditions(sender, instance, **kwargs):
+    image = getattr(instance, IMAGE_FIELDS[sender])
+    if image:
+        delete_renditions(image.name)
+
+
+@receiver(post_save, sender=MpgBlog)
+@receiver(post_save, sender=MpgService)
+@receiver(post_save, sender=ServicePackage)
+@receiver(post_save, sender=ServiceFeature)
+@receiver(post_save, sender=Project)
+@receiver(post_delete, sender=MpgBlog)
+@receiver(post_delete, sender=MpgService)
+@receiver(post_delete, sender=ServicePackage)
+@receiver(post_delete, sender=ServiceFeature)
+@receiver(post_delete, sender=Project)
+def invalidate_cached_pages(sender, instance, **kwargs):
+    """
+    Bump the model's version stamp so every cached page built from it is
+    dropped (see page_cache.py). Pages that don't show this model are kept.
+    """
+    bump_versions(version_name(sender))
+
+
+@receiver(post_save, sender=BankAccount)
+@receiver(post_delete, sender=BankAccount)
+def invalidate_bank_account(sender, instance, **kwargs):
+    """The active bank account lives in the site snapshot (see site_snapshot.py)."""
+    bump_versions(version_name(sender))
+
+
+@receiver(post_save, sender=MpgBlog)
+@receiver(post_save, sender=Project)
+@receiver(post_delete, sender=MpgBlog)
+@receiver(post_delete, sender=Project)
+def refresh_related_index(sender, instance, update_fields=None, **kwargs):
+    """
+    With RELATED_INDEX_REBUILD_ON_SAVE on, recompute the related-content
+    neighbour lists once the edit is committed. That re-reads every published
+    item, so by default `build_related_index` runs on a schedule instead.
+    """
+    _link_model, *text_fields = INDEXED_MODELS[sender]
+    if not saved_fields_touch(update_fields, 'is_published', *text_fields):
+        return
+    if settings.RELATED_INDEX_REBUILD_ON_SAVE:
+        transaction.on_commit(lambda: rebuild_related_index(sender))
+
+
+@receiver(post_save, sender=MpgBlog)
+@receiver(post_save, sender=MpgService)
+@receiver(post_save, sender=Project)
+@receiver(post_delete, sender=MpgBlog)
+@receiver(post_delete, sender=MpgService)
+@receiver(post_delete, sender=Project)
+def refresh_sitemaps_and_feeds(sender, instance, **kwargs):
+    """
+    Rewrite the item's sitemap chunk, its section's feeds and the sitemap index
+    once the edit is committed, so publishing or unpublishing shows up for crawlers.
+    """
+    if settings.PUBLISHED_FILES_REBUILD_ON_SAVE:
+        pk = instance.pk
+        transaction.on_commit(lambda: refresh_published_files(sender, pk))
+
+
+@receiver(post_save, sender=MpgBlog)
+@receiver(post_save, sender=MpgService)
+@receiver(post_save, sender=Project)
+def update_search_index(sender, instance, update_fields=None, **kwargs):
+    """Keep the FTS5 search index in step with the content, one document at a time."""
+    _code, title_field, text_fields, flag_field, _url, _kwarg = SEARCH_KINDS[MODEL_KINDS[sender]]
+    if saved_fields_touch(update_fields, 'slug', title_field, flag_field, *text_fields):
+        index_object(instance)
+
+
+@receiver(post_delete, sender=MpgBlog)
+@receiver(post_delete, sender=MpgService)
+@receiver(post_delete, sender=Project)
+def remove_from_search_index(sender, instance, **kwargs):
+    remove_object(instance)
@@ -0,0 +1,88 @@
+# mpgepmc_core/site_snapshot.py
+"""
+In-process snapshot of the site-wide values every page may need: the footer
+lists and the active donation bank account.
+
+The snapshot is built on first use and reused until the version stamp of
+MpgService, MpgBlog or BankAccount changes, so a warm request reads it
+without touching the database. It is also rebuilt once it is
+SITE_SNAPSHOT_MAX_AGE seconds old: the stamps only reach every worker when
+the content cache is shared, and checkout must never keep showing a bank
+account that has been replaced.
+"""
+import threading
+import time
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+
+from .cards import cards
+from .models import BankAccount, MpgBlog, MpgService
+from .versions import aget_versions, get_versions, version_name
+
+SNAPSHOT_MODELS = (MpgService, MpgBlog, BankAccount)
+SNAPSHOT_VERSION_NAMES = tuple(version_name(model) for model in SNAPSHOT_MODELS)
+
+FOOTER_ITEMS = 4
+
+_snapshot = None
+_lock = threading.Lock()
+
+
+class SiteSnapshot:
+    def __init__(self, version, latest_services_footer, latest_blogs_footer, active_bank_account):
+        self.version = version
+        self.latest_services_footer = latest_services_footer
+        self.latest_blogs_footer = latest_blogs_footer
+        self.active_bank_account = active_bank_account
+        self.built_at = time.monotonic()
+
+    def is_current(self, version):
+        return self.version == version and time.monotonic() - self.built_at < settings.SITE_SNAPSHOT_MAX_AGE
+
+    @classmethod
+    def build(cls, version):
+        try:
+            latest_services_footer = list(
+                cards(MpgService.objects.filter(is_active=True)).order_by('-created_at')[:FOOTER_ITEMS]
+            )
+            latest_blogs_footer = list(
+                cards(MpgBlog.objects.filter(is_published=True)).order_by('-posted_date')[:FOOTER_ITEMS]
+            )
+            active_bank_account = BankAccount.objects.filter(is_active=True).first()
+        except Exception:
+            # Keep error pages rendering even if the database is unavailable;
+            # an empty snapshot isn't stored, so the next request retries.
+            return cls(None, [], [], None)
+        return cls(version, latest_services_footer, latest_blogs_footer, active_bank_account)
+
+
+def snapshot_version():
+    """Version stamp of the current site-wide data (changes when any snapshot model is saved)."""
+    return ':'.join(get_versions(*SNAPSHOT_VERSION_NAMES))
+
+
+def get_site_snapshot():
+    """Returns the current snapshot, rebuilding it only if its version is stale."""
+    global _snapshot
+    version = snapshot_version()
+    snapshot = _snapshot
+    if snapshot is not None and snapshot.is_current(version):
+        return snapshot
+
+    with _lock:
+        if _snapshot is not None and _snapshot.is_current(version):
+            return _snapshot
+        snapshot = SiteSnapshot.build(version)
+        if snapshot.version is not None:
+            _snapshot = snapshot
+        return snapshot
+
+
+async def aget_site_snapshot():
+    """get_site_snapshot() for async views: no thread hop unless the snapshot has to be rebuilt."""
+    version = ':'.join(await aget_versions(*SNAPSHOT_VERSION_NAMES))
+    snapshot = _snapshot
+    if snapshot is not None and snapshot.is_current(version):
+        return snapshot
+    return await sync_to_async(get_site_snapshot)()
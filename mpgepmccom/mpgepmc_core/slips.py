@@ -0,0 +1,166 @@
+# mpgepmc_core/slips.py
+"""
+Content-addressed storage for donation transaction slips, and detection of
+reused receipts.
+
+A slip is stored once under the SHA-256 of its bytes,
+donation_slips/<2 hex>/<sha256>.<ext>, however many donations upload it.
+Donation.slip_sha256 records the hash, so the donations pointing at a file
+are one indexed lookup away: that count is the file's reference count, and
+the file is deleted after the last donation using it is deleted or given
+another slip.
+
+An upload of bytes that are already stored writes nothing, so a release
+running at the same time could delete the file the new donation is about to
+point at. release_slip() checks for references and deletes inside one
+transaction (a write transaction under SQLITE_PRODUCTION_MODE's BEGIN
+IMMEDIATE, so it is serialised with donation saves), and the upload calls
+restore_slip() once it has committed to put back a file deleted before then.
+
+The same index flags a reused receipt when the verification form is
+submitted (Donation.slip_reused), and an indexed, normalised copy of the
+transaction id (Donation.transaction_reference) flags a reused bank
+reference (Donation.reference_reused). Both flags are set on every donation
+involved, so whichever one a verifier opens shows the warning.
+"""
+import hashlib
+import os
+import re
+
+from django.db import transaction
+from django.db.models import Count
+
+SLIP_DIR = 'donation_slips'
+
+_NOT_ALPHANUMERIC_RE = re.compile(r'[^0-9A-Z]')
+
+
+def normalise_reference(transaction_id):
+    """'tx 00-12/ab' -> 'TX0012AB': the form banks print and donors retype differ in case and separators."""
+    return _NOT_ALPHANUMERIC_RE.sub('', (transaction_id or '').upper())
+
+
+def file_sha256(file):
+    """Hex SHA-256 of a Django File, read in chunks; leaves it rewound."""
+    digest = hashlib.sha256()
+    file.seek(0)
+    for chunk in file.chunks():
+        digest.update(chunk)
+    file.seek(0)
+    return digest.hexdigest()
+
+
+def slip_name(digest, filename):
+    extension = os.path.splitext(filename)[1].lower()
+    return f"{SLIP_DIR}/{digest[:2]}/{digest}{extension}"
+
+
+def store_slip(field_file):
+    """
+    Stores a newly uploaded slip under its content address, unless those
+    bytes are already stored, and points `field_file` at it. Returns the hash.
+    """
+    digest = file_sha256(field_file.file)
+    name = slip_name(digest, field_file.name)
+    _save_once(field_file.storage, name, field_file.file)
+    field_file.name = name
+    field_file._committed = True
+    return digest
+
+
+def _save_once(storage, name, content):
+    if not storage.exists(name):
+        saved = storage.save(name, content)
+        if saved != name:
+            # The same bytes were stored in the meantime; keep one copy
+            storage.delete(saved)
+
+
+def restore_slip(storage, name, content):
+    """Stores `content` under `name` again if a concurrent release_slip() deleted it. Run after commit."""
+    content.seek(0)
+    _save_once(storage, name, content)
+
+
+def release_slip(model, storage, name, digest):
+    """Deletes a content-addressed slip if no `model` row refers to it any more. Run after commit."""
+    if not (name and digest):
+        return
+    manager = model._default_manager
+    with transaction.atomic(using=manager.db):
+        if not manager.filter(slip_sha256=digest).exists():
+            storage.delete(name)
+
+
+def reuse_flags(donation):
+    """(slip_reused, reference_reused) for `donation` against every other donation; two index lookups."""
+    others = type(donation)._default_manager.exclude(pk=donation.pk)
+    slip_reused = bool(donation.slip_sha256) and others.filter(slip_sha256=donation.slip_sha256).exists()
+    reference_reused = (
+        bool(donation.transaction_reference)
+        and others.filter(transaction_reference=donation.transaction_reference).exists()
+    )
+    return slip_reused, reference_reused
+
+
+def flag_matches(donation):
+    """Marks the other donations that share `donation`'s slip or reference."""
+    others = type(donation)._default_manager.exclude(pk=donation.pk)
+    if donation.slip_reused:
+        others.filter(slip_sha256=donation.slip_sha256, slip_reused=False).update(slip_reused=True)
+    if donation.reference_reused:
+        others.filter(
+            transaction_reference=donation.transaction_reference, reference_reused=False
+        ).update(reference_reused=True)
+
+
+def refresh_reuse_flags(model, using=None):
+    """Recomputes both flags for every row of `model`, set-wise. Returns (slips reused, references reused)."""
+    manager = model._default_manager.db_manager(using)
+    counts = []
+    for field, flag in (('slip_sha256', 'slip_reused'), ('transaction_reference', 'reference_reused')):
+        shared = (
+            manager.exclude(**{field: ''}).order_by()
+            .values(field).annotate(uses=Count('pk')).filter(uses__gt=1).values(field)
+        )
+        counts.append(manager.filter(**{f'{field}__in': shared}).update(**{flag: True}))
+        manager.exclude(**{f'{field}__in': shared}).filter(**{flag: True}).update(**{flag: False})
+    return tuple(counts)
+
+
+def consolidate_slips(model, dry_run=False):
+    """
+    Moves slips stored under their old per-order-number names to content
+    addresses and fills in slip_sha256, so byte-identical legacy slips end up
+    as one file; follow with refresh_reuse_flags(). Returns counts of what it
+    did (or would do).
+    """
+    manager = model._default_manager
+    storage = model._meta.get_field('transaction_slip').storage
+    stats = dict.fromkeys(('hashed', 'stored', 'removed', 'missing'), 0)
+    stored = set()
+    old_names = set()
+    legacy = manager.filter(slip_sha256='').exclude(transaction_slip='').order_by('pk')
+    for pk, name in legacy.values_list('pk', 'transaction_slip').iterator():
+        if not storage.exists(name):
+            stats['missing'] += 1
+            continue
+        with storage.open(name) as handle:
+            digest = file_sha256(handle)
+            new_name = slip_name(digest, name)
+            stats['hashed'] += 1
+            if new_name not in stored and not storage.exists(new_name):
+                stats['stored'] += 1
+                if not dry_run:
+                    storage.save(new_name, handle)
+            stored.add(new_name)
+        old_names.add(name)
+        if not dry_run:
+            manager.filter(pk=pk).update(transaction_slip=new_name, slip_sha256=digest)
+
+    stats['removed'] = len(old_names)
+    if not dry_run:
+        for name in old_names:
+            if not manager.filter(transaction_slip=name).exists():
+                storage.delete(name)
+    return stats
@@ -0,0 +1,256 @@
+# mpgepmc_core/static_export.py
+"""
+Static HTML export of the read-only public pages, for nginx or a CDN.
+
+Home, the first page of each listing, every published blog post and project,
+every active service and the legal pages are rendered through the normal
+views into EXPORT_ROOT/<path>/index.html (with a .gz copy). Collected static
+files and the public upload directories are copied next to them. Forms,
+search, "load more" pages (?after=...), donations and checkout stay dynamic.
+A typical nginx setup serves the tree for plain GETs and falls back to Django:
+
+    location / {
+        if ($args) { proxy_pass http://django; break; }  # or an error_page / @django dance
+        root /srv/mpgepmc/export;
+        gzip_static on;
+        try_files $uri $uri/index.html @django;
+    }
+
+Incremental runs: every page declares the data it shows as dependency keys
+('blog:12', 'related:blog:12', 'footer', ...). Each key gets a stamp from a
+handful of set-wide queries (updated_date / updated_at, neighbour slugs,
+related lists, a digest of the catalog entry...). The manifest records the
+stamps each page was rendered with, so a run re-renders only the pages with
+a changed stamp, renders new pages and deletes pages that have gone.
+"""
+import gzip
+import hashlib
+import json
+import os
+import shutil
+
+from django.conf import settings
+from django.db.models import F, Window
+from django.db.models.functions import Lag, Lead
+from django.test import Client, override_settings
+from django.urls import reverse
+
+from .cards import cards
+from .catalog import build_catalog
+from .media import PUBLIC_MEDIA_DIRS
+from .models import MpgBlog, MpgService, Project, RelatedBlog, RelatedProject
+from .site_snapshot import FOOTER_ITEMS
+
+MANIFEST_NAME = '.manifest.json'
+
+# Pages that show nothing but the footer besides fixed text
+FIXED_PAGES = ('privacy_policy', 'terms_and_conditions')
+
+
+def _digest(value):
+    return hashlib.sha1(json.dumps(value, sort_keys=True, default=str).encode()).hexdigest()[:16]
+
+
+def _listing_stamp(model, stamps, prefix):
+    """The first listing page: which items, in which order, in what state, and whether there are more."""
+    ids = list(
+        model.objects.filter(is_published=True).order_by('-posted_date', '-id')
+        .values_list('pk', flat=True)[:settings.LISTING_PAGE_SIZE + 1]
+    )
+    return _digest([(pk, stamps.get(f'{prefix}:{pk}')) for pk in ids])
+
+
+def _neighbour_stamps(stamps):
+    """Previous/next links of every blog post, in one window query."""
+    order = [F('posted_date').desc(), F('id').desc()]
+    rows = MpgBlog.objects.filter(is_published=True).annotate(
+        older=Window(Lead('slug'), order_by=order),
+        newer=Window(Lag('slug'), order_by=order),
+    ).values_list('pk', 'older', 'newer')
+    for pk, older, newer in rows:
+        stamps[f'neighbours:blog:{pk}'] = _digest([older, newer])
+
+
+def _related_stamps(link_model, prefix, stamps):
+    """Each item's related list, including the state of the items it shows."""
+    related = {}
+    for source, target in link_model.objects.order_by('source_id', 'rank').values_list('source_id', 'target_id'):
+        if f'{prefix}:{target}' in stamps:  # only published targets are shown
+            related.setdefault(source, []).append((target, stamps[f'{prefix}:{target}']))
+    for source, targets in related.items():
+        stamps[f'related:{prefix}:{source}'] = _digest(targets)
+
+
+def current_stamps():
+    """{dependency key: stamp} for everything the exported pages show."""
+    stamps = {}
+    for pk, updated in MpgBlog.objects.filter(is_published=True).values_list('pk', 'updated_date'):
+        stamps[f'blog:{pk}'] = updated.isoformat()
+    for pk, updated in Project.objects.filter(is_published=True).values_list('pk', 'updated_date'):
+        stamps[f'project:{pk}'] = updated.isoformat()
+
+    # Services render from the catalog (packages and features have no timestamps)
+    catalog = build_catalog()
+    for service in catalog['services']:
+        stamps[f"service:{service['id']}"] = _digest(service)
+    stamps['list:services'] = _digest([service['id'] for service in catalog['services']])
+
+    stamps['list:blogs'] = _listing_stamp(MpgBlog, stamps, 'blog')
+    stamps['list:projects'] = _listing_stamp(Project, stamps, 'project')
+    _neighbour_stamps(stamps)
+    _related_stamps(RelatedBlog, 'blog', stamps)
+    _related_stamps(RelatedProject, 'project', stamps)
+
+    # The footer (on every page) and the home page show the latest services and blogs
+    footer_services = cards(MpgService.objects.filter(is_active=True)).order_by('-created_at')[:FOOTER_ITEMS]
+    footer_blogs = cards(MpgBlog.objects.filter(is_published=True)).order_by('-posted_date')[:FOOTER_ITEMS]
+    stamps['footer'] = _digest(
+        [(service.pk, service.slug, service.name, service.short_description, str(service.image))
+         for service in footer_services]
+        + [(blog.pk, stamps.get(f'blog:{blog.pk}')) for blog in footer_blogs]
+    )
+    return stamps
+
+
+def exported_pages(stamps):
+    """{URL path: [dependency keys]} for every page in the export."""
+    pages = {
+        reverse('mpgepmc_core:home'): ['footer'],
+        reverse('mpgepmc_core:blogs'): ['footer', 'list:blogs'],
+        reverse('mpgepmc_core:projects'): ['footer', 'list:projects'],
+        reverse('mpgepmc_core:services'): ['footer', 'list:services'] + [key for key in stamps if key.startswith('service:')],
+    }
+    for name in FIXED_PAGES:
+        pages[reverse(f'mpgepmc_core:{name}')] = ['footer']
+
+    for slug, pk in MpgBlog.objects.filter(is_published=True).values_list('slug', 'pk'):
+        related = f'related:blog:{pk}'
+        pages[reverse('mpgepmc_core:blog_detail', args=[slug])] = [
+            'footer', f'blog:{pk}', f'neighbours:blog:{pk}', related if related in stamps else 'list:blogs',
+        ]
+    for slug, pk in Project.objects.filter(is_published=True).values_list('slug', 'pk'):
+        related = f'related:project:{pk}'
+        pages[reverse('mpgepmc_core:project_detail', args=[slug])] = [
+            'footer', f'project:{pk}', related if related in stamps else 'list:projects',
+        ]
+    for slug, pk in MpgService.objects.filter(is_active=True).values_list('slug', 'pk'):
+        pages[reverse('mpgepmc_core:service_detail', args=[slug])] = ['footer', f'service:{pk}']
+    return pages
+
+
+def _page_file(root, path):
+    return os.path.join(root, *[part for part in path.split('/') if part], 'index.html')
+
+
+def _write(target, content):
+    os.makedirs(os.path.dirname(target), exist_ok=True)
+    for name, data in ((target, content), (target + '.gz', gzip.compress(content, mtime=0))):
+        temporary = f"{name}.tmp{os.getpid()}"
+        with open(temporary, 'wb') as handle:
+            handle.write(data)
+        os.replace(temporary, name)
+
+
+def _remove_page(root, path):
+    target = _page_file(root, path)
+    for name in (target, target + '.gz'):
+        if os.path.exists(name):
+            os.remove(name)
+    # Drop directories the page leaves empty, but never the export root itself
+    directory = os.path.dirname(target)
+    while directory != root and os.path.isdir(directory) and not os.listdir(directory):
+        os.rmdir(directory)
+        directory = os.path.dirname(directory)
+
+
+def sync_tree(source, destination):
+    """Copies new or changed files (by size and mtime) from `source`. Returns how many were copied."""
+    copied = 0
+    if not os.path.isdir(source):
+        return copied
+    for directory, _dirs, files in os.walk(source):
+        target_dir = os.path.join(destination, os.path.relpath(directory, source))
+        os.makedirs(target_dir, exist_ok=True)
+        for filename in files:
+            src, dst = os.path.join(directory, filename), os.path.join(target_dir, filename)
+            src_stat = os.stat(src)
+            if os.path.exists(dst):
+                dst_stat = os.stat(dst)
+                if dst_stat.st_size == src_stat.st_size and int(dst_stat.st_mtime) == int(src_stat.st_mtime):
+                    continue
+            shutil.copy2(src, dst)
+            copied += 1
+    return copied
+
+
+def _load_manifest(root):
+    try:
+        with open(os.path.join(root, MANIFEST_NAME)) as handle:
+            return json.load(handle)
+    except (OSError, ValueError):
+        return {'pages': {}}
+
+
+def export_site(root=None, full=False, dry_run=False, stdout=None):
+    """
+    Brings the export under `root` (default EXPORT_ROOT) up to date.
+    Returns {'rendered': [...], 'removed': [...], 'unchanged': n, 'failed': [...], 'assets': n}.
+    """
+    root = root or settings.EXPORT_ROOT
+    manifest = {'pages': {}} if full else _load_manifest(root)
+    stamps = current_stamps()
+    pages = exported_pages(stamps)
+
+    stale = [
+        path for path, deps in pages.items()
+        if path not in manifest['pages']
+        or any(manifest['pages'][path].get(key) != stamps.get(key) for key in deps)
+    ]
+    gone = [path for path in manifest['pages'] if path not in pages]
+    result = {'rendered': [], 'removed': gone, 'unchanged': len(pages) - len(stale), 'failed': [], 'assets': 0}
+    if dry_run:
+        result['rendered'] = stale
+        return result
+
+    overrides = {
+        'ALLOWED_HOSTS': [*settings.ALLOWED_HOSTS, 'testserver'],
+        'PAGE_CACHE_ENABLED': False,
+        'CONDITIONAL_GET_ENABLED': False,
+    }
+    with override_settings(**overrides):
+        client = Client(raise_request_exception=False)
+        for path in stale:
+            response = client.get(path, secure=True)
+            if response.status_code != 200:
+                # Keep the old file (if any) and try again next run
+                result['failed'].append((path, response.status_code))
+                manifest['pages'].pop(path, None)
+                continue
+            _write(_page_file(root, path), response.content)
+            manifest['pages'][path] = {key: stamps.get(key) for key in pages[path]}
+            result['rendered'].append(path)
+            if stdout:
+                stdout.write(f"rendered {path}")
+
+    for path in gone:
+        _remove_page(root, path)
+        manifest['pages'].pop(path)
+
+    result['assets'] = sync_tree(settings.STATIC_ROOT, os.path.join(root, settings.STATIC_URL.strip('/')))
+    for directory in PUBLIC_MEDIA_DIRS:
+        result['assets'] += sync_tree(
+            os.path.join(settings.MEDIA_ROOT, directory),
+            os.path.join(root, settings.MEDIA_URL.strip('/'), directory),
+        )
+
+    _write_manifest(root, manifest)
+    return result
+
+
+def _write_manifest(root, manifest):
+    os.makedirs(root, exist_ok=True)
+    target = os.path.join(root, MANIFEST_NAME)
+    temporary = f"{target}.tmp{os.getpid()}"
+    with open(temporary, 'w') as handle:
+        json.dump(manifest, handle, indent=1, sort_keys=True)
+    os.replace(temporary, target)
@@ -0,0 +1,245 @@
+# mpgepmc_core/synthetic.py
+"""
+Synthetic content and donations at configurable scale, for load testing.
+
+Rows are written with bulk_create, so model save() methods and post_save
+signals don't run: slugs and order numbers are filled in here, dates are
+spread over the past few years instead of all being "now", and the search
+index, related-content index, donation totals, sitemaps and feeds and cache
+versions are rebuilt once at the end. Donations point at slip files that
+don't exist.
+"""
+import random
+from contextlib import contextmanager
+from datetime import timedelta
+from decimal import Decimal
+
+from django.db import transaction
+from django.utils import timezone
+from django.utils.text import slugify
+
+from .feeds import rebuild_published_files
+from .models import (
+    Donation, MpgBlog, MpgService, Project, ServiceFeature, ServicePackage, ServiceRequest,
+    generate_order_number,
+)
+from .related import INDEXED_MODELS, rebuild_related_index
+from .rollups import rebuild_rollups
+from .search import rebuild_search_index
+from .slips import normalise_reference
+from .versions import bump_versions, version_name
+
+DEFAULT_SCALE = {
+    'blogs': 1000,
+    'projects': 500,
+    'services': 20,
+    'packages_per_service': 3,
+    'features_per_package': 5,
+    'donations': 5000,
+    'service_requests': 2000,
+}
+
+BATCH_SIZE = 1000
+
+# Every document mixes one topic's vocabulary with common filler words, so the
+# term distribution (and therefore search and related-content work) looks real.
+TOPICS = {
+    'education': "students classroom teachers curriculum learning schools literacy scholarships exams tutoring",
+    'health': "clinic patients doctors vaccines hospital nutrition maternal diagnosis medicine rural",
+    'technology': "software cloud mobile apps automation data analytics cybersecurity startups developers",
+    'ai': "artificial intelligence machine learning models chatbots neural networks prompts automation data",
+    'business': "company llc formation taxes accounting marketing growth customers branding ecommerce",
+    'welfare': "families food relief shelter orphans water sanitation community volunteers donations",
+    'environment': "climate trees floods solar energy recycling pollution agriculture farmers water",
+}
+FILLER = (
+    "project impact people support local future plan results team year new work world help build "
+    "program training access quality service solution strategy growth process practical guide"
+).split()
+PACKAGE_NAMES = ['Basic', 'Standard', 'Premium', 'Business', 'Enterprise', 'Ultimate']
+DURATIONS = ['One-time', 'Monthly', 'Annually', 'Per Project']
+FIRST_NAMES = "Ali Ayesha Bilal Fatima Hamza Hira Imran Maryam Omar Sana Usman Zainab".split()
+LAST_NAMES = "Ahmad Khan Malik Qureshi Raza Siddiqui Sheikh Butt Chaudhry Hussain".split()
+
+
+class TextGenerator:
+    def __init__(self, rng):
+        self.rng = rng
+        self.topic_words = {topic: words.split() for topic, words in TOPICS.items()}
+
+    def topic(self):
+        return self.rng.choice(list(self.topic_words))
+
+    def words(self, topic, count):
+        vocabulary = self.topic_words[topic]
+        return [
+            self.rng.choice(vocabulary) if self.rng.random() < 0.4 else self.rng.choice(FILLER)
+            for _ in range(count)
+        ]
+
+    def sentence(self, topic, count=12):
+        return ' '.join(self.words(topic, count)).capitalize() + '.'
+
+    def title(self, topic, serial):
+        # The serial keeps titles (and the slugs derived from them) unique
+        return f"{' '.join(self.words(topic, 5)).title()} {serial}"
+
+    def html(self, topic, paragraphs):
+        return ''.join(
+            f"<p>{' '.join(self.sentence(topic) for _ in range(5))}</p>" for _ in range(paragraphs)
+        )
+
+
+@contextmanager
+def _explicit_timestamps(*models):
+    """Lets bulk_create keep the dates we generate instead of auto_now/auto_now_add's 'now'."""
+    saved = []
+    for model in models:
+        for field in model._meta.concrete_fields:
+            if getattr(field, 'auto_now', False) or getattr(field, 'auto_now_add', False):
+                saved.append((field, field.auto_now, field.auto_now_add))
+                field.auto_now = field.auto_now_add = False
+    try:
+        yield
+    finally:
+        for field, auto_now, auto_now_add in saved:
+            field.auto_now, field.auto_now_add = auto_now, auto_now_add
+
+
+def _past(rng, now, days=3 * 365):
+    return now - timedelta(seconds=rng.randrange(days * 24 * 3600))
+
+
+def _unique_order_numbers(count, taken):
+    numbers = set()
+    while len(numbers) < count:
+        number = generate_order_number()
+        if number not in taken:
+            numbers.add(number)
+    return numbers
+
+
+def generate(scale=None, seed=None, stdout=None, published_files=True):
+    """
+    Adds synthetic rows on top of whatever is already in the database.
+    `scale` overrides DEFAULT_SCALE entries. Pass published_files=False to
+    leave PUBLISHED_ROOT alone (benchmarks on a scratch database).
+    Returns {model label: rows created}.
+    """
+    scale = {**DEFAULT_SCALE, **(scale or {})}
+    rng = random.Random(seed)
+    text = TextGenerator(rng)
+    now = timezone.now()
+    run = rng.randrange(16 ** 6)  # keeps titles unique across repeated runs
+    created = {}
+
+    def log(message):
+        if stdout:
+            stdout.write(message)
+
+    with _explicit_timestamps(MpgBlog, Project, MpgService, Donation, ServiceRequest), transaction.atomic():
+        blogs = []
+        for n in range(scale['blogs']):
+            topic = text.topic()
+            title = text.title(topic, f"{run:x}-{n}")
+            posted = _past(rng, now)
+            blogs.append(MpgBlog(
+                title=title, slug=slugify(title), short_summary=text.sentence(topic, 30),
+                content=text.html(topic, rng.randint(4, 12)), posted_date=posted,
+                updated_date=posted, is_published=rng.random() < 0.95,
+            ))
+        created['blogs'] = len(MpgBlog.objects.bulk_create(blogs, batch_size=BATCH_SIZE))
+        log(f"blogs: {created['blogs']}")
+
+        projects = []
+        for n in range(scale['projects']):
+            topic = text.topic()
+            title = text.title(topic, f"{run:x}-{n}")
+            posted = _past(rng, now)
+            projects.append(Project(
+                title=title, slug=slugify(title), category=rng.choice(Project.ProjectCategory.values),
+                short_description=text.sentence(topic, 30), full_description=text.html(topic, rng.randint(3, 8)),
+                posted_date=posted, updated_date=posted, is_published=rng.random() < 0.95,
+            ))
+        created['projects'] = len(Project.objects.bulk_create(projects, batch_size=BATCH_SIZE))
+        log(f"projects: {created['projects']}")
+
+        services = []
+        for n in range(scale['services']):
+            topic = text.topic()
+            name = text.title(topic, f"{run:x}-{n}")
+            created_at = _past(rng, now)
+            services.append(MpgService(
+                name=name, slug=slugify(name), short_description=text.sentence(topic, 20),
+                full_description=text.html(topic, 3), is_active=rng.random() < 0.9,
+                has_packages_for_purchase=scale['packages_per_service'] > 0,
+                created_at=created_at, updated_at=created_at,
+            ))
+        services = MpgService.objects.bulk_create(services, batch_size=BATCH_SIZE)
+        created['services'] = len(services)
+
+        packages = []
+        for service in services:
+            for order in range(scale['packages_per_service']):
+                # checkout/ finds packages by slug alone, so make them unique site-wide
+                name = f"{PACKAGE_NAMES[order % len(PACKAGE_NAMES)]} {service.pk}"
+                packages.append(ServicePackage(
+                    service=service, name=name, slug=slugify(name), description=text.sentence('business', 15),
+                    price=Decimal(rng.randrange(50, 5000, 25)), duration=rng.choice(DURATIONS),
+                    is_active=rng.random() < 0.9, order=order,
+                ))
+        packages = ServicePackage.objects.bulk_create(packages, batch_size=BATCH_SIZE)
+        created['packages'] = len(packages)
+
+        features = [
+            ServiceFeature(package=package, feature_text=text.sentence('technology', 6), order=order,
+                           is_included=rng.random() < 0.85)
+            for package in packages
+            for order in range(scale['features_per_package'])
+        ]
+        created['features'] = len(ServiceFeature.objects.bulk_create(features, batch_size=BATCH_SIZE))
+        log(f"services: {created['services']}, packages: {created['packages']}, features: {created['features']}")
+
+        taken = set(Donation.objects.values_list('donation_order_number', flat=True))
+        order_numbers = _unique_order_numbers(scale['donations'], taken)
+        statuses = Donation.DonationStatus.values
+        donations = []
+        for order_number in order_numbers:
+            first, last = rng.choice(FIRST_NAMES), rng.choice(LAST_NAMES)
+            created_at = _past(rng, now, days=2 * 365)
+            donation = Donation(
+                amount=Decimal(rng.choice([500, 1000, 2500, 5000, 10000, 25000])),
+                donation_order_number=order_number, status=rng.choice(statuses),
+                full_name=f"{first} {last}", email=f"{first}.{last}{rng.randrange(1000)}@example.com".lower(),
+                transaction_id=f"TX{rng.randrange(10 ** 10):010d}",
+                transaction_slip=f"donation_slips/{order_number}.jpg",
+                created_at=created_at, updated_at=created_at,
+            )
+            # bulk_create skips save(), which fills this in
+            donation.transaction_reference = normalise_reference(donation.transaction_id)
+            donations.append(donation)
+        created['donations'] = len(Donation.objects.bulk_create(donations, batch_size=BATCH_SIZE))
+        log(f"donations: {created['donations']}")
+
+        requests = []
+        for _ in range(scale['service_requests']):
+            first, last = rng.choice(FIRST_NAMES), rng.choice(LAST_NAMES)
+            requests.append(ServiceRequest(
+                mpgservice=rng.choice(services) if services else None,
+                user_full_name=f"{first} {last}", user_email=f"{first}.{last}@example.com".lower(),
+                user_message=text.sentence('business', 40), request_date=_past(rng, now, days=365),
+                is_processed=rng.random() < 0.7,
+            ))
+        created['service_requests'] = len(ServiceRequest.objects.bulk_create(requests, batch_size=BATCH_SIZE))
+        log(f"service requests: {created['service_requests']}")
+
+    # bulk_create skipped the signals, so refresh the derived data in one go
+    rebuild_search_index()
+    for model in INDEXED_MODELS:
+        rebuild_related_index(model)
+    rebuild_rollups()
+    if published_files:
+        rebuild_published_files()
+    bump_versions(*(version_name(model) for model in (MpgBlog, Project, MpgService, ServicePackage, ServiceFeature)))
+    log("search index, related-content index, donation totals, sitemaps and feeds and cache versions refreshed")
+    return created
@@ -0,0 +1,71 @@
+# mpgepmc_core/templatetags/admin_scale.py
+from django import template
+from django.contrib.admin.templatetags.admin_list import date_hierarchy, pagination
+from django.utils import formats
+from django.utils.text import capfirst
+from django.utils.translation import gettext as _
+
+from ..admin_scale import date_periods
+
+register = template.Library()
+
+
+@register.inclusion_tag('admin/mpgepmc_core/scale_pagination.html')
+def scale_pagination(cl):
+    """Older/newer links for keyset pages, numbered links (up to the count limit) otherwise."""
+    if cl.keyset_page is None:
+        return pagination(cl)
+    return {'cl': cl, 'page': cl.keyset_page}
+
+
+@register.inclusion_tag('admin/date_hierarchy.html')
+def indexed_date_hierarchy(cl):
+    """
+    Django's date_hierarchy, with its MIN/MAX and SELECT DISTINCT over the
+    changelist replaced by index seeks (admin_scale.date_periods).
+    """
+    field_name = cl.date_hierarchy
+    year_field, month_field, day_field = (f'{field_name}__{part}' for part in ('year', 'month', 'day'))
+    year, month, day = (cl.params.get(name) for name in (year_field, month_field, day_field))
+    if year and month and day:
+        # A single day: nothing left to drill into, so Django's version runs no queries
+        return date_hierarchy(cl)
+
+    def link(filters):
+        return cl.get_query_string(filters, [f'{field_name}__'])
+
+    if not year:
+        years = date_periods(cl.queryset, field_name, 'year')
+        if len(years) != 1:
+            return {
+                'show': True,
+                'back': None,
+                'choices': [{'link': link({year_field: str(y.year)}), 'title': str(y.year)} for y in years],
+            }
+        # Everything is in one year: start a level down, as Django does
+        year = years[0].year
+
+    if not month:
+        months = date_periods(cl.queryset, field_name, 'month')
+        if len(months) != 1 or cl.params.get(year_field):
+            return {
+                'show': True,
+                'back': {'link': link({}), 'title': _('All dates')},
+                'choices': [
+                    {'link': link({year_field: year, month_field: m.month}),
+                     'title': capfirst(formats.date_format(m, 'YEAR_MONTH_FORMAT'))}
+                    for m in months
+                ],
+            }
+        month = months[0].month
+
+    days = date_periods(cl.queryset, field_name, 'day')
+    return {
+        'show': True,
+        'back': {'link': link({year_field: year}), 'title': str(year)},
+        'choices': [
+            {'link': link({year_field: year, month_field: month, day_field: d.day}),
+             'title': capfirst(formats.date_format(d, 'MONTH_DAY_FORMAT'))}
+            for d in days
+        ],
+    }
@@ -0,0 +1,84 @@
+# mpgepmc_core/templatetags/mpgepmc_images.py
+from django import template
+from django.core.files.storage import default_storage
+from django.templatetags.static import static
+from django.utils.html import format_html, format_html_join
+from django.utils.safestring import mark_safe
+
+from ..renditions import MIME_TYPES, get_renditions
+
+register = template.Library()
+
+
+def _image_name(image):
+    """Accepts an ImageFieldFile or a plain storage name and returns the name."""
+    if not image:
+        return ''
+    return getattr(image, 'name', image) or ''
+
+
+@register.simple_tag
+def responsive_image(image, alt='', sizes='100vw', css_class='', fallback='', loading='lazy'):
+    """
+    Renders a <picture> with AVIF/WebP srcsets and an <img> fallback carrying
+    explicit width/height, so the browser can reserve space before the image loads.
+
+    Usage:
+        {% responsive_image blog.feature_image alt=blog.title sizes="(max-width: 768px) 100vw, 33vw" css_class="card-image" fallback="img/default-blog-card.png" %}
+    """
+    name = _image_name(image)
+    if not name:
+        if not fallback:
+            return ''
+        return format_html(
+            '<img src="{}" alt="{}" class="{}" loading="{}" decoding="async">',
+            static(fallback), alt, css_class, loading,
+        )
+
+    info = get_renditions(name)
+    original_url = default_storage.url(name)
+    if not info:
+        return format_html(
+            '<img src="{}" alt="{}" class="{}" loading="{}" decoding="async">',
+            original_url, alt, css_class, loading,
+        )
+
+    sources = format_html_join(
+        '',
+        '<source type="{}" srcset="{}" sizes="{}">',
+        (
+            (MIME_TYPES[fmt], ', '.join(f"{url} {width}w" for width, url in variants), sizes)
+            for fmt, variants in info['sources'].items()
+        ),
+    )
+    return format_html(
+        '<picture>{}<img src="{}" width="{}" height="{}" alt="{}" class="{}" loading="{}" decoding="async"></picture>',
+        sources, original_url, info['width'], info['height'], alt, css_class, loading,
+    )
+
+
+@register.simple_tag
+def background_image(image, fallback='', width=1600):
+    """
+    CSS declarations for a background image: the original (or static fallback) first,
+    then an image-set() of the closest AVIF/WebP renditions for browsers that support it.
+
+    Usage:
+        <div style="{% background_image item.image fallback='img/default-service-bg.jpg' %}">
+    """
+    name = _image_name(image)
+    if not name:
+        return format_html("background-image:url('{}')", static(fallback)) if fallback else ''
+
+    declaration = format_html("background-image:url('{}')", default_storage.url(name))
+    info = get_renditions(name)
+    if not info or not info['sources']:
+        return declaration
+
+    candidates = []
+    for fmt, variants in info['sources'].items():
+        fitting = [variant for variant in variants if variant[0] <= int(width)] or variants[:1]
+        candidates.append((fitting[-1][1], MIME_TYPES[fmt]))
+
+    image_set = format_html_join(', ', "url('{}') type('{}')", candidates)
+    return mark_safe(f"{declaration};background-image:image-set({image_set})")
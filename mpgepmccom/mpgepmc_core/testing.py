@@ -0,0 +1,42 @@
+# mpgepmc_core/testing.py
+"""
+Test runner that keeps `manage.py test` out of the deployable tree.
+
+Saving content rewrites sitemaps and feeds (see feeds.py), uploads land in
+MEDIA_ROOT and most tests clear the content cache, which holds the running
+site's version stamps and cached pages. For the whole run those settings
+point into a scratch directory that is removed afterwards (the content cache
+becomes a file cache there). Test classes can still override them.
+"""
+import os
+import shutil
+import tempfile
+
+from django.conf import settings
+from django.test.runner import DiscoverRunner
+from django.test.utils import override_settings
+
+
+class IsolatedTestRunner(DiscoverRunner):
+
+    def setup_test_environment(self, **kwargs):
+        super().setup_test_environment(**kwargs)
+        self.scratch_root = tempfile.mkdtemp(prefix='mpgepmc-test-')
+        self.scratch_settings = override_settings(
+            MEDIA_ROOT=os.path.join(self.scratch_root, 'media'),
+            PUBLISHED_ROOT=os.path.join(self.scratch_root, 'published'),
+            EXPORT_ROOT=os.path.join(self.scratch_root, 'export'),
+            CACHES={
+                **settings.CACHES,
+                settings.CONTENT_CACHE_ALIAS: {
+                    **settings.CONTENT_CACHE_BACKENDS['file'],
+                    'LOCATION': os.path.join(self.scratch_root, 'cache'),
+                },
+            },
+        )
+        self.scratch_settings.enable()
+
+    def teardown_test_environment(self, **kwargs):
+        self.scratch_settings.disable()
+        shutil.rmtree(self.scratch_root, ignore_errors=True)
+        super().teardown_test_environment(**kwargs)
@@ -1,3 +1,1650 @@
-from django.test import TestCase
+# mpgepmc_core/tests.py
+import csv
+import datetime
+import gzip
+import inspect
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from collections import Counter
+from decimal import Decimal
+from io import BytesIO, StringIO
+from smtplib import SMTPException, SMTPServerDisconnected
+from unittest import mock
 
-# Create your tests here.
+from django.conf import settings
+from django.contrib.admin import ModelAdmin, site as admin_site
+from django.contrib.auth.models import User
+from django.core import mail
+from django.core.cache import caches
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import CommandError, call_command
+from django.db import connection, connections, transaction
+from django.db.models.signals import post_save
+from django.template import Context, Template
+from django.test import RequestFactory, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from PIL import Image
+
+from . import urls as core_urls
+from .admin import DonationAdmin, MpgBlogAdmin
+from .exports import export_stream
+from .feeds import rebuild_published_files
+from .media import parse_range
+from . import donations as donations_module
+from .donations import transition_donations
+from .models import BankAccount, Donation, DonationDailyRollup, DonationStatusTransition, DonationMonthlyRollup, MpgBlog, MpgService, OutboundEmail, Project, RelatedBlog, ServicePackage, ServiceRequest
+from .outbox import CLAIM_LEASE_SECONDS, claim_batch, enqueue_email, send_due_emails
+from .page_cache import CACHE_HEADER
+from .query_plans import check_query_plans
+from .rollups import donation_day, donation_report, rebuild_rollups, rollup_drift
+from .related import rebuild_related_index
+from .renditions import MIME_TYPES, RENDITION_FORMATS, rendition_name
+from .search import build_match_query, rebuild_search_index, search
+from .site_snapshot import get_site_snapshot
+from .sqlite import connection_status
+from .static_export import export_site
+from .synthetic import DEFAULT_SCALE, generate
+from .templatetags.admin_scale import indexed_date_hierarchy
+from .versions import get_versions, version_name
+
+MEDIA_ROOT = tempfile.mkdtemp(prefix='mpgepmc-test-media-')
+
+
+def seed_site():
+    """A small but realistic site: enough rows that an N+1 shows up as a budget overrun."""
+    topics = ['classroom learning', 'rural healthcare', 'small business growth']
+    for i in range(6):
+        topic = topics[i % len(topics)]
+        MpgBlog.objects.create(
+            title=f"AI and {topic}, part {i}",
+            short_summary=f"How AI tools change {topic}.",
+            content=f"<p>Artificial intelligence for {topic} in Pakistan.</p>" * 5,
+        )
+        Project.objects.create(
+            title=f"AI for {topic} project {i}",
+            short_description=f"Bringing AI skills to {topic}.",
+            full_description=f"<p>Artificial intelligence, {topic} and welfare.</p>" * 5,
+        )
+    services = [
+        MpgService.objects.create(
+            name=f"Web development service {i}",
+            short_description="Websites and web apps.",
+            full_description="<p>Full-stack web development.</p>",
+            has_packages_for_purchase=True,
+        )
+        for i in range(3)
+    ]
+    for service in services:
+        for order, name in enumerate(['Basic', 'Standard', 'Premium']):
+            # checkout/ looks packages up by slug alone, so keep slugs unique site-wide
+            package = ServicePackage.objects.create(
+                service=service, name=f"{name} {service.pk}", price=Decimal(100 * (order + 1)), order=order
+            )
+            for n in range(4):
+                package.features.create(feature_text=f"Feature {n}", order=n)
+    BankAccount.objects.create(
+        account_title="MPG EPMC", account_number="0001", bank_name="Test Bank", iban="PK00TEST0001"
+    )
+    rebuild_related_index(MpgBlog)
+    rebuild_related_index(Project)
+
+
+def clear_content_caches():
+    # Dropping the version stamps also invalidates the in-process site and catalog snapshots.
+    caches['default'].clear()
+    caches['content'].clear()
+
+
+@override_settings(MEDIA_ROOT=MEDIA_ROOT, PAGE_CACHE_ENABLED=False)
+class QueryBudgetTests(TestCase):
+    """
+    Pins the number of queries every route in mpgepmc_core/urls.py may run
+    against the seeded site, with cold caches. If a change makes a page run
+    more queries (an N+1, a duplicated queryset), this fails; if it makes a
+    page run fewer, lower the budget here.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        seed_site()
+        cls.service = MpgService.objects.order_by('name').first()
+        cls.package = cls.service.packages.order_by('order').first()
+        cls.blog = MpgBlog.objects.first()
+        cls.project = Project.objects.first()
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        clear_content_caches()
+        self.donation = Donation.objects.create(amount=Decimal('500.00'))
+
+    def routes(self):
+        """url name -> (method, url, data, query budget, expected status)."""
+        order = self.donation.donation_order_number
+        slip = SimpleUploadedFile('slip.pdf', b'%PDF-1.4 test slip', content_type='application/pdf')
+        return {
+            'home': ('get', reverse('mpgepmc_core:home'), None, 3, 200),
+            'contact': ('get', reverse('mpgepmc_core:contact'), None, 3, 200),
+            'contact_form_submit': ('post', reverse('mpgepmc_core:contact_form_submit'), {
+                'user_full_name': 'Ali', 'user_email': 'ali@example.com', 'user_message': 'Hello',
+            }, 1, 302),
+            'thank_you': ('get', reverse('mpgepmc_core:thank_you'), None, 3, 200),
+            'support': ('post', reverse('mpgepmc_core:support'), {
+                'amount': '1000', 'payment_method': 'bank_transfer',
+            }, 5, 302),
+            'donation_checkout': ('post', reverse('mpgepmc_core:donation_checkout', args=[order]), {
+                'full_name': 'Ali', 'email': 'ali@example.com', 'transaction_id': 'TX-1',
+                'transaction_slip': slip,
+            }, 11, 302),
+            'donation_success': ('get', reverse('mpgepmc_core:donation_success', args=[order]), None, 4, 200),
+            'services': ('get', reverse('mpgepmc_core:services'), None, 6, 200),
+            'service_detail': ('get', reverse('mpgepmc_core:service_detail', args=[self.service.slug]), None, 6, 200),
+            'request_service': ('post', reverse('mpgepmc_core:request_service', args=[self.service.slug]), {
+                'user_full_name': 'Ali', 'user_email': 'ali@example.com', 'user_message': 'Hello',
+            }, 3, 302),
+            'projects': ('get', reverse('mpgepmc_core:projects'), None, 4, 200),
+            'project_detail': ('get', reverse('mpgepmc_core:project_detail', args=[self.project.slug]), None, 5, 200),
+            'blogs': ('get', reverse('mpgepmc_core:blogs'), None, 4, 200),
+            'blog_detail': ('get', reverse('mpgepmc_core:blog_detail', args=[self.blog.slug]), None, 7, 200),
+            'search': ('get', reverse('mpgepmc_core:search') + '?q=education', None, 4, 200),
+            'checkout': ('post', reverse('mpgepmc_core:checkout', args=[self.package.slug]), {
+                'user_full_name': 'Ali', 'user_email': 'ali@example.com', 'package_id': self.package.pk,
+            }, 2, 302),
+            'process_payment': ('post', reverse('mpgepmc_core:process_payment'), {
+                'package_id_hidden_input': self.package.pk,
+            }, 1, 302),
+            'payment_success_page': ('get', reverse('mpgepmc_core:payment_success_page'), None, 3, 200),
+            'privacy_policy': ('get', reverse('mpgepmc_core:privacy_policy'), None, 3, 200),
+            'terms_and_conditions': ('get', reverse('mpgepmc_core:terms_and_conditions'), None, 3, 200),
+        }
+
+    def request(self, method, url, data=None):
+        return getattr(self.client, method)(url, data, secure=True)
+
+    def test_every_route_has_a_budget(self):
+        names = {pattern.name for pattern in core_urls.urlpatterns}
+        self.assertEqual(names, set(self.routes()))
+
+    def test_route_query_budgets(self):
+        for name, (method, url, data, budget, status) in self.routes().items():
+            with self.subTest(route=name):
+                clear_content_caches()
+                with self.assertNumQueries(budget):
+                    response = self.request(method, url, data)
+                self.assertEqual(response.status_code, status)
+
+    def test_get_forms_of_post_routes(self):
+        # The routes above are exercised with the POST that does the real work;
+        # the forms themselves get a budget too.
+        gets = {
+            'support': (reverse('mpgepmc_core:support'), 3),
+            'donation_checkout': (reverse('mpgepmc_core:donation_checkout', args=[self.donation.donation_order_number]), 4),
+            'request_service': (reverse('mpgepmc_core:request_service', args=[self.service.slug]), 4),
+            'checkout': (reverse('mpgepmc_core:checkout', args=[self.package.slug]), 5),
+        }
+        for name, (url, budget) in gets.items():
+            with self.subTest(route=name):
+                clear_content_caches()
+                with self.assertNumQueries(budget):
+                    response = self.request('get', url)
+                self.assertEqual(response.status_code, 200)
+
+    def test_service_pages_are_free_once_the_catalog_is_warm(self):
+        self.request('get', reverse('mpgepmc_core:services'))
+        with self.assertNumQueries(0):
+            self.request('get', reverse('mpgepmc_core:services'))
+            self.request('get', reverse('mpgepmc_core:service_detail', args=[self.service.slug]))
+
+    def test_service_detail_queries_do_not_grow_with_packages(self):
+        url = reverse('mpgepmc_core:service_detail', args=[self.service.slug])
+        budget = self.routes()['service_detail'][3]
+        for order in range(3, 10):
+            package = ServicePackage.objects.create(service=self.service, name=f"Extra {order} {self.service.pk}", price=10, order=order)
+            package.features.create(feature_text="More")
+        clear_content_caches()
+        with self.assertNumQueries(budget):
+            self.request('get', url)
+
+    @override_settings(PAGE_CACHE_ENABLED=True)
+    def test_cached_pages_run_no_queries(self):
+        for name in ('home', 'blogs', 'projects', 'services'):
+            url = reverse(f'mpgepmc_core:{name}')
+            with self.subTest(route=name):
+                # Pin the variant so randomised pages (home) hit the one we just stored
+                with mock.patch('mpgepmc_core.page_cache.random.randrange', return_value=0):
+                    self.request('get', url)
+                    with self.assertNumQueries(0):
+                        response = self.request('get', url)
+                self.assertEqual(response['X-Page-Cache'], 'HIT')
+
+
+@override_settings(PAGE_CACHE_ENABLED=False, LISTING_PAGE_SIZE=4)
+class ListingPaginationTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        seed_site()
+
+    def setUp(self):
+        clear_content_caches()
+
+    def get(self, url, **params):
+        return self.client.get(url, params, secure=True)
+
+    def walk(self, url, **params):
+        """Follows the "load more" cursors to the end; returns the pages."""
+        pages = [self.get(url, **params).context['page']]
+        while pages[-1].has_next:
+            pages.append(self.get(url, after=pages[-1].next_cursor, **params).context['page'])
+        return pages
+
+    def test_cursors_cover_every_item_once(self):
+        for name, model, published in (
+            ('blogs', MpgBlog, {'is_published': True}),
+            ('projects', Project, {'is_published': True}),
+            ('services', MpgService, {'is_active': True}),
+        ):
+            with self.subTest(listing=name):
+                pages = self.walk(reverse(f'mpgepmc_core:{name}'))
+                seen = [item['id'] if isinstance(item, dict) else item.pk for page in pages for item in page]
+                self.assertEqual(len(seen), len(set(seen)))
+                self.assertEqual(set(seen), set(model.objects.filter(**published).values_list('pk', flat=True)))
+                self.assertTrue(all(len(page) <= 4 for page in pages))
+
+    def test_blogs_are_newest_first_across_pages(self):
+        pages = self.walk(reverse('mpgepmc_core:blogs'))
+        seen = [blog.pk for page in pages for blog in page]
+        expected = list(MpgBlog.objects.filter(is_published=True).order_by('-posted_date', '-id').values_list('pk', flat=True))
+        self.assertEqual(seen, expected)
+
+    def test_deep_pages_cost_the_same_as_page_one(self):
+        url = reverse('mpgepmc_core:blogs')
+        first = self.get(url)
+        with self.assertNumQueries(1):  # the site snapshot is warm now
+            self.get(url)
+        with self.assertNumQueries(1):
+            self.get(url, after=first.context['page'].next_cursor)
+
+    def test_fragment_is_just_the_next_cards(self):
+        url = reverse('mpgepmc_core:blogs')
+        cursor = self.get(url).context['page'].next_cursor
+        response = self.get(url, after=cursor, fragment='1')
+        self.assertContains(response, 'class=blog-card-v2')
+        self.assertNotContains(response, '<header')
+        self.assertNotContains(response, 'Featured Article')
+
+    def test_load_more_link_keeps_the_category(self):
+        for n in range(5):
+            Project.objects.create(title=f"Extra development project {n}", short_description="x", full_description="x",
+                                   category=Project.ProjectCategory.DEVELOPMENT)
+        pages = self.walk(reverse('mpgepmc_core:projects'), category='DEVELOPMENT')
+        self.assertEqual(sum(len(page) for page in pages), 5)
+        self.assertTrue(all(project.category == 'DEVELOPMENT' for page in pages for project in page))
+
+    def test_malformed_cursor_is_a_bad_request(self):
+        for cursor in ('not-a-cursor', 'WyJ4Il0', 'WyJ4IiwxXQ'):  # garbage, wrong length, bad date
+            with self.subTest(cursor=cursor):
+                self.assertEqual(self.get(reverse('mpgepmc_core:blogs'), after=cursor).status_code, 400)
+
+
+@override_settings(PAGE_CACHE_ENABLED=False)
+class CardProjectionTests(TestCase):
+    BODY_COLUMNS = (
+        '"mpgepmc_core_mpgblog"."content"',
+        '"mpgepmc_core_project"."full_description"',
+        '"mpgepmc_core_mpgservice"."full_description"',
+    )
+
+    @classmethod
+    def setUpTestData(cls):
+        seed_site()
+
+    def setUp(self):
+        clear_content_caches()
+
+    def body_reads(self, url):
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(self.client.get(url, secure=True).status_code, 200)
+        return [query['sql'] for query in queries if any(column in query['sql'] for column in self.BODY_COLUMNS)]
+
+    def test_list_pages_skip_html_bodies(self):
+        for name in ('home', 'blogs', 'projects', 'contact'):
+            with self.subTest(route=name):
+                clear_content_caches()
+                self.assertEqual(self.body_reads(reverse(f'mpgepmc_core:{name}')), [])
+
+    def test_detail_pages_read_only_their_own_body(self):
+        blog = MpgBlog.objects.first()
+        project = Project.objects.first()
+        for url in (reverse('mpgepmc_core:blog_detail', args=[blog.slug]),
+                    reverse('mpgepmc_core:project_detail', args=[project.slug])):
+            with self.subTest(url=url):
+                clear_content_caches()
+                self.assertEqual(len(self.body_reads(url)), 1)
+
+
+class QueryPlanTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        seed_site()
+
+    def test_hot_queries_use_indexes(self):
+        out = StringIO()
+        call_command('check_query_plans', stdout=out)  # raises CommandError on any failure
+        self.assertIn('Every hot query is served by an index.', out.getvalue())
+
+    def test_unindexed_sort_is_reported(self):
+        [(name, plan, problems)] = check_query_plans({'by summary': MpgBlog.objects.order_by('short_summary')})
+        self.assertTrue(any('temp B-tree' in problem for problem in problems), plan)
+
+    @override_settings(PAGE_CACHE_ENABLED=False)
+    def test_blog_neighbours_posted_in_the_same_second(self):
+        clear_content_caches()
+        posted = MpgBlog.objects.order_by('posted_date').first().posted_date
+        MpgBlog.objects.update(posted_date=posted)
+        ordered = list(MpgBlog.objects.order_by('-posted_date', '-id'))
+        middle = ordered[2]
+        response = self.client.get(reverse('mpgepmc_core:blog_detail', args=[middle.slug]), secure=True)
+        self.assertEqual(response.context['previous_post'], ordered[3])
+        self.assertEqual(response.context['next_post'], ordered[1])
+
+
+@override_settings(PUBLISHED_FILES_REBUILD_ON_SAVE=False)
+class ConditionalGetTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        seed_site()
+
+    def setUp(self):
+        clear_content_caches()
+        self.blog = MpgBlog.objects.first()
+        self.blog_url = reverse('mpgepmc_core:blog_detail', args=[self.blog.slug])
+
+    def get(self, url, **headers):
+        return self.client.get(url, secure=True, headers=headers)
+
+    def test_detail_pages_send_validators(self):
+        service = MpgService.objects.first()
+        project = Project.objects.first()
+        for url in (self.blog_url, reverse('mpgepmc_core:project_detail', args=[project.slug]),
+                    reverse('mpgepmc_core:service_detail', args=[service.slug])):
+            with self.subTest(url=url):
+                response = self.get(url)
+                self.assertEqual(response.status_code, 200)
+                self.assertTrue(response['ETag'].startswith('W/"'))
+                self.assertIn('Last-Modified', response)
+                self.assertIn('no-cache', response['Cache-Control'])
+
+    def test_current_copy_is_not_modified_without_queries(self):
+        first = self.get(self.blog_url)
+        with self.assertNumQueries(0):
+            response = self.get(self.blog_url, if_none_match=first['ETag'])
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response['ETag'], first['ETag'])
+        self.assertEqual(self.get(self.blog_url, if_modified_since=first['Last-Modified']).status_code, 304)
+
+    def test_changes_invalidate_validators(self):
+        first = self.get(self.blog_url)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.blog.title = "A new title"
+            self.blog.save()
+        response = self.get(self.blog_url, if_none_match=first['ETag'])
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], first['ETag'])
+
+    def test_service_detail_follows_its_packages(self):
+        package = ServicePackage.objects.first()
+        url = reverse('mpgepmc_core:service_detail', args=[package.service.slug])
+        etag = self.get(url)['ETag']
+        self.assertEqual(self.get(url, if_none_match=etag).status_code, 304)
+        with self.captureOnCommitCallbacks(execute=True):
+            package.price += 1
+            package.save()
+        self.assertEqual(self.get(url, if_none_match=etag).status_code, 200)
+
+    def test_missing_pages_have_no_validators(self):
+        response = self.get(reverse('mpgepmc_core:blog_detail', args=['no-such-post']))
+        self.assertEqual(response.status_code, 404)
+        self.assertNotIn('ETag', response)
+
+    @override_settings(CONDITIONAL_GET_ENABLED=False)
+    def test_can_be_turned_off(self):
+        self.assertNotIn('ETag', self.get(self.blog_url))
+
+
+class MediaServingTests(TestCase):
+    IMAGE = bytes(range(256)) * 4  # 1 KiB
+
+    def setUp(self):
+        media_root = tempfile.mkdtemp(prefix='mpgepmc-test-media-')
+        self.addCleanup(shutil.rmtree, media_root, ignore_errors=True)
+        overrides = self.settings(MEDIA_ROOT=media_root)
+        overrides.enable()
+        self.addCleanup(overrides.disable)
+        self.write(media_root, 'mpgblog_images/post-1a2b3c4d.png', self.IMAGE)
+        self.write(media_root, 'mpgblog_images/logo-5e6f7a8b.svg', b'<svg xmlns="http://www.w3.org/2000/svg"/>')
+        self.write(media_root, 'mpgblog_images/logo-5e6f7a8b.svg.gz', b'gzipped svg')
+        self.write(media_root, 'donation_slips/MPG-ABC123.pdf', b'%PDF-1.4 slip')
+
+    def write(self, root, name, content):
+        os.makedirs(os.path.join(root, os.path.dirname(name)), exist_ok=True)
+        with open(os.path.join(root, name), 'wb') as handle:
+            handle.write(content)
+
+    def get(self, name, **headers):
+        return self.client.get(f'/media/{name}', secure=True, headers=headers)
+
+    def test_public_images_are_immutable(self):
+        response = self.get('mpgblog_images/post-1a2b3c4d.png')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(b''.join(response.streaming_content), self.IMAGE)
+        self.assertEqual(response['Content-Type'], 'image/png')
+        self.assertEqual(response['Cache-Control'], 'public, max-age=31536000, immutable')
+        self.assertEqual(response['Accept-Ranges'], 'bytes')
+        revalidated = self.get('mpgblog_images/post-1a2b3c4d.png', if_none_match=response['ETag'])
+        self.assertEqual(revalidated.status_code, 304)
+
+    def test_range_requests(self):
+        response = self.get('mpgblog_images/post-1a2b3c4d.png', range='bytes=10-19')
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(response['Content-Range'], 'bytes 10-19/1024')
+        self.assertEqual(b''.join(response.streaming_content), self.IMAGE[10:20])
+        suffix = self.get('mpgblog_images/post-1a2b3c4d.png', range='bytes=-4')
+        self.assertEqual(b''.join(suffix.streaming_content), self.IMAGE[-4:])
+        unsatisfiable = self.get('mpgblog_images/post-1a2b3c4d.png', range='bytes=5000-')
+        self.assertEqual(unsatisfiable.status_code, 416)
+        self.assertEqual(unsatisfiable['Content-Range'], 'bytes */1024')
+        stale = self.get('mpgblog_images/post-1a2b3c4d.png', range='bytes=10-19', if_range='"old"')
+        self.assertEqual(stale.status_code, 200)
+
+    def test_parse_range(self):
+        self.assertEqual(parse_range('bytes=0-', 10), (0, 9))
+        self.assertEqual(parse_range('bytes=5-100', 10), (5, 9))
+        self.assertEqual(parse_range('bytes=-100', 10), (0, 9))
+        self.assertIsNone(parse_range('bytes=0-1,5-6', 10))
+        self.assertIsNone(parse_range('items=0-1', 10))
+
+    def test_precompressed_variant(self):
+        response = self.get('mpgblog_images/logo-5e6f7a8b.svg', accept_encoding='gzip, deflate')
+        self.assertEqual(b''.join(response.streaming_content), b'gzipped svg')
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertEqual(response['Content-Type'], 'image/svg+xml')
+        self.assertEqual(response['Vary'], 'Accept-Encoding')
+        plain = self.get('mpgblog_images/logo-5e6f7a8b.svg', accept_encoding='gzip;q=0')
+        self.assertNotIn('Content-Encoding', plain)
+        self.assertNotEqual(plain['ETag'], response['ETag'])
+
+    def test_donation_slips_are_staff_only(self):
+        self.assertEqual(self.get('donation_slips/MPG-ABC123.pdf').status_code, 404)
+        self.client.force_login(User.objects.create_user('editor', is_staff=True))
+        self.assertEqual(self.get('donation_slips/MPG-ABC123.pdf').status_code, 404)
+        self.client.force_login(User.objects.create_superuser('owner', 'owner@example.com', 'x'))
+        response = self.get('donation_slips/MPG-ABC123.pdf')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Cache-Control'], 'private, no-store')
+
+    def test_paths_outside_media_root(self):
+        for name in ('../settings.py', 'mpgblog_images/../../manage.py', 'mpgblog_images/missing.png'):
+            with self.subTest(name=name):
+                self.assertEqual(self.get(name).status_code, 404)
+
+    @override_settings(MEDIA_SENDFILE='x-accel-redirect', MEDIA_ACCEL_REDIRECT_PREFIX='/protected-media/')
+    def test_web_server_handoff(self):
+        response = self.get('mpgblog_images/post-1a2b3c4d.png')
+        self.assertEqual(response['X-Accel-Redirect'], '/protected-media/mpgblog_images/post-1a2b3c4d.png')
+        self.assertEqual(response.content, b'')
+        self.assertEqual(response['Cache-Control'], 'public, max-age=31536000, immutable')
+
+
+class SitemapAndFeedTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        seed_site()
+
+    def setUp(self):
+        published_root = tempfile.mkdtemp(prefix='mpgepmc-test-published-')
+        self.addCleanup(shutil.rmtree, published_root, ignore_errors=True)
+        overrides = self.settings(PUBLISHED_ROOT=published_root, SITE_URL='https://example.com')
+        overrides.enable()
+        self.addCleanup(overrides.disable)
+        self.published_root = published_root
+
+    def read(self, url, **headers):
+        response = self.client.get(url, secure=True, headers=headers)
+        self.assertEqual(response.status_code, 200, url)
+        return b''.join(response.streaming_content).decode()
+
+    def test_sitemap_is_built_on_first_request(self):
+        index = self.read('/sitemap.xml')
+        self.assertIn('<loc>https://example.com/sitemaps/blogs-0.xml</loc>', index)
+        self.assertIn('<loc>https://example.com/sitemaps/pages.xml</loc>', index)
+        blogs = self.read('/sitemaps/blogs-0.xml')
+        blog = MpgBlog.objects.first()
+        self.assertIn(f'<loc>https://example.com/blogs/{blog.slug}/</loc>', blogs)
+        self.assertIn(f'<lastmod>{blog.updated_date.isoformat(timespec="seconds")}</lastmod>', blogs)
+        self.assertTrue(os.path.isfile(os.path.join(self.published_root, 'sitemaps', 'blogs-0.xml.gz')))
+
+    def test_feeds_are_precompressed(self):
+        rebuild_published_files()
+        response = self.client.get('/feeds/blogs.rss', secure=True, headers={'accept-encoding': 'gzip'})
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertEqual(response['Content-Type'], 'application/rss+xml; charset=utf-8')
+        rss = gzip.decompress(b''.join(response.streaming_content)).decode()
+        self.assertEqual(rss.count('<item>'), MpgBlog.objects.filter(is_published=True).count())
+        self.assertIn('<entry>', self.read('/feeds/projects.atom'))
+
+    def test_unpublishing_rewrites_only_its_chunk(self):
+        with mock.patch('mpgepmc_core.feeds.SITEMAP_CHUNK_SIZE', 4):
+            rebuild_published_files()
+            blogs = list(MpgBlog.objects.order_by('pk'))
+            target = next(blog for blog in blogs if blog.pk // 4 != blogs[0].pk // 4)
+            untouched = os.path.join(self.published_root, 'sitemaps', f'blogs-{blogs[0].pk // 4}.xml')
+            before = os.stat(untouched).st_mtime_ns
+            with self.captureOnCommitCallbacks(execute=True):
+                target.is_published = False
+                target.save()
+            self.assertNotIn(f'/blogs/{target.slug}/', self.read(f'/sitemaps/blogs-{target.pk // 4}.xml'))
+            self.assertNotIn(f'/blogs/{target.slug}/', self.read('/feeds/blogs.atom'))
+            self.assertEqual(os.stat(untouched).st_mtime_ns, before)
+
+    def test_synthetic_data_is_published(self):
+        rebuild_published_files()
+        scale = {name: 0 for name in DEFAULT_SCALE}
+        generate({**scale, 'blogs': 3, 'projects': 2}, seed=1)
+        blogs = self.read('/sitemaps/blogs-0.xml')
+        rss = self.read('/feeds/projects.rss')
+        for blog in MpgBlog.objects.filter(is_published=True):
+            self.assertIn(f'/blogs/{blog.slug}/', blogs)
+        self.assertEqual(rss.count('<item>'), Project.objects.filter(is_published=True).count())
+
+        generate({**scale, 'blogs': 2}, seed=2, published_files=False)
+        self.assertNotIn(f'/blogs/{MpgBlog.objects.latest("pk").slug}/', self.read('/sitemaps/blogs-0.xml'))
+
+    def test_unknown_files(self):
+        for url in ('/sitemaps/donations-0.xml', '/sitemaps/blogs-99.xml', '/feeds/nothing.rss'):
+            with self.subTest(url=url):
+                self.assertEqual(self.client.get(url, secure=True).status_code, 404)
+
+
+@override_settings(PAGE_CACHE_ENABLED=False)
+@override_settings(PUBLISHED_FILES_REBUILD_ON_SAVE=False)
+class StaticExportTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        seed_site()
+
+    def setUp(self):
+        clear_content_caches()
+        self.root = tempfile.mkdtemp(prefix='mpgepmc-test-export-')
+        static_root = tempfile.mkdtemp(prefix='mpgepmc-test-static-')
+        self.addCleanup(shutil.rmtree, self.root, ignore_errors=True)
+        self.addCleanup(shutil.rmtree, static_root, ignore_errors=True)
+        os.makedirs(os.path.join(static_root, 'css'))
+        with open(os.path.join(static_root, 'css', 'site.min.css'), 'w') as handle:
+            handle.write('body{margin:0}')
+        overrides = self.settings(STATIC_ROOT=static_root, MEDIA_ROOT=MEDIA_ROOT)
+        overrides.enable()
+        self.addCleanup(overrides.disable)
+
+    def page(self, path):
+        return os.path.join(self.root, *[part for part in path.split('/') if part], 'index.html')
+
+    def test_first_run_exports_every_public_page_and_assets(self):
+        result = export_site(self.root)
+        project = Project.objects.first()
+        self.assertFalse(result['failed'])
+        self.assertEqual(len(result['rendered']), 1 + 3 + 2 + 6 + 6 + 3)
+        self.assertEqual(result['assets'], 1)
+        with open(self.page(reverse('mpgepmc_core:project_detail', args=[project.slug])), 'rb') as handle:
+            html = handle.read()
+        self.assertIn(project.title.encode(), html)
+        with gzip.open(self.page(reverse('mpgepmc_core:home')) + '.gz') as handle:
+            self.assertTrue(handle.read().lstrip().lower().startswith(b'<!doctype html'))
+        self.assertTrue(os.path.isfile(os.path.join(self.root, 'static', 'css', 'site.min.css')))
+
+        again = export_site(self.root)
+        self.assertEqual((again['rendered'], again['removed'], again['assets']), ([], [], 0))
+
+    def test_edit_rerenders_only_pages_that_show_the_item(self):
+        export_site(self.root)
+        project = Project.objects.order_by('posted_date').first()
+        project.title = "Edited project title"
+        project.save()
+        clear_content_caches()
+
+        rendered = export_site(self.root)['rendered']
+        detail = reverse('mpgepmc_core:project_detail', args=[project.slug])
+        self.assertIn(detail, rendered)
+        self.assertFalse([path for path in rendered if path.startswith(reverse('mpgepmc_core:blogs'))])
+        self.assertNotIn(reverse('mpgepmc_core:home'), rendered)
+        with open(self.page(detail), 'rb') as handle:
+            self.assertIn(b"Edited project title", handle.read())
+
+    def test_unpublished_item_is_removed(self):
+        export_site(self.root)
+        blog = MpgBlog.objects.first()
+        blog.is_published = False
+        blog.save()
+        clear_content_caches()
+
+        result = export_site(self.root)
+        detail = reverse('mpgepmc_core:blog_detail', args=[blog.slug])
+        self.assertEqual(result['removed'], [detail])
+        self.assertFalse(os.path.exists(self.page(detail)))
+        self.assertFalse(os.path.exists(os.path.dirname(self.page(detail))))
+
+    def test_command_dry_run_writes_nothing(self):
+        out = StringIO()
+        call_command('export_static_site', output=self.root, dry_run=True, stdout=out)
+        self.assertIn(f"would render {reverse('mpgepmc_core:home')}", out.getvalue())
+        self.assertFalse(os.path.exists(self.page(reverse('mpgepmc_core:home'))))
+
+
+class RequestMetricsMiddlewareTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        seed_site()
+
+    def setUp(self):
+        clear_content_caches()
+
+    @override_settings(REQUEST_METRICS_HEADERS=True)
+    def test_headers_report_query_count(self):
+        response = self.client.get(reverse('mpgepmc_core:blogs'), secure=True)
+        self.assertEqual(response['X-Query-Count'], '4')
+        self.assertIn('sql;dur=', response['Server-Timing'])
+        self.assertIn('render;dur=', response['Server-Timing'])
+
+    @override_settings(REQUEST_METRICS_HEADERS=False)
+    def test_headers_are_opt_in(self):
+        response = self.client.get(reverse('mpgepmc_core:blogs'), secure=True)
+        self.assertNotIn('X-Query-Count', response)
+        self.assertNotIn('Server-Timing', response)
+
+    def test_logs_one_line_per_request(self):
+        with self.assertLogs('mpgepmc_core.metrics', 'INFO') as logs:
+            self.client.get(reverse('mpgepmc_core:blogs'), secure=True)
+        self.assertEqual(len(logs.output), 1)
+        self.assertIn('view=mpgepmc_core:blogs status=200 queries=4 ', logs.output[0])
+
+
+@override_settings(MEDIA_ROOT=MEDIA_ROOT, PUBLISHED_FILES_REBUILD_ON_SAVE=False)
+class AsyncViewTests(TestCase):
+    """
+    Drives the async views through the ASGI request path (AsyncClient), where
+    any synchronous query left in a view, template or decorator raises
+    SynchronousOnlyOperation instead of passing silently.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        seed_site()
+        cls.blog = MpgBlog.objects.order_by('posted_date')[2]
+        cls.project = Project.objects.first()
+        cls.service = MpgService.objects.first()
+
+    def setUp(self):
+        clear_content_caches()
+
+    async def test_content_pages_render_and_cache(self):
+        urls = [
+            reverse('mpgepmc_core:home'),
+            reverse('mpgepmc_core:blogs'),
+            reverse('mpgepmc_core:blog_detail', args=[self.blog.slug]),
+            reverse('mpgepmc_core:projects'),
+            reverse('mpgepmc_core:project_detail', args=[self.project.slug]),
+            reverse('mpgepmc_core:services'),
+            reverse('mpgepmc_core:service_detail', args=[self.service.slug]),
+        ]
+        for url in urls:
+            with self.subTest(url=url):
+                response = await self.async_client.get(url, secure=True)
+                self.assertEqual(response.status_code, 200)
+                self.assertEqual(response[CACHE_HEADER], 'MISS')
+        with override_settings(PAGE_CACHE_VARIANTS=1):
+            response = await self.async_client.get(reverse('mpgepmc_core:blogs'), secure=True)
+        self.assertEqual(response[CACHE_HEADER], 'HIT')
+        self.assertContains(response, self.blog.title)
+
+        not_modified = await self.async_client.get(
+            reverse('mpgepmc_core:blogs'), secure=True, headers={'If-None-Match': response['ETag']}
+        )
+        self.assertEqual(not_modified.status_code, 304)
+
+    @override_settings(REQUEST_METRICS_HEADERS=True)
+    async def test_metrics_count_async_queries(self):
+        # The same queries as under the sync client (QueryBudgetTests' 'blogs' budget)
+        response = await self.async_client.get(reverse('mpgepmc_core:blogs'), secure=True)
+        self.assertEqual(response['X-Query-Count'], '4')
+
+    async def test_missing_items_are_404(self):
+        for url in (reverse('mpgepmc_core:blog_detail', args=['missing']),
+                    reverse('mpgepmc_core:service_detail', args=['missing'])):
+            response = await self.async_client.get(url, secure=True)
+            self.assertEqual(response.status_code, 404)
+
+    async def test_contact_form_queues_email(self):
+        response = await self.async_client.post(reverse('mpgepmc_core:contact_form_submit'), {
+            'user_full_name': 'Ali', 'user_email': 'ali@example.com', 'user_message': 'Hello',
+        }, secure=True)
+        self.assertRedirects(response, reverse('mpgepmc_core:thank_you'), fetch_redirect_response=False)
+        self.assertEqual(await OutboundEmail.objects.acount(), 1)
+
+        invalid = await self.async_client.post(reverse('mpgepmc_core:contact_form_submit'), {
+            'user_full_name': 'Ali',
+        }, secure=True)
+        self.assertContains(invalid, 'This field is required.')
+        self.assertEqual(await OutboundEmail.objects.acount(), 1)
+
+    async def test_service_request_is_saved_and_queues_email(self):
+        url = reverse('mpgepmc_core:request_service', args=[self.service.slug])
+        self.assertEqual((await self.async_client.get(url, secure=True)).status_code, 200)
+        response = await self.async_client.post(url, {
+            'user_full_name': 'Ali', 'user_email': 'ali@example.com', 'user_message': 'A website, please.',
+        }, secure=True)
+        self.assertRedirects(response, reverse('mpgepmc_core:services'), fetch_redirect_response=False)
+        self.assertTrue(await ServiceRequest.objects.filter(mpgservice=self.service, user_full_name='Ali').aexists())
+        self.assertEqual(await OutboundEmail.objects.acount(), 1)
+
+    async def test_donation_checkout_saves_slip_and_queues_email(self):
+        donation = await Donation.objects.acreate(amount=Decimal('750.00'))
+        url = reverse('mpgepmc_core:donation_checkout', args=[donation.donation_order_number])
+        page = await self.async_client.get(url, secure=True)
+        self.assertContains(page, 'PK00TEST0001')
+
+        slip = SimpleUploadedFile('slip.pdf', b'%PDF-1.4 async slip', content_type='application/pdf')
+        response = await self.async_client.post(url, {
+            'full_name': 'Ali', 'email': 'ali@example.com', 'transaction_id': 'TX-ASYNC', 'transaction_slip': slip,
+        }, secure=True)
+        self.assertRedirects(
+            response, reverse('mpgepmc_core:donation_success', args=[donation.donation_order_number]),
+            fetch_redirect_response=False,
+        )
+        await donation.arefresh_from_db()
+        self.assertEqual(donation.status, Donation.DonationStatus.AWAITING_VERIFICATION)
+        self.assertTrue(donation.transaction_slip.name)
+        self.assertEqual(await OutboundEmail.objects.acount(), 1)
+
+
+@override_settings(MEDIA_ROOT=MEDIA_ROOT)
+class DonationSlipTests(TestCase):
+    """Content-addressed slips: one file per distinct upload, and reused receipts flagged."""
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(MEDIA_ROOT, ignore_errors=True)
+
+    def submit(self, transaction_id, content=b'%PDF-1.4 same slip'):
+        donation = Donation.objects.create(amount=Decimal('500.00'))
+        donation.transaction_id = transaction_id
+        donation.transaction_slip = SimpleUploadedFile('Slip.PDF', content, content_type='application/pdf')
+        with self.captureOnCommitCallbacks(execute=True):
+            donation.save()
+        return donation
+
+    def test_identical_slips_share_one_file_and_are_flagged(self):
+        first = self.submit('TX-1')
+        second = self.submit('TX-2')
+        self.assertEqual(first.transaction_slip.name, second.transaction_slip.name)
+        self.assertRegex(first.transaction_slip.name, r'^donation_slips/[0-9a-f]{2}/[0-9a-f]{64}\.pdf$')
+        self.assertEqual(len(os.listdir(os.path.dirname(first.transaction_slip.path))), 1)
+        first.refresh_from_db()
+        self.assertTrue(first.slip_reused and second.slip_reused)
+        self.assertFalse(first.reference_reused or second.reference_reused)
+
+        different = self.submit('TX-3', content=b'%PDF-1.4 another slip')
+        self.assertNotEqual(different.transaction_slip.name, first.transaction_slip.name)
+        self.assertFalse(different.slip_reused)
+
+    def test_reused_reference_is_flagged_whatever_its_formatting(self):
+        first = self.submit('tx-12 ab', content=b'one')
+        second = self.submit('TX12AB', content=b'two')
+        first.refresh_from_db()
+        self.assertEqual(second.transaction_reference, 'TX12AB')
+        self.assertTrue(first.reference_reused and second.reference_reused)
+        self.assertFalse(first.slip_reused or second.slip_reused)
+
+    def test_file_is_deleted_with_its_last_donation(self):
+        first = self.submit('TX-1')
+        second = self.submit('TX-2')
+        path = first.transaction_slip.path
+        with self.captureOnCommitCallbacks(execute=True):
+            first.delete()
+        self.assertTrue(os.path.exists(path))
+        with self.captureOnCommitCallbacks(execute=True):
+            second.delete()
+        self.assertFalse(os.path.exists(path))
+
+    def test_replacing_a_slip_releases_the_old_file(self):
+        donation = self.submit('TX-1', content=b'first upload')
+        old_path = donation.transaction_slip.path
+        donation.transaction_slip = SimpleUploadedFile('slip.png', b'second upload', content_type='image/png')
+        with self.captureOnCommitCallbacks(execute=True):
+            donation.save()
+        self.assertFalse(os.path.exists(old_path))
+        self.assertTrue(os.path.exists(donation.transaction_slip.path))
+
+    def test_slip_released_while_an_upload_reuses_it_is_restored(self):
+        first = self.submit('TX-1')
+        path = first.transaction_slip.path
+        with self.captureOnCommitCallbacks() as release:
+            first.delete()
+        second = Donation.objects.create(amount=Decimal('500.00'))
+        second.transaction_slip = SimpleUploadedFile('slip.pdf', b'%PDF-1.4 same slip', content_type='application/pdf')
+        with self.captureOnCommitCallbacks() as upload:
+            second.save()
+        self.assertEqual(second.transaction_slip.path, path)
+        # Another worker's release checked for references before the upload committed
+        os.remove(path)
+        for callback in upload:
+            callback()
+        with open(path, 'rb') as handle:
+            self.assertEqual(handle.read(), b'%PDF-1.4 same slip')
+        # A release that runs after the upload committed sees the new reference
+        for callback in release:
+            callback()
+        self.assertTrue(os.path.exists(path))
+
+    def test_consolidate_command_moves_legacy_slips(self):
+        legacy_dir = os.path.join(MEDIA_ROOT, 'donation_slips')
+        os.makedirs(legacy_dir, exist_ok=True)
+        names = []
+        for order in ('MPGepmc-AAAAAA', 'MPGepmc-BBBBBB'):
+            with open(os.path.join(legacy_dir, f'{order}.png'), 'wb') as handle:
+                handle.write(b'legacy slip bytes')
+            names.append(f'donation_slips/{order}.png')
+        donations = [Donation.objects.create(amount=Decimal('100.00')) for _ in names]
+        for donation, name in zip(donations, names):
+            Donation.objects.filter(pk=donation.pk).update(transaction_slip=name)
+
+        out = StringIO()
+        call_command('consolidate_donation_slips', stdout=out)
+        self.assertIn('2 slip(s) hashed: 1 unique file(s) were stored, 2 old file(s) were removed', out.getvalue())
+        first, second = (Donation.objects.get(pk=donation.pk) for donation in donations)
+        self.assertEqual(first.transaction_slip.name, second.transaction_slip.name)
+        self.assertTrue(os.path.exists(first.transaction_slip.path))
+        self.assertTrue(first.slip_reused and second.slip_reused)
+        for name in names:
+            self.assertFalse(os.path.exists(os.path.join(MEDIA_ROOT, name)))
+
+
+@override_settings(ADMIN_COUNT_LIMIT=5)
+class AdminScaleTests(TestCase):
+    """The donation and service request changelists: keyset pages, capped counts, prefix search."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin_user = User.objects.create_superuser('admin', 'admin@example.com', 'password')
+        cls.donations = []
+        for n in range(7):
+            donation = Donation.objects.create(
+                amount=Decimal('100.00'), full_name=f"Donor {n}", email=f"Donor{n}@Example.com",
+                transaction_id=f"tx-{n:03d} ab",
+            )
+            cls.donations.append(donation)
+        # Two years of history, with a tie on created_at that only the id breaks
+        when = timezone.make_aware(datetime.datetime(2024, 3, 5, 12))
+        for n, donation in enumerate(cls.donations):
+            created = when if n in (0, 1) else when + datetime.timedelta(days=90 * n)
+            Donation.objects.filter(pk=donation.pk).update(created_at=created)
+        cls.url = reverse('admin:mpgepmc_core_donation_changelist')
+
+    def setUp(self):
+        self.client.force_login(self.admin_user)
+
+    def get(self, url, params=None):
+        return self.client.get(url, params, secure=True)
+
+    def test_keyset_pages_cover_every_donation_once(self):
+        seen = []
+        params = {}
+        with mock.patch.object(DonationAdmin, 'list_per_page', 3):
+            for _ in range(5):
+                response = self.get(self.url, params)
+                self.assertEqual(response.status_code, 200)
+                seen += [donation.pk for donation in response.context['cl'].result_list]
+                page = response.context['cl'].keyset_page
+                if not page.has_next:
+                    break
+                params = {'after': page.next_cursor}
+        expected = list(Donation.objects.order_by('-created_at', '-id').values_list('pk', flat=True))
+        self.assertEqual(seen, expected)
+
+    def test_counts_stop_at_the_limit(self):
+        response = self.get(self.url)
+        self.assertContains(response, 'more than 5 Donation Records')
+        response = self.get(self.url, {'q': 'mpgepmc-'})
+        self.assertContains(response, 'more than 5')
+        with override_settings(ADMIN_COUNT_LIMIT=100):
+            self.assertContains(self.get(self.url), '7 Donation Records')
+
+    def test_sorting_by_a_column_uses_numbered_pages(self):
+        response = self.get(self.url, {'o': '2'})
+        self.assertEqual(response.status_code, 200)
+        self.assertIsNone(response.context['cl'].keyset_page)
+        self.assertEqual(len(response.context['cl'].result_list), 7)
+
+    def test_bad_cursor_falls_back_to_the_first_page(self):
+        response = self.get(self.url, {'after': 'not-a-cursor'})
+        self.assertRedirects(response, self.url + '?e=1', fetch_redirect_response=False)
+
+    def test_prefix_search(self):
+        donation = self.donations[3]
+        number = donation.donation_order_number
+        searches = {
+            number.lower(): [donation.pk],
+            number[len('MPGepmc-'):]: [donation.pk],
+            'TX003': [donation.pk],
+            'tx-003 A': [donation.pk],
+            'DONOR3@': [donation.pk],
+            'mpg': sorted(d.pk for d in self.donations),
+            '%': [],
+        }
+        for term, expected in searches.items():
+            with self.subTest(term=term):
+                response = self.get(self.url, {'q': term})
+                self.assertEqual(sorted(d.pk for d in response.context['cl'].result_list), expected)
+
+    def test_date_hierarchy_drills_down(self):
+        response = self.get(self.url)
+        self.assertEqual([choice['title'] for choice in self._hierarchy(response)['choices']], ['2024', '2025'])
+
+        response = self.get(self.url, {'created_at__year': '2024'})
+        self.assertEqual([choice['title'] for choice in self._hierarchy(response)['choices']],
+                         ['March 2024', 'September 2024', 'November 2024'])
+        response = self.get(self.url, {'created_at__year': '2024', 'created_at__month': '3'})
+        self.assertEqual([choice['title'] for choice in self._hierarchy(response)['choices']], ['March 5'])
+        self.assertEqual(len(response.context['cl'].result_list), 2)
+
+    def _hierarchy(self, response):
+        return indexed_date_hierarchy(response.context['cl'])
+
+    @override_settings(ADMIN_COUNT_LIMIT=100)
+    def test_service_request_list_runs_no_query_per_row(self):
+        services = [MpgService.objects.create(name=f"Service {n}", short_description="s", full_description="s") for n in range(2)]
+        url = reverse('admin:mpgepmc_core_servicerequest_changelist')
+
+        def queries():
+            with CaptureQueriesContext(connection) as captured:
+                self.assertEqual(self.get(url).status_code, 200)
+            return len(captured)
+
+        ServiceRequest.objects.create(mpgservice=services[0], user_full_name='A', user_email='a@example.com', user_message='m')
+        before = queries()
+        for n in range(5):
+            ServiceRequest.objects.create(mpgservice=services[n % 2], user_full_name='B', user_email=f'b{n}@example.com', user_message='m')
+        self.assertEqual(queries(), before)
+        response = self.get(url, {'q': 'B3@EXAMPLE'})
+        self.assertEqual([r.user_email for r in response.context['cl'].result_list], ['b3@example.com'])
+
+
+class DonationRollupTests(TestCase):
+    """Daily/monthly totals follow every donation write, and reports read nothing else."""
+
+    def totals(self, status):
+        row = DonationDailyRollup.objects.filter(day=timezone.localdate(), status=status).first()
+        return (row.count, row.amount) if row else (0, 0)
+
+    def test_totals_follow_creation_status_amount_and_deletion(self):
+        pending, completed = Donation.DonationStatus.PENDING, Donation.DonationStatus.COMPLETED
+        first = Donation.objects.create(amount=Decimal('500.00'))
+        second = Donation.objects.create(amount=Decimal('250.50'))
+        self.assertEqual(self.totals(pending), (2, Decimal('750.50')))
+
+        first.status = completed
+        first.save()
+        self.assertEqual(self.totals(pending), (1, Decimal('250.50')))
+        self.assertEqual(self.totals(completed), (1, Decimal('500.00')))
+
+        first.amount = Decimal('600.00')
+        first.save()
+        self.assertEqual(self.totals(completed), (1, Decimal('600.00')))
+
+        second.delete()
+        self.assertEqual(self.totals(pending), (0, 0))
+        month = DonationMonthlyRollup.objects.get(month=timezone.localdate().replace(day=1), status=completed)
+        self.assertEqual((month.count, month.amount), (1, Decimal('600.00')))
+        self.assertEqual(rollup_drift(), [])
+
+    def test_bulk_transitions_move_totals(self):
+        for amount in ('100.00', '200.00', '300.00'):
+            Donation.objects.create(amount=Decimal(amount), email='donor@example.com')
+        changed = transition_donations(Donation.objects.all(), Donation.DonationStatus.FAILED)
+        self.assertEqual(changed, 3)
+        self.assertEqual(self.totals(Donation.DonationStatus.FAILED), (3, Decimal('600.00')))
+        self.assertEqual(self.totals(Donation.DonationStatus.PENDING), (0, 0))
+        self.assertEqual(rollup_drift(), [])
+
+    def test_rebuild_repairs_writes_that_bypass_the_model(self):
+        Donation.objects.create(amount=Decimal('100.00'))
+        Donation.objects.bulk_create([Donation(amount=Decimal('5.00'), donation_order_number=f'MPGepmc-BULK{n}') for n in range(3)])
+        Donation.objects.filter(amount=Decimal('100.00')).update(status=Donation.DonationStatus.COMPLETED)
+        out = StringIO()
+        with self.assertRaises(CommandError):
+            call_command('rebuild_donation_rollups', check=True, stdout=out)
+        call_command('rebuild_donation_rollups', stdout=out)
+        self.assertIn('Donation totals rebuilt: 2 daily and 2 monthly rows', out.getvalue())
+        self.assertEqual(self.totals(Donation.DonationStatus.PENDING), (3, Decimal('15.00')))
+        self.assertEqual(self.totals(Donation.DonationStatus.COMPLETED), (1, Decimal('100.00')))
+        call_command('rebuild_donation_rollups', check=True, stdout=out)
+        self.assertIn('Donation totals match the donations.', out.getvalue())
+
+    def test_days_are_local_dates(self):
+        # 23:30 UTC is already the next morning in Karachi (UTC+5)
+        late = datetime.datetime(2025, 1, 31, 23, 30, tzinfo=datetime.timezone.utc)
+        self.assertEqual(donation_day(late), datetime.date(2025, 2, 1))
+
+    def test_report_reads_only_the_rollups(self):
+        for n in range(5):
+            Donation.objects.create(amount=Decimal('100.00'))
+        rebuild_rollups()
+        today = timezone.localdate()
+        with self.assertNumQueries(1):
+            report = donation_report(today - datetime.timedelta(days=7), today)
+        pending = Donation.DonationStatus.values.index(Donation.DonationStatus.PENDING)
+        self.assertEqual(report['rows'], [(today, [(5, Decimal('500.00')) if i == pending else (0, 0) for i in range(4)])])
+        self.assertEqual(report['totals'][pending], (5, Decimal('500.00')))
+        monthly = donation_report(today, today, by='month')
+        self.assertEqual(monthly['rows'][0][0], today.replace(day=1))
+
+    def test_admin_dashboard(self):
+        admin_user = User.objects.create_superuser('admin', 'admin@example.com', 'password')
+        self.client.force_login(admin_user)
+        url = reverse('admin:mpgepmc_core_donation_dashboard')
+        Donation.objects.create(amount=Decimal('1234.00'))
+
+        def queries():
+            with CaptureQueriesContext(connection) as captured:
+                response = self.client.get(url, secure=True)
+            self.assertEqual(response.status_code, 200)
+            return response, len(captured)
+
+        response, before = queries()
+        self.assertContains(response, '1,234.00')
+        Donation.objects.bulk_create([Donation(amount=Decimal('1.00'), donation_order_number=f'MPGepmc-MANY{n}') for n in range(50)])
+        rebuild_rollups()
+        response, after = queries()
+        self.assertEqual(after, before)
+        self.assertContains(response, '1,284.00')
+
+        invalid = self.client.get(url, {'start': '2025-02-01', 'end': '2025-01-01'}, secure=True)
+        self.assertContains(invalid, 'The end date must not be before the start date.')
+        yearly = self.client.get(url, {'start': '2024-01-01', 'end': '2025-12-31', 'by': 'day'}, secure=True)
+        self.assertEqual(yearly.context['by'], 'month')
+
+
+class StreamingExportTests(TestCase):
+    """CSV/JSONL exports are generated lazily, block by block, from a chunked cursor."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.service = MpgService.objects.create(name="Web development", short_description="s", full_description="s")
+        for n in range(30):
+            Donation.objects.create(
+                amount=Decimal('100.50') + n, full_name=f"Donor {n}", email=f"donor{n}@example.com",
+                transaction_id=f"TX{n}", status=Donation.DonationStatus.COMPLETED if n % 3 else Donation.DonationStatus.PENDING,
+            )
+        Donation.objects.filter(full_name='Donor 0').update(full_name='=HYPERLINK("http://evil")')
+        ServiceRequest.objects.create(
+            mpgservice=cls.service, user_full_name='Ali', user_email='ali@example.com', user_message='Line one\nline, two',
+        )
+        ServiceRequest.objects.create(user_full_name='Sara', user_email='sara@example.com', user_message='Hi', is_processed=True)
+
+    def read_csv(self, data):
+        return list(csv.DictReader(StringIO(data.decode())))
+
+    def test_stream_is_lazy_and_chunked(self):
+        with self.assertNumQueries(0):
+            stream = export_stream('donations', Donation.objects.all())
+        with mock.patch('mpgepmc_core.exports.BLOCK_SIZE', 256), mock.patch('mpgepmc_core.exports.EXPORT_CHUNK_SIZE', 7):
+            blocks = list(stream)
+        self.assertGreater(len(blocks), 5)
+        rows = self.read_csv(b''.join(blocks))
+        self.assertEqual(len(rows), 30)
+        self.assertEqual(rows[1]['amount'], '101.50')
+        # Spreadsheet formulas typed into a form are exported as text
+        self.assertEqual(rows[0]['full_name'], '\'=HYPERLINK("http://evil")')
+
+    def test_command_writes_filtered_gzipped_jsonl(self):
+        output = os.path.join(tempfile.mkdtemp(), 'donations.jsonl.gz')
+        self.addCleanup(shutil.rmtree, os.path.dirname(output))
+        err = StringIO()
+        call_command('export_records', 'donations', format='jsonl', gzip=True, output=output,
+                     status='PENDING', since=timezone.localdate(), stderr=err)
+        with gzip.open(output, 'rt') as handle:
+            records = [json.loads(line) for line in handle]
+        self.assertEqual(len(records), 10)
+        self.assertEqual({record['status'] for record in records}, {'PENDING'})
+        self.assertIn('bytes written', err.getvalue())
+
+        call_command('export_records', 'donations', output=output, until=timezone.localdate() - datetime.timedelta(days=1),
+                     stderr=err)
+        with open(output, 'rb') as handle:
+            self.assertEqual(self.read_csv(handle.read()), [])
+        with self.assertRaises(CommandError):
+            call_command('export_records', 'donations', open=True, stderr=err)
+
+    def test_service_request_export(self):
+        output = os.path.join(tempfile.mkdtemp(), 'requests.csv')
+        self.addCleanup(shutil.rmtree, os.path.dirname(output))
+        call_command('export_records', 'service_requests', open=True, output=output, stderr=StringIO())
+        with open(output, 'rb') as handle:
+            [row] = self.read_csv(handle.read())
+        self.assertEqual((row['service'], row['message']), ('Web development', 'Line one\nline, two'))
+
+    def test_admin_action_streams_every_filtered_row(self):
+        self.client.force_login(User.objects.create_superuser('admin', 'admin@example.com', 'password'))
+        url = reverse('admin:mpgepmc_core_donation_changelist') + '?status__exact=COMPLETED'
+        response = self.client.post(url, {
+            'action': 'export_csv_gz', 'select_across': '1', 'index': '0',
+            '_selected_action': [Donation.objects.first().pk],
+        }, secure=True)
+        self.assertTrue(response.streaming)
+        self.assertEqual(response['Content-Type'], 'application/gzip')
+        self.assertRegex(response['Content-Disposition'], r'attachment; filename="donations-\d{8}-\d{6}\.csv\.gz"')
+        rows = self.read_csv(gzip.decompress(b''.join(response.streaming_content)))
+        self.assertEqual(len(rows), 20)
+        self.assertEqual({row['status'] for row in rows}, {'COMPLETED'})
+
+
+class SQLiteProductionModeTests(TestCase):
+    """WAL, per-connection pragmas and BEGIN IMMEDIATE from settings.SQLITE_PRODUCTION_SETTINGS."""
+
+    def open(self, path):
+        settings_dict = {**connection.settings_dict, **settings.SQLITE_PRODUCTION_SETTINGS, 'NAME': path}
+        wrapper = type(connections['default'])(settings_dict, alias='sqlite_mode_test')
+        self.addCleanup(wrapper.close)
+        return wrapper
+
+    def test_connections_run_in_wal_with_the_pragmas(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        writer = self.open(os.path.join(directory, 'db.sqlite3'))
+        with writer.cursor() as cursor:
+            cursor.execute('PRAGMA journal_mode')
+            self.assertEqual(cursor.fetchone()[0], 'wal')
+            cursor.execute('PRAGMA busy_timeout')
+            self.assertEqual(cursor.fetchone()[0], settings.SQLITE_PRAGMAS['busy_timeout'])
+            cursor.execute('CREATE TABLE t (n integer)')
+            cursor.execute('INSERT INTO t VALUES (1)')
+        self.assertEqual(writer.transaction_mode, 'IMMEDIATE')
+
+        # A reader in the middle of a transaction doesn't hold up a writer, and keeps its snapshot
+        reader = self.open(os.path.join(directory, 'db.sqlite3'))
+        with reader.cursor() as cursor:
+            cursor.execute('BEGIN')
+            cursor.execute('SELECT count(*) FROM t')
+            self.assertEqual(cursor.fetchone()[0], 1)
+            with writer.cursor() as write_cursor:
+                write_cursor.execute('INSERT INTO t VALUES (2)')
+            cursor.execute('SELECT count(*) FROM t')
+            self.assertEqual(cursor.fetchone()[0], 1)
+            cursor.execute('ROLLBACK')
+
+    def test_no_persistent_connections_under_asgi(self):
+        probe = (
+            "import mpgepmccom.{}; from django.conf import settings; "
+            "print(settings.DATABASES['default'].get('CONN_MAX_AGE'))"
+        )
+        environment = {**os.environ, 'SQLITE_PRODUCTION_MODE': 'True'}
+        environment.pop('DJANGO_SERVER_INTERFACE', None)
+        for module, expected in (('wsgi', '600'), ('asgi', '0')):
+            result = subprocess.run(
+                [sys.executable, '-c', probe.format(module)], cwd=settings.BASE_DIR, env=environment,
+                capture_output=True, text=True, check=True,
+            )
+            self.assertEqual(result.stdout.strip(), expected, module)
+
+    def test_connection_status(self):
+        status = connection_status()
+        self.assertIn(status['transaction_mode'], ('DEFERRED', 'IMMEDIATE'))
+        self.assertIn('journal_mode', status)
+
+    def test_admin_form_hook_is_still_there(self):
+        # ShortWriteAdminMixin relies on this private ModelAdmin method
+        hook = getattr(ModelAdmin, '_changeform_view', None)
+        self.assertTrue(callable(hook), 'ModelAdmin._changeform_view is gone; revisit ShortWriteAdminMixin')
+        self.assertEqual(
+            list(inspect.signature(hook).parameters),
+            ['self', 'request', 'object_id', 'form_url', 'extra_context'],
+        )
+
+    def test_admin_change_form_is_shown_outside_a_transaction(self):
+        self.client.force_login(User.objects.create_superuser('admin', 'admin@example.com', 'password'))
+        blog = MpgBlog.objects.create(title='Post', short_summary='s', content='c')
+        url = reverse('admin:mpgepmc_core_mpgblog_change', args=[blog.pk])
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(self.client.get(url, secure=True).status_code, 200)
+        self.assertFalse([q for q in queries if q['sql'].startswith('SAVEPOINT')])
+
+        with CaptureQueriesContext(connection) as queries:
+            self.client.post(url, {'title': 'Post', 'short_summary': 's', 'content': 'c'}, secure=True)
+        self.assertTrue([q for q in queries if q['sql'].startswith('SAVEPOINT')])
+
+
+class SiteSnapshotTests(TestCase):
+    """The per-process snapshot follows version stamps, and never outlives SITE_SNAPSHOT_MAX_AGE."""
+
+    def setUp(self):
+        clear_content_caches()
+        self.account = BankAccount.objects.create(
+            account_title='Old', account_number='1', bank_name='Bank', iban='PK1',
+        )
+
+    def test_reused_until_a_bank_account_is_saved(self):
+        self.assertEqual(get_site_snapshot().active_bank_account, self.account)
+        with self.assertNumQueries(0):
+            get_site_snapshot()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.account.account_title = 'New'
+            self.account.save()
+        self.assertEqual(get_site_snapshot().active_bank_account.account_title, 'New')
+
+    def test_rebuilt_after_max_age_without_a_visible_bump(self):
+        # Another worker's save, with a content cache this process doesn't share
+        get_site_snapshot()
+        BankAccount.objects.filter(pk=self.account.pk).update(account_title='Changed elsewhere')
+        self.assertEqual(get_site_snapshot().active_bank_account.account_title, 'Old')
+        with mock.patch('mpgepmc_core.site_snapshot.time.monotonic', return_value=time.monotonic() + 61):
+            self.assertEqual(get_site_snapshot().active_bank_account.account_title, 'Changed elsewhere')
+
+
+@override_settings(PUBLISHED_FILES_REBUILD_ON_SAVE=False)
+class RelatedIndexTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        seed_site()
+
+    def setUp(self):
+        clear_content_caches()
+
+    def test_rebuild_invalidates_cached_pages(self):
+        before = get_versions(version_name(MpgBlog))
+        with self.captureOnCommitCallbacks(execute=True):
+            rebuild_related_index(MpgBlog)
+        self.assertNotEqual(get_versions(version_name(MpgBlog)), before)
+
+    def test_saves_leave_the_index_to_the_scheduled_rebuild(self):
+        blog = MpgBlog.objects.first()
+        with mock.patch('mpgepmc_core.signals.rebuild_related_index') as rebuild:
+            with self.captureOnCommitCallbacks(execute=True):
+                blog.content = '<p>Something else entirely.</p>'
+                blog.save()
+            rebuild.assert_not_called()
+
+            with self.settings(RELATED_INDEX_REBUILD_ON_SAVE=True), self.captureOnCommitCallbacks(execute=True):
+                blog.content = '<p>And something else again.</p>'
+                blog.save()
+            rebuild.assert_called_once_with(MpgBlog)
+
+
+class TransitionDonationsTests(TestCase):
+    """Bulk status changes: one transition row, one rollup move and one email per donation actually changed."""
+
+    def setUp(self):
+        self.donations = [
+            Donation.objects.create(amount=Decimal(amount), email=f'donor{n}@example.com', full_name=f'Donor {n}')
+            for n, amount in enumerate(('100.00', '200.00', '300.00'))
+        ]
+
+    def emails_per_recipient(self):
+        return sorted(Counter(
+            recipient for recipients in OutboundEmail.objects.values_list('recipients', flat=True)
+            for recipient in recipients
+        ).items())
+
+    def test_transition_rows_rollups_and_emails(self):
+        completed = Donation.DonationStatus.COMPLETED
+        with self.captureOnCommitCallbacks(execute=True):
+            changed = transition_donations(Donation.objects.all(), completed)
+        self.assertEqual(changed, 3)
+        self.assertEqual(
+            sorted(DonationStatusTransition.objects.values_list('donation', 'from_status', 'to_status')),
+            [(donation.pk, 'PENDING', 'COMPLETED') for donation in self.donations],
+        )
+        self.assertEqual(self.emails_per_recipient(), [(f'donor{n}@example.com', 1) for n in range(3)])
+        self.assertEqual(rollup_drift(), [])
+
+        # Running it again changes nothing and sends nothing
+        self.assertEqual(transition_donations(Donation.objects.all(), completed), 0)
+        self.assertEqual(DonationStatusTransition.objects.count(), 3)
+        self.assertEqual(OutboundEmail.objects.count(), 3)
+
+    def test_rows_changed_after_the_scan_use_their_current_status(self):
+        first, second, third = self.donations
+        completed, awaiting = Donation.DonationStatus.COMPLETED, Donation.DonationStatus.AWAITING_VERIFICATION
+        chunks = donations_module._chunks
+        interleaved = []
+
+        def chunks_after_concurrent_changes(items, size):
+            # Between the candidate scan and the UPDATE, another request completes the
+            # first donation and moves the second one on
+            if not interleaved:
+                interleaved.append(True)
+                transition_donations(Donation.objects.filter(pk=first.pk), completed)
+                transition_donations(Donation.objects.filter(pk=second.pk), awaiting)
+            return chunks(items, size)
+
+        with mock.patch.object(donations_module, '_chunks', chunks_after_concurrent_changes):
+            changed = transition_donations(Donation.objects.all(), completed)
+
+        self.assertEqual(changed, 2)
+        self.assertEqual(
+            sorted(DonationStatusTransition.objects.values_list('donation', 'from_status', 'to_status')),
+            sorted([
+                (first.pk, 'PENDING', 'COMPLETED'),
+                (second.pk, 'PENDING', 'AWAITING_VERIFICATION'),
+                (second.pk, 'AWAITING_VERIFICATION', 'COMPLETED'),
+                (third.pk, 'PENDING', 'COMPLETED'),
+            ]),
+        )
+        self.assertEqual(self.emails_per_recipient(), [(f'donor{n}@example.com', 1) for n in range(3)])
+        self.assertEqual(rollup_drift(), [])
+
+
+class ChangeTrackingTests(TestCase):
+    """Saves write only what changed, and a status email goes out once per actual status change."""
+
+    def setUp(self):
+        self.donation = Donation.objects.create(amount=Decimal('100.00'), email='donor@example.com')
+        self.donation = Donation.objects.get(pk=self.donation.pk)
+
+    def test_status_email_is_sent_once(self):
+        self.donation.status = Donation.DonationStatus.COMPLETED
+        self.donation.save()
+        self.assertEqual(OutboundEmail.objects.count(), 1)
+        self.assertEqual(DonationStatusTransition.objects.count(), 1)
+
+        # Saving again, or editing another field, doesn't resend it
+        self.donation.save()
+        self.donation.full_name = 'Donor'
+        self.donation.save()
+        self.assertEqual(OutboundEmail.objects.count(), 1)
+        self.assertEqual(DonationStatusTransition.objects.count(), 1)
+
+    def test_update_lists_only_changed_columns(self):
+        self.donation.full_name = 'Donor'
+        with CaptureQueriesContext(connection) as queries:
+            self.donation.save()
+        [update] = [query['sql'] for query in queries if query['sql'].startswith('UPDATE "mpgepmc_core_donation"')]
+        assigned = update.split(' SET ', 1)[1].split(' WHERE ', 1)[0]
+        self.assertEqual(sorted(column.split(' = ')[0] for column in assigned.split(', ')),
+                         ['"full_name"', '"updated_at"'])
+        self.assertFalse(self.donation.changed_fields)
+
+    def test_noop_save_runs_no_query_and_no_signal(self):
+        received = []
+
+        def handler(sender, instance, **kwargs):
+            received.append(instance)
+
+        post_save.connect(handler, sender=Donation)
+        self.addCleanup(post_save.disconnect, handler, sender=Donation)
+        with self.assertNumQueries(0):
+            self.donation.save()
+        self.assertEqual(received, [])
+
+        self.donation.amount = Decimal('150.00')
+        self.donation.save()
+        self.assertEqual(received, [self.donation])
+
+
+class FlakyConnection:
+    """An email connection that raises the given errors, one per send, before it starts sending."""
+
+    def __init__(self, *errors):
+        self.errors = list(errors)
+        self.sent = []
+        self.opened = self.closed = 0
+
+    def open(self):
+        self.opened += 1
+
+    def close(self):
+        self.closed += 1
+
+    def send_messages(self, messages):
+        if self.errors:
+            raise self.errors.pop(0)
+        self.sent.extend(messages)
+        return len(messages)
+
+
+@override_settings(EMAIL_OUTBOX_MAX_ATTEMPTS=3, EMAIL_OUTBOX_RETRY_BASE_SECONDS=60)
+class OutboxTests(TestCase):
+
+    def setUp(self):
+        self.email = enqueue_email('Subject', 'Body', 'from@example.com', ['donor@example.com'], '<p>Body</p>')
+
+    def make_due(self):
+        OutboundEmail.objects.update(next_attempt_at=timezone.now() - datetime.timedelta(seconds=1))
+
+    def test_sends_due_emails(self):
+        self.assertEqual(send_due_emails(), (1, 0))
+        self.assertEqual(len(mail.outbox), 1)
+        self.assertEqual(mail.outbox[0].alternatives[0][0], '<p>Body</p>')
+        self.email.refresh_from_db()
+        self.assertEqual(self.email.status, OutboundEmail.EmailStatus.SENT)
+        self.assertEqual(send_due_emails(), (0, 0))
+
+    def test_claim_is_leased_and_reclaimed_once_it_expires(self):
+        [claimed] = claim_batch(10)
+        self.assertTrue(claimed.claim_token)
+        self.assertEqual(claim_batch(10), [])  # another worker holds it
+
+        later = timezone.now() + datetime.timedelta(seconds=CLAIM_LEASE_SECONDS + 1)
+        with mock.patch('mpgepmc_core.outbox.timezone.now', return_value=later):
+            [reclaimed] = claim_batch(10)
+        self.assertNotEqual(reclaimed.claim_token, claimed.claim_token)
+
+    def test_failures_back_off_then_dead_letter(self):
+        errors = [SMTPException('Mailbox unavailable') for _attempt in range(3)]
+        connection = FlakyConnection(*errors)
+        with mock.patch('mpgepmc_core.outbox.get_connection', return_value=connection):
+            for attempt in (1, 2):
+                before = timezone.now()
+                self.assertEqual(send_due_emails(), (0, 1))
+                self.email.refresh_from_db()
+                self.assertEqual((self.email.status, self.email.attempts), (OutboundEmail.EmailStatus.PENDING, attempt))
+                self.assertEqual(self.email.claim_token, '')
+                self.assertIn('Mailbox unavailable', self.email.last_error)
+                delay = (self.email.next_attempt_at - before).total_seconds()
+                base = 60 * 2 ** (attempt - 1)
+                self.assertTrue(base * 0.8 <= delay <= base * 1.2 + 1, delay)
+                self.assertEqual(send_due_emails(), (0, 0))  # not due yet
+                self.make_due()
+
+            with self.assertLogs('mpgepmc_core.outbox', 'ERROR'):
+                self.assertEqual(send_due_emails(), (0, 1))
+        self.email.refresh_from_db()
+        self.assertEqual((self.email.status, self.email.attempts), (OutboundEmail.EmailStatus.DEAD, 3))
+        self.make_due()
+        self.assertEqual(claim_batch(10), [])
+
+    def test_reconnects_once_when_the_server_drops_the_connection(self):
+        connection = FlakyConnection(SMTPServerDisconnected('idle'))
+        with mock.patch('mpgepmc_core.outbox.get_connection', return_value=connection):
+            self.assertEqual(send_due_emails(), (1, 0))
+        self.assertEqual(len(connection.sent), 1)
+        self.assertEqual(connection.opened, 2)  # the batch's open, then the reconnect
+        self.assertEqual(connection.closed, 2)  # the dropped connection, then the end of the run
+        self.email.refresh_from_db()
+        self.assertEqual(self.email.status, OutboundEmail.EmailStatus.SENT)
+
+
+class SearchTests(TestCase):
+
+    def blog(self, title, content, **fields):
+        return MpgBlog.objects.create(title=title, short_summary='Summary.', content=content, **fields)
+
+    def test_title_matches_rank_above_body_matches(self):
+        body_only = self.blog('Community notes', '<p>Our volunteers planted trees near the river.</p>')
+        in_title = self.blog('Trees for every school', '<p>A planting drive.</p>')
+        self.assertEqual([result.object_id for result in search('trees')], [in_title.pk, body_only.pk])
+        self.assertEqual(search('trees', kinds=['project']), [])
+
+    def test_unpublished_items_are_not_public(self):
+        self.blog('Draft about trees', '<p>Not yet.</p>', is_published=False)
+        self.assertEqual(search('trees'), [])
+
+    def test_snippets_escape_the_text_around_matches(self):
+        self.blog('Maths', '<p>When 5 &lt; 7 &amp; "x" > y, rivers rise.</p>')
+        [result] = search('rivers')
+        self.assertIn('<mark>rivers</mark>', result.snippet)
+        self.assertNotIn('"x"', result.snippet)
+        self.assertIn('&gt; y', result.snippet)
+        self.assertEqual(result.snippet.count('<'), 2)  # only <mark> and </mark>
+
+    def test_match_query_quotes_operators_and_quotes(self):
+        self.assertEqual(build_match_query('trees OR "river" NEAR(x'), '"trees" "OR" "river" "NEAR" "x"*')
+        self.assertEqual(build_match_query('col:value -minus ^start'), '"col" "value" "minus" "start"*')
+        self.assertEqual(build_match_query('" * ( ) :'), '')
+        for query in ('"unbalanced', 'a AND', 'NOT', '*', 'title:trees'):
+            with self.subTest(query=query):
+                search(query)  # never an FTS5 syntax error
+
+    def test_admin_search_is_not_truncated(self):
+        MpgBlog.objects.bulk_create(
+            MpgBlog(title=f'Tree post {n}', slug=f'tree-post-{n}', short_summary='s', content='<p>trees</p>')
+            for n in range(1100)
+        )
+        rebuild_search_index()
+        request = RequestFactory().get('/')
+        queryset, may_have_duplicates = MpgBlogAdmin(MpgBlog, admin_site).get_search_results(
+            request, MpgBlog.objects.all(), 'trees'
+        )
+        self.assertFalse(may_have_duplicates)
+        self.assertEqual(queryset.count(), 1100)
+        queryset, _ = MpgBlogAdmin(MpgBlog, admin_site).get_search_results(request, MpgBlog.objects.all(), '**')
+        self.assertEqual(queryset.count(), 0)
+
+
+def png_upload(name='photo.png', size=(1000, 500)):
+    buffer = BytesIO()
+    Image.new('RGB', size, (40, 120, 200)).save(buffer, format='PNG')
+    return SimpleUploadedFile(name, buffer.getvalue(), content_type='image/png')
+
+
+@override_settings(MEDIA_ROOT=MEDIA_ROOT, PUBLISHED_FILES_REBUILD_ON_SAVE=False)
+class ImageRenditionTests(TestCase):
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        caches['default'].clear()
+
+    def blog(self, **fields):
+        return MpgBlog.objects.create(title='Trees', short_summary='s', content='c', **fields)
+
+    def render(self, template, **context):
+        return Template('{% load mpgepmc_images %}' + template).render(Context(context))
+
+    def test_saving_an_image_generates_every_rendition(self):
+        blog = self.blog(feature_image=png_upload())
+        name = blog.feature_image.name
+        for fmt in RENDITION_FORMATS:
+            for width in (480, 800, 1000):
+                self.assertTrue(default_storage.exists(rendition_name(name, width, fmt)), (width, fmt))
+            self.assertFalse(default_storage.exists(rendition_name(name, 1200, fmt)))
+
+    def test_saves_that_leave_the_image_alone_skip_generation(self):
+        blog = self.blog(feature_image=png_upload())
+        with mock.patch('mpgepmc_core.signals.ensure_renditions') as ensure:
+            blog.title = 'More trees'
+            blog.save()
+            ensure.assert_not_called()
+            blog.feature_image = png_upload('other.png')
+            blog.save()
+            ensure.assert_called_once_with(blog.feature_image.name)
+
+    def test_generation_failures_are_logged_and_do_not_block_the_save(self):
+        with mock.patch('mpgepmc_core.signals.ensure_renditions', side_effect=OSError('broken image')), \
+                self.assertLogs('mpgepmc_core.signals', 'ERROR') as logs:
+            blog = self.blog(feature_image=png_upload())
+        self.assertTrue(MpgBlog.objects.filter(pk=blog.pk).exists())
+        self.assertIn(blog.feature_image.name, logs.output[0])
+        self.assertIn('OSError: broken image', logs.output[0])
+
+    def test_responsive_image_renders_sources_and_dimensions(self):
+        blog = self.blog(feature_image=png_upload())
+        html = self.render('{% responsive_image image alt=alt sizes="50vw" %}', image=blog.feature_image, alt='Trees & <roots>')
+        self.assertTrue(html.startswith('<picture>'))
+        url = default_storage.url(blog.feature_image.name)
+        for fmt in RENDITION_FORMATS:
+            srcset = ', '.join(
+                f"{default_storage.url(rendition_name(blog.feature_image.name, width, fmt))} {width}w"
+                for width in (480, 800, 1000)
+            )
+            self.assertIn(f'<source type="{MIME_TYPES[fmt]}" srcset="{srcset}" sizes="50vw">', html)
+        self.assertIn(f'<img src="{url}" width="1000" height="500" alt="Trees &amp; &lt;roots&gt;"', html)
+
+    def test_responsive_image_falls_back(self):
+        self.assertEqual(self.render('{% responsive_image image %}', image=None), '')
+        html = self.render('{% responsive_image image alt="Card" fallback="img/logo.png" %}', image=None)
+        self.assertEqual(html, '<img src="/static/img/logo.png" alt="Card" class="" loading="lazy" decoding="async">')
+        # An original without renditions is served as a plain <img>
+        html = self.render('{% responsive_image "mpgblog_images/missing.png" %}')
+        self.assertTrue(html.startswith('<img src="/media/mpgblog_images/missing.png"'))
+
+    def test_background_image_uses_the_closest_rendition(self):
+        blog = self.blog(feature_image=png_upload())
+        name = blog.feature_image.name
+        css = self.render('{% background_image image width=900 %}', image=blog.feature_image)
+        self.assertTrue(css.startswith(f"background-image:url('{default_storage.url(name)}');background-image:image-set("))
+        for fmt in RENDITION_FORMATS:
+            self.assertIn(f"url('{default_storage.url(rendition_name(name, 800, fmt))}') type('{MIME_TYPES[fmt]}')", css)
+        self.assertEqual(
+            self.render("{% background_image image fallback='img/logo.png' %}", image=''),
+            "background-image:url('/static/img/logo.png')",
+        )
+        self.assertEqual(self.render('{% background_image image %}', image=''), '')
+
+
+class DonationOrderNumberTests(TestCase):
+
+    def test_a_colliding_order_number_is_retried_inside_the_outer_transaction(self):
+        taken = Donation.objects.create(amount=Decimal('100.00'))
+        numbers = [taken.donation_order_number, 'MPGepmc-RETRY0001']
+        with mock.patch('mpgepmc_core.models.generate_order_number', side_effect=numbers) as generate, \
+                transaction.atomic():
+            donation = Donation.objects.create(amount=Decimal('250.00'))
+            # The collision only rolled back its savepoint: the outer transaction still works
+            donation.status = Donation.DonationStatus.COMPLETED
+            donation.save()
+            self.assertEqual(Donation.objects.count(), 2)
+        self.assertEqual(generate.call_count, 2)
+        donation.refresh_from_db()
+        self.assertEqual(donation.donation_order_number, 'MPGepmc-RETRY0001')
+        self.assertEqual(donation.status, Donation.DonationStatus.COMPLETED)
+        self.assertEqual(DonationStatusTransition.objects.get().donation, donation)
+
+
+
+class TestIsolationTests(TestCase):
+
+    def test_suite_writes_nothing_into_the_project_tree(self):
+        project = str(settings.BASE_DIR)
+        content_cache = caches[settings.CONTENT_CACHE_ALIAS]
+        for path in (settings.MEDIA_ROOT, settings.PUBLISHED_ROOT, settings.EXPORT_ROOT, content_cache._dir):
+            self.assertFalse(os.path.abspath(path).startswith(project), path)
@@ -0,0 +1,91 @@
+# mpgepmc_core/tracking.py
+import copy
+
+from django.db import models
+
+
+class ChangeTrackingMixin:
+    """
+    Remembers each field's value as loaded from (or last saved to) the
+    database, so callers and signal handlers can ask what actually changed:
+
+        donation.has_changed('status')
+        donation.get_original('status')
+        donation.changed_fields  # {'status', 'updated_at'}
+
+    save() on an existing row only writes the changed columns (plus auto_now
+    timestamps), and skips the query and its signals when nothing changed.
+    Passing update_fields explicitly still works as usual.
+
+    Put it before models.Model in the bases:
+        class Donation(ChangeTrackingMixin, models.Model): ...
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._snapshot_original_values()
+
+    def _tracked_value(self, field):
+        value = self.__dict__[field.attname]
+        if isinstance(field, models.FileField):
+            # FieldFile -> storage name; a fresh upload never compares equal to the stored file
+            if value is not None and not getattr(value, '_committed', True):
+                return object()
+            return getattr(value, 'name', value) or ''
+        if isinstance(value, (dict, list)):
+            return copy.deepcopy(value)
+        return value
+
+    def _snapshot_original_values(self):
+        # Deferred fields (.only()/.defer()) aren't in __dict__ and aren't tracked.
+        self._original_values = {
+            field.name: self._tracked_value(field)
+            for field in self._meta.concrete_fields
+            if field.attname in self.__dict__
+        }
+
+    @property
+    def changed_fields(self):
+        """Names of the fields whose value differs from the database row."""
+        if self._state.adding:
+            return {field.name for field in self._meta.concrete_fields}
+        return {
+            field.name for field in self._meta.concrete_fields
+            if field.attname in self.__dict__
+            and (field.name not in self._original_values
+                 or self._original_values[field.name] != self._tracked_value(field))
+        }
+
+    def has_changed(self, field_name):
+        return field_name in self.changed_fields
+
+    def get_original(self, field_name, default=None):
+        """The value `field_name` had when the instance was loaded or last saved."""
+        return self._original_values.get(field_name, default)
+
+    def save(self, *args, **kwargs):
+        if not self._state.adding and not args and kwargs.get('update_fields') is None \
+                and not kwargs.get('force_insert'):
+            changed = self.changed_fields - {self._meta.pk.name}
+            if not changed:
+                return
+            auto_now = {
+                field.name for field in self._meta.concrete_fields if getattr(field, 'auto_now', False)
+            }
+            kwargs['update_fields'] = changed | auto_now
+        super().save(*args, **kwargs)
+        self._snapshot_original_values()
+
+    def refresh_from_db(self, using=None, fields=None, **kwargs):
+        super().refresh_from_db(using=using, fields=fields, **kwargs)
+        if fields is None:
+            self._snapshot_original_values()
+            return
+        # Loading a deferred field also goes through here; pending edits to
+        # the other fields must stay "changed".
+        refreshed = set(fields)
+        for field in self._meta.concrete_fields:
+            if field.attname in self.__dict__ and (
+                    field.name in refreshed or field.attname in refreshed
+                    or field.name not in self._original_values):
+                self._original_values[field.name] = self._tracked_value(field)
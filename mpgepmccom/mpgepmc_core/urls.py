@@ -32,6 +32,9 @@ urlpatterns = [
     path('blogs/', views.blogs, name='blogs'),
     path('blogs/<slug:slug>/', views.blog_detail, name='blog_detail'),
 
+    # Site search
+    path('search/', views.search, name='search'),
+
     # Checkout and Payment Flow
     path('checkout/<slug:package_slug>/', views.checkout, name='checkout'),
     path('payment/process/', views.process_payment, name='process_payment'),
@@ -0,0 +1,86 @@
+# mpgepmc_core/versions.py
+"""
+Content version stamps shared by every cache layer.
+
+Each name (usually a model label such as 'mpgepmc_core.mpgblog') maps to an
+opaque token kept in the content cache. Cached data is keyed on the tokens of
+everything it was built from, so bumping a token invalidates exactly the
+entries that depended on it without having to find and delete them.
+
+A token starts with the (hex) Unix time it was issued, which is what the
+conditional GET support uses for Last-Modified (see changed_at()).
+"""
+import time
+import uuid
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+
+VERSION_PREFIX = 'version:'
+# Versions must outlive the entries keyed on them, so they never expire.
+VERSION_TIMEOUT = None
+
+
+def _cache():
+    return caches[settings.CONTENT_CACHE_ALIAS]
+
+
+def _new_token():
+    return f"{int(time.time()):x}-{uuid.uuid4().hex[:12]}"
+
+
+def version_name(model):
+    """Version name for a model class or instance, e.g. 'mpgepmc_core.mpgblog'."""
+    return model._meta.label_lower
+
+
+def get_versions(*names):
+    """
+    Returns the current tokens for `names`, in order.
+    Missing tokens (first use, or evicted) are initialised with a fresh random
+    token, never a counter, so an eviction can't resurrect a stale entry.
+    """
+    cache = _cache()
+    keys = [f"{VERSION_PREFIX}{name}" for name in names]
+    found = cache.get_many(keys)
+    missing = [key for key in keys if key not in found]
+    for key in missing:
+        # add() is a no-op if another process initialised the key first
+        cache.add(key, _new_token(), VERSION_TIMEOUT)
+    if missing:
+        found.update(cache.get_many(missing))
+    return tuple(found[key] for key in keys)
+
+
+async def aget_versions(*names):
+    """get_versions() for async views, through the cache's async API."""
+    cache = _cache()
+    keys = [f"{VERSION_PREFIX}{name}" for name in names]
+    found = await cache.aget_many(keys)
+    missing = [key for key in keys if key not in found]
+    for key in missing:
+        await cache.aadd(key, _new_token(), VERSION_TIMEOUT)
+    if missing:
+        found.update(await cache.aget_many(missing))
+    return tuple(found[key] for key in keys)
+
+
+def changed_at(tokens):
+    """
+    Unix time of the newest of `tokens`, i.e. the last time any of that data
+    changed. A token initialised after an eviction carries the eviction time,
+    which is later than the real change, so this never understates it.
+    Returns None if a token doesn't carry a time.
+    """
+    times = [token.split('-', 1)[0] for token in tokens if '-' in token]
+    if not times or len(times) != len(tokens):
+        return None
+    return max(int(issued, 16) for issued in times)
+
+
+def bump_versions(*names):
+    """Invalidates everything built from `names`. Runs after the current transaction commits."""
+    def bump():
+        _cache().set_many({f"{VERSION_PREFIX}{name}": _new_token() for name in names}, VERSION_TIMEOUT)
+    transaction.on_commit(bump)
@@ -1,52 +1,76 @@
 # mpgepmc/views.py
-import threading
 import random # ⭐️ Import the random module
-from django.shortcuts import render, get_object_or_404, redirect
+from django.shortcuts import aget_object_or_404, render, get_object_or_404, redirect
 from django.contrib import messages
-from django.core.mail import send_mail
 from django.conf import settings
+from django.http import Http404
 from django.template.loader import render_to_string
 from django.utils.html import strip_tags
 from django.views.decorators.http import require_POST
 
 # ⭐️ Make sure Donation and the new forms are imported
 
-import threading
 import random
 import uuid
 from .models import MpgService, MpgBlog, ServiceRequest, ServicePackage, ServiceFeature, Donation, BankAccount, Project
+from .cards import cards
+from .catalog import aget_catalog, aget_service
+from .context_processors import afooter_context
 from .forms import ServiceRequestForm, ContactForm, CheckoutForm, DonationAmountForm, DonationVerificationForm
+from .outbox import aenqueue_email
+from .page_cache import cache_public_page
+from .pagination import apaginate_queryset, paginate_sequence, render_listing, request_cursor, seek
+from .related import arelated_items
+from .search import KIND_LABELS, search as search_content
+from .site_snapshot import aget_site_snapshot
+
+# ⭐️ The content views and the contact / service request / donation forms are
+# async: under ASGI (mpgepmccom/asgi.py) they use the async ORM, cache and
+# session APIs and never tie up a worker thread while they wait. Templates are
+# rendered only after afooter_context() has loaded everything they show, so
+# rendering never queries. Under WSGI Django runs them in an event loop of its own.
 
 # -----------------------------------------------------
 # ⭐️ NEW VIEWS FOR PROJECTS ⭐️
 # -----------------------------------------------------
 
-def projects(request):
+@cache_public_page(Project)
+async def projects(request):
     """
-    Displays a list of all published welfare projects.
+    Displays the published welfare projects, newest first, one keyset page at a time.
     """
-    project_list = Project.objects.filter(is_published=True).order_by('-posted_date')
-    context = {
+    category = request.GET.get('category', '')
+    project_list = cards(Project.objects.filter(is_published=True))
+    if category in Project.ProjectCategory.values:
+        project_list = project_list.filter(category=category)
+    else:
+        category = ''
+    page = await apaginate_queryset(project_list, ('-posted_date', '-id'), request_cursor(request))
+    context = await afooter_context(request, {
         'title': 'Our Projects',
-        'projects': project_list,
-    }
-    return render(request, 'mpgepmc/projects.html', context)
+        'projects': page.items,
+        'page': page,
+        'category': category,
+        'categories': Project.ProjectCategory.choices,
+    })
+    return render_listing(request, 'mpgepmc/projects.html', 'mpgepmc/partials/project_cards.html', context)
 
 
-def project_detail(request, project_slug):
+@cache_public_page(Project, variants=settings.PAGE_CACHE_VARIANTS)
+async def project_detail(request, project_slug):
     """
     Displays the details for a single project, identified by its slug.
     """
-    project = get_object_or_404(Project, slug=project_slug, is_published=True)
+    project = await aget_object_or_404(Project, slug=project_slug, is_published=True)
     
-    # Optional: Get up to 3 other random projects to show as "related"
-    related_projects = Project.objects.filter(is_published=True).exclude(pk=project.pk).order_by('?')[:3]
+    # Up to 3 related projects, rotated through the precomputed neighbour list
+    related_projects = await arelated_items(project, count=3)
 
-    context = {
+    context = await afooter_context(request, {
         'title': project.title,
         'project': project,
         'related_projects': related_projects,
-    }
+    })
     return render(request, 'mpgepmc/project_detail.html', context)
 
 
@@ -86,31 +110,31 @@ def support_page(request):
 # ⭐️ NEW VIEW ⭐️
 
 # VIEW 2: Checkout page to display bank details and get verification
-def donation_checkout_page(request, donation_order_number):
-    donation = get_object_or_404(Donation, donation_order_number=donation_order_number)
+async def donation_checkout_page(request, donation_order_number):
+    donation = await aget_object_or_404(Donation, donation_order_number=donation_order_number)
 
     if donation.status != 'PENDING':
         messages.info(request, f"This donation ({donation.donation_order_number}) is already being processed. For updates, please contact us.")
         return redirect('mpgepmc_core:home')
 
-    # ⭐️ Fetch the active bank account from the database ⭐️
-    active_bank_account = BankAccount.objects.filter(is_active=True).first()
+    # ⭐️ The active bank account comes from the cached site snapshot ⭐️
+    active_bank_account = (await aget_site_snapshot()).active_bank_account
 
     if request.method == 'POST':
         form = DonationVerificationForm(request.POST, request.FILES, instance=donation)
         if form.is_valid():
             verified_donation = form.save(commit=False)
             verified_donation.status = Donation.DonationStatus.AWAITING_VERIFICATION
-            verified_donation.save()
+            await verified_donation.asave()
             
             # --- Send Notification Email ONLY to Admin ---
             admin_email = settings.ADMINS[0][1] if settings.ADMINS else settings.DEFAULT_FROM_EMAIL
             subject_admin = f"Donation Verification Submitted: {verified_donation.donation_order_number}"
             html_message_admin = render_to_string('mpgepmc/email/donation_verification_admin.html', {'donation': verified_donation})
             plain_message_admin = strip_tags(html_message_admin)
-            EmailThread(
+            await aenqueue_email(
                 subject_admin, plain_message_admin, settings.DEFAULT_FROM_EMAIL, [admin_email], html_message=html_message_admin
-            ).start()
+            )
             
             return redirect('mpgepmc_core:donation_success', donation_order_number=verified_donation.donation_order_number)
         else:
@@ -118,12 +142,12 @@ def donation_checkout_page(request, donation_order_number):
     else:
         form = DonationVerificationForm(instance=donation)
 
-    context = {
+    context = await afooter_context(request, {
         'title': 'Complete Your Donation',
         'donation': donation,
         'form': form,
         'bank_account': active_bank_account # ⭐️ Pass the account to the template
-    }
+    })
     
     # ⭐️ Warn the admin in the UI if no bank account is set up
     if not active_bank_account:
@@ -144,41 +168,20 @@ def donation_success_page(request, donation_order_number):
     }
     return render(request, 'mpgepmc/donation_success.html', context)
 
-# ... (keep EmailThread class and all other views like home, blogs, contact, etc.) ...
-
-
-# --- EmailThread class remains the same ---
-class EmailThread(threading.Thread):
-    def __init__(self, subject, plain_message, from_email, recipient_list, html_message):
-        self.subject = subject
-        self.plain_message = plain_message
-        self.from_email = from_email
-        self.recipient_list = recipient_list
-        self.html_message = html_message
-        threading.Thread.__init__(self)
-
-    def run(self):
-        try:
-            send_mail(
-                self.subject,
-                self.plain_message,
-                self.from_email,
-                self.recipient_list,
-                html_message=self.html_message,
-                fail_silently=False
-            )
-        except Exception as e:
-            print(f"ERROR: Email sending failed in background thread: {e}")
+# ... (keep all other views like home, blogs, contact, etc.) ...
 
 
 # ⭐️ UPDATED HOME VIEW ⭐️
-def home(request):
-    # Fetch the 4 most recent services and blogs to create a pool of candidates
-    latest_blogs_qs = MpgBlog.objects.filter(is_published=True).order_by('-posted_date')[:4]
-    featured_services_qs = MpgService.objects.filter(is_active=True).order_by('-created_at')[:4]
+@cache_public_page(variants=settings.PAGE_CACHE_VARIANTS)
+async def home(request):
+    # The 4 most recent services and blogs are the same lists the footer shows,
+    # so take them from the site snapshot; they feed the slider and their own sections
+    snapshot = await aget_site_snapshot()
+    latest_blogs = list(snapshot.latest_blogs_footer)
+    featured_services = list(snapshot.latest_services_footer)
 
-    # Combine the querysets into a single list
-    combined_items = list(latest_blogs_qs) + list(featured_services_qs)
+    # Combine the lists into a single pool of candidates
+    combined_items = latest_blogs + featured_services
 
     # Randomly shuffle the combined list
     random.shuffle(combined_items)
@@ -186,79 +189,82 @@ def home(request):
     # Ensure we don't have more than 8 slides
     slider_items = combined_items[:8]
 
-    # Keep the original queries for the "Our Core Offerings" and "Latest Articles" sections
-    featured_services = MpgService.objects.filter(is_active=True).order_by('-created_at')[:4]
-    latest_blogs = MpgBlog.objects.filter(is_published=True).order_by('-posted_date')[:4]
 
-
-    context = {
+    context = await afooter_context(request, {
         'title': 'Home',
         'slider_items': slider_items, # Pass the new shuffled list to the template
         'featured_services': featured_services, # Pass original featured services for the relevant section
         'latest_blogs': latest_blogs, # Pass original latest blogs for the relevant section
-    }
+    })
     return render(request, 'index.html', context)
 
 # --- Other views (blogs, blog_detail, services, etc.) remain unchanged ---
-def blogs(request):
-    blog_posts = MpgBlog.objects.filter(is_published=True).order_by('-posted_date')
-    context = {
+@cache_public_page()
+async def blogs(request):
+    # ⭐️ Keyset pages: page 1 shows the featured post, "load more" appends cards ⭐️
+    page = await apaginate_queryset(cards(MpgBlog.objects.filter(is_published=True)), ('-posted_date', '-id'), request_cursor(request))
+    context = await afooter_context(request, {
         'title': 'Our Blog',
-        'blog_posts': blog_posts,
-    }
-    return render(request, 'mpgepmc/blogs.html', context)
+        'blog_posts': page.items,
+        'page': page,
+    })
+    return render_listing(request, 'mpgepmc/blogs.html', 'mpgepmc/partials/blog_cards.html', context)
 
 
-def blog_detail(request, slug):
-    blog_post = get_object_or_404(MpgBlog, slug=slug, is_published=True)
+@cache_public_page(variants=settings.PAGE_CACHE_VARIANTS)
+async def blog_detail(request, slug):
+    blog_post = await aget_object_or_404(MpgBlog, slug=slug, is_published=True)
 
     # Get previous and next posts for navigation
-    # Previous post is the first one with a posted_date *before* the current one, in descending order.
-    previous_post = MpgBlog.objects.filter(
-        is_published=True, 
-        posted_date__lt=blog_post.posted_date
-    ).order_by('-posted_date').first()
-
-    # Next post is the first one with a posted_date *after* the current one, in ascending order.
-    next_post = MpgBlog.objects.filter(
-        is_published=True, 
-        posted_date__gt=blog_post.posted_date
-    ).order_by('posted_date').first()
-
-    # Get up to 4 random posts, excluding the current one
-    related_posts = MpgBlog.objects.filter(
-        is_published=True
-    ).exclude(pk=blog_post.pk).order_by('?')[:3]
+    # Same (posted_date, id) key as the listing, so posts published in the same
+    # second aren't skipped; both are seeks on blog_published_date_idx.
+    published = cards(MpgBlog.objects.filter(is_published=True))
+    key = (blog_post.posted_date, blog_post.pk)
+    # Previous post is the first one *before* the current one, in descending order.
+    previous_post = await seek(published, ('-posted_date', '-id'), key).afirst()
 
-    context = {
+    # Next post is the first one *after* the current one, in ascending order.
+    next_post = await seek(published, ('posted_date', 'id'), key).afirst()
+
+    # Up to 3 related posts, rotated through the precomputed neighbour list
+    related_posts = await arelated_items(blog_post, count=3)
+
+    context = await afooter_context(request, {
         'title': blog_post.title,
         'blog_post': blog_post,
         'previous_post': previous_post,
         'next_post': next_post,
         'related_posts': related_posts,
-    }
+    })
     return render(request, 'mpgepmc/blog_detail.html', context)
 
 
 
 
-def services(request):
-    mpgservices_list = MpgService.objects.filter(is_active=True).order_by('name')
-    context = {
+@cache_public_page(ServicePackage)
+async def services(request):
+    # ⭐️ Rendered from the cached catalog snapshot (see catalog.py) ⭐️
+    page = paginate_sequence(
+        (await aget_catalog())['services'], lambda service: (service['name'], service['id']), request_cursor(request)
+    )
+    context = await afooter_context(request, {
         'title': 'Our Services',
-        'services': mpgservices_list,
-    }
-    return render(request, 'mpgepmc/services.html', context)
-
-def service_detail(request, service_slug):
-    service = get_object_or_404(MpgService, slug=service_slug, is_active=True)
-    packages = service.packages.filter(is_active=True).order_by('order')
-
-    context = {
-        'title': f'{service.name} Packages',
+        'services': page.items,
+        'page': page,
+    })
+    return render_listing(request, 'mpgepmc/services.html', 'mpgepmc/partials/service_cards.html', context)
+
+@cache_public_page(ServicePackage, ServiceFeature)
+async def service_detail(request, service_slug):
+    service = await aget_service(service_slug)
+    if service is None:
+        raise Http404("No MpgService matches the given query.")
+
+    context = await afooter_context(request, {
+        'title': f"{service['name']} Packages",
         'service': service,
-        'packages': packages,
-    }
+        'packages': service['packages'],
+    })
     return render(request, 'mpgepmc/service_detail.html', context)
 
 def checkout(request, package_slug):
@@ -310,7 +316,7 @@ def contact(request):
     }
     return render(request, 'mpgepmc/contact.html', context)
 
-def contact_form_submit(request):
+async def contact_form_submit(request):
     if request.method == 'POST':
         form = ContactForm(request.POST)
         if form.is_valid():
@@ -331,35 +337,35 @@ def contact_form_submit(request):
             })
             plain_message = strip_tags(html_message)
 
-            EmailThread(
+            await aenqueue_email(
                 subject,
                 plain_message,
                 settings.DEFAULT_FROM_EMAIL,
                 [admin_email],
                 html_message=html_message
-            ).start()
+            )
             
             messages.success(request, 'Your message has been sent successfully! We will get back to you soon.')
             return redirect('mpgepmc_core:thank_you')
         else:
             messages.error(request, 'Please correct the errors below.')
-            context = {
+            context = await afooter_context(request, {
                 'title': 'Contact Us',
                 'form': form,
-            }
+            })
             return render(request, 'mpgepmc/contact.html', context)
     else:
         return redirect('mpgepmc_core:contact')
 
-def request_service(request, service_slug):
-    mpgservice = get_object_or_404(MpgService, slug=service_slug, is_active=True)
+async def request_service(request, service_slug):
+    mpgservice = await aget_object_or_404(MpgService, slug=service_slug, is_active=True)
 
     if request.method == 'POST':
         form = ServiceRequestForm(request.POST)
         if form.is_valid():
             service_request = form.save(commit=False)
             service_request.mpgservice = mpgservice
-            service_request.save()
+            await service_request.asave()
 
             admin_email = settings.ADMINS[0][1] if settings.ADMINS else settings.DEFAULT_FROM_EMAIL
             subject = f"New Service Request: {mpgservice.name} from {service_request.user_full_name}"
@@ -375,13 +381,13 @@ def request_service(request, service_slug):
             })
             plain_message = strip_tags(html_message)
 
-            EmailThread(
+            await aenqueue_email(
                 subject,
                 plain_message,
                 settings.DEFAULT_FROM_EMAIL,
                 [admin_email],
                 html_message=html_message
-            ).start()
+            )
 
             messages.success(request, 'Your service request has been sent successfully! We will get back to you soon.')
             return redirect('mpgepmc_core:services')
@@ -390,17 +396,36 @@ def request_service(request, service_slug):
     else:
         form = ServiceRequestForm()
 
-    context = {
+    context = await afooter_context(request, {
         'title': f'Request {mpgservice.name}',
         'service': mpgservice,
         'form': form,
-    }
+    })
     return render(request, 'mpgepmc/request_service.html', context)
 
 def thank_you_page(request):
     return render(request, 'mpgepmc/thank_you.html', {'title': 'Thank You!'})
 
 
+@cache_public_page(Project)
+def search(request):
+    """
+    Ranked full-text search across published blogs, projects and services.
+    """
+    query = request.GET.get('q', '').strip()[:200]
+    kind = request.GET.get('type', '')
+    results = search_content(query, kinds=[kind] if kind in KIND_LABELS else None, limit=settings.SEARCH_RESULTS_LIMIT) if query else []
+
+    context = {
+        'title': 'Search',
+        'query': query,
+        'kind': kind,
+        'kinds': KIND_LABELS,
+        'results': results,
+    }
+    return render(request, 'mpgepmc/search.html', context)
+
+
 # ⭐️ NEW VIEW FOR PRIVACY POLICY ⭐️
 def privacy_policy_page(request):
     """
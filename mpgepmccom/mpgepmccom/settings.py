@@ -46,6 +46,7 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
+    'mpgepmc_core.middleware.RequestMetricsMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -74,6 +75,9 @@ TEMPLATES = [
 
 WSGI_APPLICATION = 'mpgepmccom.wsgi.application'
 
+# `manage.py test` writes media, sitemaps/feeds and exports to a scratch directory
+TEST_RUNNER = 'mpgepmc_core.testing.IsolatedTestRunner'
+
 
 # Database
 # https://docs.djangoproject.com/en/5.2/ref/settings/#databases
@@ -85,6 +89,106 @@ DATABASES = {
     }
 }
 
+# SQLite production mode (see mpgepmc_core/sqlite.py). WAL lets readers carry on
+# while a write commits. The pragmas run on every new connection. Transactions
+# start with BEGIN IMMEDIATE, so writers queue for the write lock up front
+# (waiting up to busy_timeout) instead of failing with "database is locked" when
+# a transaction that has read tries to write. Under WSGI, connections are kept
+# between requests; under ASGI (mpgepmccom/asgi.py sets DJANGO_SERVER_INTERFACE)
+# they are not, since async requests don't run on a stable thread and Django
+# advises against persistent connections there. Set SQLITE_PRODUCTION_MODE=False
+# in the environment for Django's defaults.
+SQLITE_PRODUCTION_MODE = os.getenv('SQLITE_PRODUCTION_MODE', 'True') == 'True'
+SERVED_BY_ASGI = os.getenv('DJANGO_SERVER_INTERFACE') == 'asgi'
+SQLITE_PRAGMAS = {
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',     # WAL stays consistent; only the last commits can be lost on power failure
+    'busy_timeout': 5000,        # ms to wait for the write lock before giving up
+    'cache_size': -20000,        # KiB of page cache per connection
+    'mmap_size': 128 * 1024 * 1024,
+    'temp_store': 'MEMORY',
+}
+SQLITE_PRODUCTION_SETTINGS = {
+    'OPTIONS': {
+        'init_command': ';'.join(f'PRAGMA {name}={value}' for name, value in SQLITE_PRAGMAS.items()),
+        'transaction_mode': 'IMMEDIATE',
+    },
+    'CONN_MAX_AGE': 0 if SERVED_BY_ASGI else 600,
+    'CONN_HEALTH_CHECKS': not SERVED_BY_ASGI,
+}
+if SQLITE_PRODUCTION_MODE:
+    DATABASES['default'].update(SQLITE_PRODUCTION_SETTINGS)
+
+# Caches
+# 'content' holds rendered pages and the version stamps they are keyed on.
+# Pick the backend with CONTENT_CACHE_BACKEND: 'file' (the default, shared
+# between workers on one host), 'redis' (any Redis-compatible server) or
+# 'locmem' (per process: only for a single worker, since a save in one process
+# doesn't invalidate what the others have cached).
+CONTENT_CACHE_BACKENDS = {
+    'locmem': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'mpgepmc-content',
+        'OPTIONS': {'MAX_ENTRIES': 5000},
+    },
+    'file': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': os.path.join(BASE_DIR, 'cache', 'content'),
+        'OPTIONS': {'MAX_ENTRIES': 20000},
+    },
+    'redis': {
+        'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+        'LOCATION': os.getenv('REDIS_URL', 'redis://127.0.0.1:6379/1'),
+    },
+}
+
+CONTENT_CACHE_BACKEND = os.getenv('CONTENT_CACHE_BACKEND', 'file')
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    'content': CONTENT_CACHE_BACKENDS[CONTENT_CACHE_BACKEND],
+}
+CONTENT_CACHE_ALIAS = 'content'
+# Each process rebuilds its site snapshot (footer lists, the donation bank account;
+# see mpgepmc_core/site_snapshot.py) at least this often, even if no version
+# stamp it can see has changed
+SITE_SNAPSHOT_MAX_AGE = 60
+
+# Full-page cache for anonymous visitors (see mpgepmc_core/page_cache.py).
+# A per-process (locmem) cache never sees version bumps from other processes
+# (admin workers, management commands, the outbox worker), so there pages
+# expire within a minute and there are no 304s from stamps only this process knows.
+PER_PROCESS_CONTENT_CACHE = CONTENT_CACHE_BACKEND == 'locmem'
+PAGE_CACHE_ENABLED = True
+PAGE_CACHE_TIMEOUT = 60 if PER_PROCESS_CONTENT_CACHE else 60 * 60 * 24
+# How many renderings of randomised pages (home slider, related items) to keep per URL
+PAGE_CACHE_VARIANTS = 4
+# ETag / Last-Modified and 304 Not Modified for the same pages, from the same version stamps
+CONDITIONAL_GET_ENABLED = not PER_PROCESS_CONTENT_CACHE
+
+# Blog, project and service listings are paginated with "load more" cursors
+# (see mpgepmc_core/pagination.py); this is the number of cards per batch.
+LISTING_PAGE_SIZE = 12
+
+# Admin changelists for donations and service requests count rows only up to
+# this many; past it they show an estimate (see mpgepmc_core/admin_scale.py).
+ADMIN_COUNT_LIMIT = 10000
+
+# Related-content index (see mpgepmc_core/related.py). A rebuild re-reads every
+# published item, so schedule `build_related_index` (e.g. hourly) rather than
+# running it on each admin save. Small sites can turn this on instead.
+RELATED_INDEX_REBUILD_ON_SAVE = False
+
+# Site search (see mpgepmc_core/search.py)
+SEARCH_RESULTS_LIMIT = 30
+
+# Per-request query count / SQL time / render time (see mpgepmc_core/middleware.py).
+# Logged on 'mpgepmc_core.metrics'; set REQUEST_METRICS_HEADERS=True in the
+# environment to also send them as X-Query-Count and Server-Timing headers.
+REQUEST_METRICS_ENABLED = True
+REQUEST_METRICS_HEADERS = os.getenv('REQUEST_METRICS_HEADERS', 'False') == 'True'
+
 # Email Configuration (Gmail)
 EMAIL_BACKEND = 'django.core.mail.backends.smtp.EmailBackend'
 EMAIL_HOST = 'smtp.gmail.com'
@@ -94,6 +198,13 @@ EMAIL_HOST_USER = 'mpgepmc@gmail.com'
 EMAIL_HOST_PASSWORD = os.getenv('EMAIL_HOST_PASSWORD')
 DEFAULT_FROM_EMAIL = EMAIL_HOST_USER
 
+# Email outbox (see mpgepmc_core/outbox.py). Views only queue emails;
+# run `python manage.py send_queued_emails --loop` to deliver them.
+EMAIL_OUTBOX_BATCH_SIZE = 50
+EMAIL_OUTBOX_MAX_ATTEMPTS = 6
+EMAIL_OUTBOX_RETRY_BASE_SECONDS = 60
+EMAIL_OUTBOX_RETRY_MAX_SECONDS = 60 * 60
+
 # Password validation
 AUTH_PASSWORD_VALIDATORS = [
     {'NAME': 'django.contrib.auth.password_validation.UserAttributeSimilarityValidator'},
@@ -120,6 +231,21 @@ STATICFILES_STORAGE = 'whitenoise.storage.CompressedManifestStaticFilesStorage'
 # Media files
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
+# Served by mpgepmc_core/media.py. Set MEDIA_SENDFILE to 'x-accel-redirect' (nginx, with an
+# `internal` location at MEDIA_ACCEL_REDIRECT_PREFIX aliased to MEDIA_ROOT) or 'x-sendfile'
+# (Apache/lighttpd) so the web server streams the bytes after Django's access checks.
+MEDIA_SENDFILE = os.getenv('MEDIA_SENDFILE') or None
+MEDIA_ACCEL_REDIRECT_PREFIX = '/protected-media/'
+
+# Pre-generated sitemap.xml and RSS/Atom feeds (see mpgepmc_core/feeds.py)
+SITE_URL = os.getenv('SITE_URL', 'https://mpgepmc.online')
+PUBLISHED_ROOT = os.path.join(BASE_DIR, 'published')
+# Rewrite the affected sitemap chunk and feeds when an item is saved or deleted;
+# turn it off and schedule `build_sitemaps_and_feeds` for very busy admins.
+PUBLISHED_FILES_REBUILD_ON_SAVE = True
+
+# Static HTML export of the read-only pages for nginx/CDN serving (see mpgepmc_core/static_export.py)
+EXPORT_ROOT = os.getenv('EXPORT_ROOT', os.path.join(BASE_DIR, 'export'))
 
 # Default primary key field type
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
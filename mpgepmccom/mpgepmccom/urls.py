@@ -1,15 +1,23 @@
 
 # mpgpro/urls.py
 from django.contrib import admin
-from django.urls import path, include
+from django.urls import path, include, re_path
 from django.conf import settings # Import settings
 from django.conf.urls.static import static # Import static helper
 
+from mpgepmc_core.feeds import serve_published_file
+from mpgepmc_core.media import serve_media
+
 urlpatterns = [
     path('adminmyaryacanaccess/', admin.site.urls),
+    # Uploaded files, in production too: immutable public images, staff-only donation slips
+    re_path(rf"^{settings.MEDIA_URL.lstrip('/')}(?P<path>.+)$", serve_media, name='media'),
+    # Pre-generated sitemaps and feeds, served as files
+    path('sitemap.xml', serve_published_file, {'name': 'sitemap.xml'}, name='sitemap'),
+    re_path(r'^(?P<name>(?:sitemaps/[a-z]+(?:-\d+)?\.xml|feeds/[a-z]+\.(?:rss|atom)))$', serve_published_file,
+            name='published_file'),
     path('', include('mpgepmc_core.urls', namespace='mpgepmc_core')), # Include your app's URLs
 ]
 
 if settings.DEBUG:
-    urlpatterns += static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
     urlpatterns += static(settings.STATIC_URL, document_root=settings.STATIC_ROOT)
\ No newline at end of file
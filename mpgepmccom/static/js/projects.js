@@ -1 +0,0 @@
-document.addEventListener("DOMContentLoaded",function(){let t=document.querySelectorAll(".p-filter-btn"),e=document.querySelectorAll(".p-card");t.forEach(a=>{a.addEventListener("click",function(){t.forEach(t=>t.classList.remove("active")),this.classList.add("active");let a=this.getAttribute("data-filter");e.forEach(t=>{"all"===a||t.getAttribute("data-category")===a?t.style.display="flex":t.style.display="none"})})})});
\ No newline at end of file
@@ -0,0 +1 @@
+document.addEventListener("DOMContentLoaded",function(){function bindLoadMore(n,grid){let a=n.querySelector("[data-load-more]");if(!a)return;let g=grid||document.querySelector(a.dataset.loadMore),busy=!1,io=null;function load(ev){if(ev&&ev.preventDefault(),busy)return;busy=!0,a.classList.add("loading");let u=new URL(a.href,window.location.href);u.searchParams.set("fragment","1"),fetch(u,{credentials:"same-origin"}).then(r=>{if(!r.ok)throw Error(r.status);return r.text()}).then(html=>{io&&io.disconnect();let t=document.createElement("template");t.innerHTML=html;let next=t.content.querySelector("[data-load-more-nav]");next&&next.remove(),g.appendChild(t.content),next?(n.replaceWith(next),bindLoadMore(next,g)):n.remove()}).catch(()=>{window.location.href=a.href})}a.addEventListener("click",load),"IntersectionObserver"in window&&n.hasAttribute("data-infinite")&&(io=new IntersectionObserver(es=>{es.some(x=>x.isIntersecting)&&load()},{rootMargin:"600px"})).observe(n)}document.querySelectorAll("[data-load-more-nav]").forEach(n=>bindLoadMore(n))});